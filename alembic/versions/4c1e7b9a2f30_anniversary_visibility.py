@@ -0,0 +1,56 @@
+"""anniversary visibility
+
+Revision ID: 4c1e7b9a2f30
+Revises: d7850afd9a3a
+Create Date: 2026-10-17 10:12:41.503218
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "4c1e7b9a2f30"
+down_revision: Union[str, Sequence[str], None] = "d7850afd9a3a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "anniversary_visibility",
+        sa.Column("user_id", sa.BigInteger(), nullable=False, comment="可见用户ID"),
+        sa.Column("anniv_id", sa.String(length=32), nullable=False, comment="纪念日ID"),
+        sa.Column("via", sa.SmallInteger(), nullable=False, comment="可见来源 AnnivVisibleVia"),
+        sa.PrimaryKeyConstraint(
+            "user_id", "anniv_id", "via", name=op.f("pk_anniversary_visibility")
+        ),
+    )
+    op.create_index(
+        "ix_anniversary_visibility_anniv_id", "anniversary_visibility", ["anniv_id"], unique=False
+    )
+
+    # 回填历史数据（与 AnnivVisibilityRepo.rebuild 一致）
+    op.execute(
+        """
+        INSERT INTO anniversary_visibility (user_id, anniv_id, via)
+        SELECT owner_id, id, 0 FROM anniversary
+        UNION ALL
+        SELECT tid::bigint, anniv_id, 2 FROM anniversary_member
+        WHERE ttype = 2 AND tid ~ '^\\d+$'
+        UNION ALL
+        SELECT sgm.user_id, am.anniv_id, 1
+        FROM anniversary_member am JOIN share_group_member sgm ON sgm.group_id = am.tid
+        WHERE am.ttype = 1
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_anniversary_visibility_anniv_id", table_name="anniversary_visibility")
+    op.drop_table("anniversary_visibility")
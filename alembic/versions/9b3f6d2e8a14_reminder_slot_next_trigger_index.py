@@ -0,0 +1,34 @@
+"""reminder slot next_trigger_at index
+
+Revision ID: 9b3f6d2e8a14
+Revises: 4c1e7b9a2f30
+Create Date: 2026-10-17 15:40:12.318275
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "9b3f6d2e8a14"
+down_revision: Union[str, Sequence[str], None] = "4c1e7b9a2f30"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_reminder_slot_next_trigger_at",
+        "reminder_slot",
+        ["next_trigger_at"],
+        unique=False,
+        postgresql_where=sa.text("next_trigger_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_reminder_slot_next_trigger_at", table_name="reminder_slot")
@@ -58,6 +58,18 @@ class Settings(BaseSettings):
     TESTING: bool = False
     TIMEZONE: ZoneInfo = ZoneInfo("Asia/Shanghai")
     ENABLE_REQ_LOG: bool = True
+    ENABLE_MW_TIMING: bool = False  # 中间件分层耗时统计（Server-Timing 响应头 + 进程内直方图）
+    # 纪念日列表的标签、媒体通过 jsonb_agg 与列表同一条 SQL 返回
+    # 10 万条基准（scripts/bench_anniv_feed.py）中比三次查询慢约 40%，默认关闭
+    ANNIV_FEED_AGG_RELATIONS: bool = False
+    ANNIV_STAT_CACHE: bool = True  # 首页纪念日统计按用户缓存快照，可见纪念日变更时失效
+    REMIND_DISPATCH_BATCH: int = 1000  # 提醒分发每个事务认领的 slot 数量
+    REMIND_DISPATCH_MAX_DELAY: int = 24 * 60 * 60  # 超过该时长（秒）未分发的提醒不再发送，只推进
+    # 近期提醒预加载到 redis 时间轮，由 web worker 内的消费者准点分发；DB 扫描只做兜底
+    REMIND_WHEEL_ENABLE: bool = False
+    REMIND_WHEEL_HORIZON: int = 10 * 60  # 预加载未来多长时间（秒）内的提醒，需大于加载周期
+    REMIND_WHEEL_GRACE: int = 60  # 启用时间轮后，兜底扫描只处理逾期超过该时长（秒）的提醒
+    REMIND_ROLLOVER_BATCH: int = 5000  # 夜间滚动已过期触发时间，每个事务处理的行数
     AUTH_SECRET_KEY: str | None = os.getenv("AUTH_SECRET_KEY")  # secrets.token_urlsafe(32)
 
     BASE_DIR: Path = Path(__file__).resolve().parent.parent.parent
@@ -74,6 +86,9 @@ class Settings(BaseSettings):
     TOKEN_SECRET_KEY: str = os.getenv("TOKEN_SECRET_KEY")  # secrets.token_urlsafe(32)
     COOKIE_REFRESH_TOKEN_KEY: str = "refresh_token"
     TOKEN_ALGORITHM: str = "HS256"
+    TOKEN_LOCAL_CACHE_SIZE: int = 10000  # 进程内已验证 token 缓存条目数
+    # 进程内已验证 token 缓存最长有效期（秒），即吊销广播丢失时的最大延迟
+    TOKEN_LOCAL_CACHE_WINDOW: int = 30
     INVITE_TOKEN_SECRET: str = os.getenv("INVITE_TOKEN_SECRET")
 
     API_KEYS: set[str] | None = None
@@ -91,6 +106,8 @@ class Settings(BaseSettings):
     REDIS_PMS_URL: str | None = os.getenv("REDIS_PMS_URL")
     REDIS_LIMITER_URL: str | None = os.getenv("REDIS_LIMITER_URL")
     REDIS_SOCKET_URL: str | None = os.getenv("REDIS_SOCKET_URL")
+    NEAR_CACHE_ENABLE: bool = True  # redis 前的进程内近端缓存
+    NEAR_CACHE_SIZE: int = 20000  # 近端缓存条目数（每个 worker）
 
     # Email Service Configuration
     EMAIL_SMTP_SERVER: str = os.getenv("EMAIL_SMTP_SERVER")
@@ -130,6 +130,14 @@ class InviteState(IntEnumPro):
     CANCELLED = 5, "已撤销"
 
 
+class AnnivVisibleVia(IntEnumPro):
+    """纪念日可见来源"""
+
+    OWNER = 0, "归属者"
+    GROUP = 1, "共享组"
+    MEMBER = 2, "共享成员"
+
+
 class InviteTargetType(IntEnumPro):
     """邀请目标类型"""
 
@@ -222,6 +230,7 @@ class EmailBizEnum(EnumPro):
 
     INVITE_ANNIV = "invite_anniv", "纪念日邀请"
     INVITE_GROUP = "invite_group", "共享组邀请"
+    REMIND_ANNIV = "remind_anniv", "纪念日提醒"
 
 
 class CommentState(IntEnumPro):
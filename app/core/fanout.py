@@ -0,0 +1,68 @@
+import asyncio
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from app.core.metrics import stage_latency
+from app.database import db
+
+
+class StageRunner:
+    """
+    并发执行相互独立的查询阶段（fan-out）
+
+    - db=True 的阶段各自从连接池获取独立 session（AsyncSession 不能并发使用），执行完立即归还
+    - 其余阶段（如 redis pipeline）直接并发执行，与 DB 查询重叠
+    - 各阶段及整体（total）耗时写入 `stage_latency`，按 name 聚合
+
+    example:
+        ret = await (
+            StageRunner("anniv_feed")
+            .add("tags", anniv_repo.list_tag, anniv_ids, db=True)
+            .add("counter", AnnivCounter.get_many, anniv_ids)
+            .run()
+        )
+        ret["tags"], ret["counter"]
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.durations: dict[str, float] = {}
+        self._stages: dict[str, tuple[Callable[..., Awaitable], tuple, dict, bool]] = {}
+
+    def add(
+        self, stage: str, func: Callable[..., Awaitable], *args, db: bool = False, **kwargs
+    ) -> "StageRunner":
+        """
+        :param stage: 阶段名
+        :param func: 协程函数；db=True 时第一个参数为新建的 session
+        :param db: 是否需要独立 session
+        """
+        self._stages[stage] = (func, args, kwargs, db)
+        return self
+
+    async def _run_stage(self, stage: str, func, args, kwargs, use_db: bool):
+        start = perf_counter()
+        try:
+            if use_db:
+                async with db.async_db_session() as session:
+                    return await func(session, *args, **kwargs)
+            return await func(*args, **kwargs)
+        finally:
+            self._observe(stage, start)
+
+    def _observe(self, stage: str, start: float) -> None:
+        elapsed = (perf_counter() - start) * 1000
+        self.durations[stage] = elapsed
+        stage_latency.observe(self.name, stage, elapsed)
+
+    async def run(self) -> dict[str, Any]:
+        """并发执行全部阶段，返回 {阶段名: 结果}；任一阶段异常时抛出"""
+        start = perf_counter()
+        try:
+            results = await asyncio.gather(
+                *(self._run_stage(stage, *item) for stage, item in self._stages.items())
+            )
+        finally:
+            self._observe("total", start)
+
+        return dict(zip(self._stages, results))
@@ -53,12 +53,38 @@ class CursorPageRespModel(RespModel[CursorPaginatedResponse[T]], Generic[T]):
     pass
 
 
-class MsgSpecJSONResponse(JSONResponse):
+APP_CODE_STATE_KEY = "app_code"
+
+
+class CodeJSONResponse(JSONResponse):
+    """
+    渲染时记录响应体中的业务 code，发送前写入 scope["state"]，
+    请求日志中间件直接读取，无需再解析响应体
+    """
+
+    app_code: int | None = None
+
+    def record_code(self, content: Any) -> None:
+        if isinstance(content, dict):
+            self.app_code = content.get("code")
+
+    def render(self, content: Any) -> bytes:
+        self.record_code(content)
+        return super().render(content)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self.app_code is not None:
+            scope.setdefault("state", {})[APP_CODE_STATE_KEY] = self.app_code
+        await super().__call__(scope, receive, send)
+
+
+class MsgSpecJSONResponse(CodeJSONResponse):
     """
     使用高性能的 msgspec 库将数据序列化为 JSON 的响应类
     """
 
     def render(self, content: Any) -> bytes:
+        self.record_code(content)
         return msgspec_json.encode(content)
 
 
@@ -86,7 +112,7 @@ def make_response(
 
 def make_json_response(msg="successful", *, data: Any = None, code=0, errmsg=None):
     data = _build_resp_body(code, msg, data, errmsg)
-    return JSONResponse(data, media_type="application/json; charset=utf-8")
+    return CodeJSONResponse(data, media_type="application/json; charset=utf-8")
 
 
 def make_fast_response(msg="successful", *, data: Any = None, code=0, errmsg=None):
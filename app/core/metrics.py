@@ -0,0 +1,113 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+
+# 耗时直方图分桶上界（毫秒）
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """进程内耗时直方图（单 worker 聚合，不跨进程）"""
+
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+
+    def quantile(self, q: float) -> float | None:
+        """按分桶上界估算分位数"""
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= rank:
+                return self.bounds[i] if i < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        buckets, acc = {}, 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            buckets["+Inf" if i == len(self.bounds) else str(self.bounds[i])] = acc
+
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "avg": round(self.total / self.count, 3) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class LatencyRegistry:
+    """按 {路由: {阶段: 直方图}} 聚合耗时"""
+
+    def __init__(self):
+        self._data: defaultdict[str, dict[str, LatencyHistogram]] = defaultdict(dict)
+
+    def observe(self, route: str, stage: str, value_ms: float) -> None:
+        hist = self._data[route].get(stage)
+        if hist is None:
+            hist = self._data[route][stage] = LatencyHistogram()
+        hist.observe(value_ms)
+
+    def snapshot(self, route: str = None) -> dict:
+        routes = [route] if route else list(self._data)
+        return {
+            r: {stage: h.snapshot() for stage, h in self._data[r].items()}
+            for r in routes
+            if r in self._data
+        }
+
+    def reset(self) -> None:
+        self._data.clear()
+
+
+class HitRegistry:
+    """按名称聚合缓存命中/未命中次数（单 worker）"""
+
+    def __init__(self):
+        self._data: defaultdict[str, list[int]] = defaultdict(lambda: [0, 0])
+
+    def hit(self, name: str) -> None:
+        self._data[name][0] += 1
+
+    def miss(self, name: str) -> None:
+        self._data[name][1] += 1
+
+    def snapshot(self, name: str = None) -> dict:
+        names = [name] if name else list(self._data)
+        ret = {}
+        for n in names:
+            if n not in self._data:
+                continue
+            hits, misses = self._data[n]
+            ret[n] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        return ret
+
+    def reset(self) -> None:
+        self._data.clear()
+
+
+mw_latency = LatencyRegistry()
+# 接口内部并发查询阶段耗时（按 {StageRunner.name: {阶段: 直方图}} 聚合）
+stage_latency = LatencyRegistry()
+# 进程内近端缓存命中率（按 CacheKey 名称聚合）
+near_cache_hits = HitRegistry()
@@ -1,13 +1,178 @@
-import json
+from time import perf_counter
+
 import itsdangerous
 
-from starlette.concurrency import iterate_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.authentication import AuthenticationMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from ulid import ULID
-from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
 
 
+from app.config import settings
+from app.core.http_handler import APP_CODE_STATE_KEY
 from app.core.loggers import app_logger
+from app.core.metrics import mw_latency
+from app.middlewares.jwt_auth import JwtAuthMiddleware
+
+
+MW_TIMING_STATE_KEY = "mw_timing"
+# 未匹配到路由（404、扫描请求等）的请求统一归入该标签，避免按原始路径无限增长
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestLogMiddleware:
+    """
+    请求日志中间件（纯 ASGI）
+
+    - 解析真实 IP 写入 request.state.real_ip
+    - 响应头追加 X-Request-Id
+    - 业务 code 取自 scope["state"]（由 CodeJSONResponse 写入），响应体原样透传，不缓存、不解析
+    """
+
+    SKIP_RESP_LOG_PATHS = {"/docs", "/redoc", "/openapi.json"}
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @staticmethod
+    def get_real_ip(scope: Scope) -> str | None:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()  # 取第一个IP
+
+        client = scope.get("client")
+        return client[0] if client else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = str(ULID())
+        path = scope["path"]
+        real_ip = self.get_real_ip(scope)
+
+        # 将IP存入请求状态
+        state = scope.setdefault("state", {})
+        state["real_ip"] = real_ip
+
+        log_info = f"{scope['method']} {path} {real_ip} {request_id}"
+        if query_string := scope.get("query_string"):
+            log_info += f" | {query_string.decode('latin-1')}"
+        app_logger.info(log_info)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-Id", request_id)
+
+                if path not in self.SKIP_RESP_LOG_PATHS:
+                    code = state.get(APP_CODE_STATE_KEY, message["status"])
+                    app_logger.info(f"RESPONSE: {request_id} {code} {path}")
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class RequestTiming:
+    """单个请求的中间件分层耗时"""
+
+    __slots__ = ("start", "entered", "durations", "last_dispatch", "finished")
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.entered: dict[str, float] = {}
+        self.durations: dict[str, float] = {}
+        self.last_dispatch: float | None = None
+        self.finished = False
+
+    def enter(self, name: str) -> None:
+        self.entered[name] = perf_counter()
+
+    def dispatch(self, name: str) -> None:
+        now = perf_counter()
+        self.durations[name] = now - self.entered.pop(name, now)
+        self.last_dispatch = now
+
+    def finish(self) -> None:
+        """响应开始时结算：未向内调用的层（如认证失败直接返回）记到响应开始为止"""
+        if self.finished:
+            return
+        self.finished = True
+
+        now = perf_counter()
+        for name, t in self.entered.items():
+            self.durations[name] = now - t
+        if not self.entered and self.last_dispatch is not None:
+            self.durations["app"] = now - self.last_dispatch
+        self.durations["total"] = now - self.start
+
+    def header_value(self) -> str:
+        return ", ".join(f"{name};dur={d * 1000:.3f}" for name, d in self.durations.items())
+
+
+class LayerTimer:
+    """
+    中间件耗时包装（纯 ASGI）
+
+    记录被包装的中间件从进入到调用下一层之间的耗时，即该层在请求阶段的自身开销
+    """
+
+    def __init__(self, app: ASGIApp, *, name: str, layer: type, **options) -> None:
+        self.name = name
+        self.app = layer(self._dispatched(app), **options)
+
+    def _dispatched(self, app: ASGIApp) -> ASGIApp:
+        name = self.name
+
+        async def call_next(scope: Scope, receive: Receive, send: Send) -> None:
+            timing: RequestTiming | None = scope.get("state", {}).get(MW_TIMING_STATE_KEY)
+            if timing is not None:
+                timing.dispatch(name)
+            await app(scope, receive, send)
+
+        return call_next
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        timing: RequestTiming | None = scope.get("state", {}).get(MW_TIMING_STATE_KEY)
+        if timing is not None:
+            timing.enter(self.name)
+        await self.app(scope, receive, send)
+
+
+class ServerTimingMiddleware:
+    """
+    最外层耗时统计中间件（纯 ASGI）
+
+    响应头输出 Server-Timing，并按路由模板聚合到进程内直方图 `mw_latency`
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        scope.setdefault("state", {})[MW_TIMING_STATE_KEY] = timing
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                timing.finish()
+                MutableHeaders(scope=message).append("Server-Timing", timing.header_value())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            timing.finish()
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            for name, d in timing.durations.items():
+                mw_latency.observe(route, name, d * 1000)
 
 
 def register_middleware(app):
@@ -51,35 +216,38 @@ def register_middleware(app):
 
     #     return response
 
-    @app.middleware("http")
-    async def request_log_middleware(request, call_next):
-        request_id = str(ULID())
-        log_info = f"{request.method} {request.url.path} {request.state.real_ip} {request_id}"
-        if request.query_params:
-            log_info += f" | {request.query_params}"
-        app_logger.info(log_info)
-
-        response = await call_next(request)
-        response.headers["X-Request-Id"] = request_id
-
-        if request.url.path not in {"/docs", "/redoc", "/openapi.json"}:
-            response_body = [chunk async for chunk in response.body_iterator]
-            response.body_iterator = iterate_in_threadpool(iter(response_body))
-
-            body = json.loads(response_body[0].decode())
-            code = body.get("code", response.status_code)
-            app_logger.info(f"RESPONSE: {request_id} {code} {request.url.path}")
-        return response
-
-    @app.middleware("http")
-    async def real_ip_middleware(request: Request, call_next):
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            client_ip = forwarded_for.split(",")[0]  # 取第一个IP
+    # 中间件栈（由外到内），全部为纯 ASGI 实现
+    stack = [("log", RequestLogMiddleware, {})]
+    if settings.CORS_ALLOWED_ORIGINS:
+        stack.append(
+            (
+                "cors",
+                CORSMiddleware,
+                {
+                    "allow_origins": settings.CORS_ALLOWED_ORIGINS,
+                    "allow_credentials": True,
+                    "allow_methods": ["*"],
+                    "allow_headers": ["*"],
+                },
+            )
+        )
+    stack.append(
+        (
+            "auth",
+            AuthenticationMiddleware,
+            {
+                "backend": JwtAuthMiddleware(),
+                "on_error": JwtAuthMiddleware.auth_exception_handler,
+            },
+        )
+    )
+
+    # add_middleware 每次插入到最外层，故由内向外注册
+    for name, layer, options in reversed(stack):
+        if settings.ENABLE_MW_TIMING:
+            app.add_middleware(LayerTimer, name=name, layer=layer, **options)
         else:
-            client_ip = request.client.host
+            app.add_middleware(layer, **options)
 
-        # 将IP存入请求状态
-        request.state.real_ip = client_ip
-        response = await call_next(request)
-        return response
+    if settings.ENABLE_MW_TIMING:
+        app.add_middleware(ServerTimingMiddleware)
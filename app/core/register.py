@@ -5,7 +5,6 @@ from fastapi.exceptions import RequestValidationError
 from fastapi import FastAPI
 from slowapi.errors import RateLimitExceeded
 import socketio
-from starlette.middleware.authentication import AuthenticationMiddleware
 from fastapi.openapi.utils import get_openapi
 
 from app.config import settings
@@ -15,9 +14,12 @@ from app.core.loggers import app_logger
 from app.core.middleware import register_middleware
 from app.database.db import init_async_engine_and_session
 from app.ext import crypt
+from app.ext.jwt import jwt_manager
 from app.database import redis_client
-from app.middlewares.jwt_auth import JwtAuthMiddleware
+from app.middlewares.route_auth import route_auth_table
 from app.routers import register_all_routes
+from app.services.cache.near import near_cache
+from app.services.remind import RemindWheelService
 
 
 @asynccontextmanager
@@ -30,9 +32,14 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """
     init_async_engine_and_session(settings.DB_MAIN_URL)
     await redis_client.init(enable_redis_socket=settings.ENABLE_SOCKET)
+    jwt_manager.local_cache.listen()
+    near_cache.listen()
+    remind_wheel = RemindWheelService.start()
 
     yield
 
+    if remind_wheel:
+        remind_wheel.cancel()
     await redis_client.aclose()
 
 
@@ -89,14 +96,12 @@ def custom_openapi(app: FastAPI):
 def register_all(app: FastAPI):
     register_route(app)
     register_ext(app)
-    app.add_middleware(
-        AuthenticationMiddleware,
-        backend=JwtAuthMiddleware(),
-        on_error=JwtAuthMiddleware.auth_exception_handler,
-    )
     app.openapi_schema = custom_openapi(app)
     register_middleware(app)
     register_exc_handler(app)
 
     if settings.ENABLE_SOCKET:
         register_socket_app(app)
+
+    # 路由注册完成后预计算鉴权分类
+    route_auth_table.build(app.routes)
@@ -1,7 +1,8 @@
+import asyncio
 from dataclasses import dataclass
 import sys
 import traceback
-from typing import Any
+from typing import Any, Callable
 
 from redis.asyncio import StrictRedis
 from redis.exceptions import AuthenticationError, TimeoutError
@@ -38,11 +39,126 @@ end
 """
 
 
+# 计数字段存在时自增（结果小于 0 时置 0），并把成员加入脏集合
+# KEYS[1]: 计数 hash  KEYS[2]: 脏集合  ARGV[1]: field  ARGV[2]: 增量  ARGV[3]: 脏集合成员
+LUA_HINCR_IF_EXISTS_MARK = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+  return nil
+end
+local cnt = redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+if cnt < 0 then
+  redis.call('HSET', KEYS[1], ARGV[1], 0)
+  cnt = 0
+end
+redis.call('SADD', KEYS[2], ARGV[3])
+return cnt
+"""
+
+
+# 弹出到期成员：取出 score <= ARGV[1] 的成员并删除，多个消费者并发执行时每个成员只会被一个取到
+# KEYS[1]: zset key  ARGV[1]: 最大 score  ARGV[2]: 最多取出数量  返回成员列表
+LUA_ZPOP_BY_SCORE = """
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #members > 0 then
+  redis.call('ZREM', KEYS[1], unpack(members))
+end
+return members
+"""
+
+
+# KEYS[1]: token key  KEYS[2]: 用户 token 索引（zset，member=jti，score=过期时间戳）
+# ARGV[1]: value  ARGV[2]: 过期秒数  ARGV[3]: jti  ARGV[4]: 当前时间戳
+LUA_TOKEN_ADD = """
+local ex = tonumber(ARGV[2])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ex)
+redis.call('ZADD', KEYS[2], tonumber(ARGV[4]) + ex, ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[4])
+if redis.call('TTL', KEYS[2]) < ex then
+  redis.call('EXPIRE', KEYS[2], ex)
+end
+return 1
+"""
+
+
+# KEYS[1]: token key  KEYS[2]: 用户 token 索引  ARGV[1]: jti
+LUA_TOKEN_DELETE = """
+redis.call('ZREM', KEYS[2], ARGV[1])
+return redis.call('DEL', KEYS[1])
+"""
+
+
+# KEYS[1]: 用户 token 索引  ARGV[1]: token key 前缀（不含 jti）  ARGV[2]: 保留的 jti，可为空
+LUA_TOKEN_DELETE_ALL = """
+local jtis = redis.call('ZRANGE', KEYS[1], 0, -1)
+local n = 0
+for _, jti in ipairs(jtis) do
+  if jti ~= ARGV[2] then
+    n = n + redis.call('DEL', ARGV[1] .. jti)
+    redis.call('ZREM', KEYS[1], jti)
+  end
+end
+return n
+"""
+
+
+# 刷新令牌轮换：校验旧 refresh token -> 吊销旧令牌（单点登录时吊销全部） -> 写入新令牌
+# GET 与 DEL 在同一脚本内执行，同一 refresh token 并发重放时只有一个请求能成功
+# KEYS[1]: 旧 refresh key  KEYS[2]: 旧 access key  KEYS[3]: refresh 索引  KEYS[4]: access 索引
+# KEYS[5]: 新 access key  KEYS[6]: 新 refresh key
+# ARGV[1]: user_id  ARGV[2]: 旧 jti  ARGV[3]: 新 jti  ARGV[4]: access value  ARGV[5]: access 过期秒数
+# ARGV[6]: refresh value  ARGV[7]: refresh 过期秒数  ARGV[8]: 当前时间戳  ARGV[9]: 是否单点登录 1/0
+# ARGV[10]: access key 前缀  ARGV[11]: refresh key 前缀
+LUA_TOKEN_ROTATE = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+  return 0
+end
+
+local now = tonumber(ARGV[8])
+
+local function revoke(index_key, prefix, jti)
+  redis.call('DEL', prefix .. jti)
+  redis.call('ZREM', index_key, jti)
+end
+
+local function revoke_all(index_key, prefix)
+  for _, jti in ipairs(redis.call('ZRANGE', index_key, 0, -1)) do
+    revoke(index_key, prefix, jti)
+  end
+end
+
+local function issue(key, index_key, value, ex, jti)
+  redis.call('SET', key, value, 'EX', ex)
+  redis.call('ZADD', index_key, now + ex, jti)
+  redis.call('ZREMRANGEBYSCORE', index_key, '-inf', now)
+  if redis.call('TTL', index_key) < ex then
+    redis.call('EXPIRE', index_key, ex)
+  end
+end
+
+revoke(KEYS[3], ARGV[11], ARGV[2])
+revoke(KEYS[4], ARGV[10], ARGV[2])
+if ARGV[9] == '1' then
+  revoke_all(KEYS[3], ARGV[11])
+  revoke_all(KEYS[4], ARGV[10])
+end
+
+issue(KEYS[5], KEYS[4], ARGV[4], tonumber(ARGV[5]), ARGV[3])
+issue(KEYS[6], KEYS[3], ARGV[6], tonumber(ARGV[7]), ARGV[3])
+return 1
+"""
+
+
 @dataclass
 class Script:
     hincr_if_exists: callable = None
+    hincr_if_exists_mark: callable = None
     incr_if_exists: callable = None
     hset_if_exists: callable = None
+    zpop_by_score: callable = None
+    token_add: callable = None
+    token_delete: callable = None
+    token_delete_all: callable = None
+    token_rotate: callable = None
 
 
 class RedisX:
@@ -55,6 +171,7 @@ class RedisX:
         self.prefix = prefix
         self._redis_client: StrictRedis | None = None
         self.script = Script()
+        self._listeners: list[asyncio.Task] = []
 
     async def init_app(self, **kwargs):
         kwargs.update(decode_responses=True)
@@ -89,8 +206,14 @@ class RedisX:
 
     def register_scripts(self):
         self.script.hincr_if_exists = self.client.register_script(LUA_HINCR_IF_EXISTS)
+        self.script.hincr_if_exists_mark = self.client.register_script(LUA_HINCR_IF_EXISTS_MARK)
         self.script.incr_if_exists = self.client.register_script(LUA_INCR_IF_EXISTS)
         self.script.hset_if_exists = self.client.register_script(LUA_HSET_IF_EXISTS)
+        self.script.zpop_by_score = self.client.register_script(LUA_ZPOP_BY_SCORE)
+        self.script.token_add = self.client.register_script(LUA_TOKEN_ADD)
+        self.script.token_delete = self.client.register_script(LUA_TOKEN_DELETE)
+        self.script.token_delete_all = self.client.register_script(LUA_TOKEN_DELETE_ALL)
+        self.script.token_rotate = self.client.register_script(LUA_TOKEN_ROTATE)
 
     def lock(self, name, expire=None, id=None, signal_expire=1000, auto_renewal=False):
         return redis_lock.Lock(
@@ -115,9 +238,46 @@ class RedisX:
             app_logger.info(f"初始化 {self.prefix} 成功")
 
     async def aclose(self) -> None:
+        for task in self._listeners:
+            task.cancel()
+        self._listeners.clear()
+
         if self.client:
             await self.client.aclose()
 
+    def subscribe(self, channel: str, handler: Callable[[str], Any]) -> asyncio.Task:
+        """
+        后台订阅频道，每条消息回调 handler(data)，连接异常时自动重连
+
+        :param channel: 频道名
+        :param handler: 消息回调，同步函数
+        :return: 后台任务，aclose 时自动取消
+        """
+        task = asyncio.create_task(self._listen(channel, handler))
+        self._listeners.append(task)
+        return task
+
+    async def _listen(self, channel: str, handler: Callable[[str], Any], retry_interval=1):
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(channel)
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if not message or message["type"] != "message":
+                        continue
+                    try:
+                        handler(message["data"])
+                    except Exception as e:
+                        app_logger.error(f"redis 订阅消息处理失败 {channel} {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                app_logger.error(f"redis 订阅异常 {channel} {e}")
+                await asyncio.sleep(retry_interval)
+            finally:
+                await pubsub.aclose()
+
     @contextmanager
     def acquire_lock(
         self,
@@ -166,7 +326,7 @@ class RedisX:
         :param prefix: 前缀
         :return:
         """
-        keys = await self.scan_uk(f"{prefix}*")
+        keys = [key async for key in self.scan_uk(f"{prefix}*")]
         if keys:
             return await self.client.delete(*keys)
         return 0
@@ -1,5 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
+from time import monotonic
 from typing import Literal, Any
 import uuid
 from fastapi.security.utils import get_authorization_scheme_param
@@ -11,7 +12,11 @@ from fastapi import FastAPI, Request
 from app.config import settings
 from app.core.app_code import AppCode
 from app.core.exception import AuthException
+from app.core.loggers import app_logger
+from app.database import pms_cache
 from app.services.cache.user import JWTTokenCache
+from app.utils.common import hash_token
+from app.utils.lru import TTLLRUCache
 
 
 @dataclass
@@ -31,6 +36,8 @@ class JWTConfig:
     COOKIE_REFRESH_TOKEN_KEY: str = settings.COOKIE_REFRESH_TOKEN_KEY
     AC_TOKEN_KEY: str = "access"
     RF_TOKEN_KEY: str = "refresh"
+    LOCAL_CACHE_SIZE: int = settings.TOKEN_LOCAL_CACHE_SIZE
+    LOCAL_CACHE_WINDOW: int = settings.TOKEN_LOCAL_CACHE_WINDOW
 
 
 class TokenUserInfo(BaseModel):
@@ -59,25 +66,87 @@ class RespLoginSchema:
     expire_in: int
 
 
+@dataclass
+class VerifiedToken:
+    payload: TokenData
+    userinfo: TokenUserInfo
+    cached_at: float = field(default_factory=monotonic)
+
+
+class VerifiedTokenCache:
+    """
+    已验证 access token 的进程内缓存（每个 worker 一份）
+
+    - key 为 token 摘要，value 为解码后的 TokenData 和 TokenUserInfo
+    - 有效期取 token 剩余有效期与吊销窗口的较小值
+    - 吊销通过 redis pub/sub 广播，各 worker 收到后立即失效；消息丢失时最迟在吊销窗口后失效
+    """
+
+    CHANNEL = f"{settings.APP_NAME}:jwt_revoke"
+    ALL_JTI = "*"
+
+    def __init__(self, maxsize: int, window: int):
+        self.window = window
+        self._cache = TTLLRUCache(maxsize, window)
+        # 吊销标记只需保留一个吊销窗口：更早缓存的条目已自然过期
+        self._revoked_jti = TTLLRUCache(maxsize, window)  # (user_id, jti) -> revoked_at
+        self._revoked_user = TTLLRUCache(maxsize, window)  # user_id -> revoked_at
+
+    def get(self, token: str) -> VerifiedToken | None:
+        digest = hash_token(token)
+        item: VerifiedToken | None = self._cache.get(digest)
+        if item is None:
+            return None
+
+        uid, jti = item.payload.user_id, item.payload.jti
+        if (uid, jti) in self._revoked_jti or self._revoked_user.get(uid, 0) >= item.cached_at:
+            self._cache.pop(digest)
+            return None
+        return item
+
+    def set(self, token: str, payload: TokenData, userinfo: TokenUserInfo) -> None:
+        ttl = min(self.window, (payload.expire - datetime.now(timezone.utc)).total_seconds())
+        self._cache.set(hash_token(token), VerifiedToken(payload, userinfo), ttl)
+
+    def evict(self, user_id: int, jti: str = None) -> None:
+        """本地失效，jti 为空时失效该用户全部令牌"""
+        if jti is None or jti == self.ALL_JTI:
+            self._revoked_user.set(user_id, monotonic())
+        else:
+            self._revoked_jti.set((user_id, jti), monotonic())
+
+    async def revoke(self, user_id: int | str, jti: str = None) -> None:
+        """失效本地缓存并广播到所有 worker"""
+        user_id = int(user_id)
+        self.evict(user_id, jti)
+        try:
+            await pms_cache.publish(self.CHANNEL, f"{user_id}:{jti or self.ALL_JTI}")
+        except Exception as e:
+            app_logger.error(f"token 吊销广播失败 {user_id} {jti} {e}")
+
+    def on_message(self, data: str) -> None:
+        user_id, jti = data.split(":", 1)
+        self.evict(int(user_id), jti)
+
+    def listen(self) -> None:
+        """订阅吊销广播，应用启动时调用"""
+        pms_cache.subscribe(self.CHANNEL, self.on_message)
+
+
 class JWTManager:
     def __init__(self, app: FastAPI = None):
         self.config = JWTConfig()
+        self.local_cache = VerifiedTokenCache(
+            self.config.LOCAL_CACHE_SIZE, self.config.LOCAL_CACHE_WINDOW
+        )
 
-    async def create_access_token(
-        self,
-        sub: str,
-        multi_login: bool,
-        userinfo: TokenUserInfo,
-        additional_claims: dict[str, Any] = None,
+    def encode_access_token(
+        self, sub: str, additional_claims: dict[str, Any] = None
     ) -> AccessToken:
-        """创建访问令牌"""
-        if not isinstance(sub, str):
-            sub = str(sub)
-
+        """签发访问令牌（不写缓存）"""
         now = datetime.now(timezone.utc)
         expire = now + timedelta(seconds=self.config.ACCESS_TOKEN_EXPIRE)
         jti = str(uuid.uuid4())
-        flg = self.config.AC_TOKEN_KEY
         payload = {
             "iat": now,
             "sub": sub,
@@ -85,21 +154,54 @@ class JWTManager:
             "jti": jti,
             "alg": self.config.ALGORITHM,
             "typ": "JWT",
-            "flg": flg,
+            "flg": self.config.AC_TOKEN_KEY,
         }
         if additional_claims:
             payload.update(additional_claims)
 
         encoded_jwt = jwt.encode(payload, self.config.SECRET_KEY, algorithm=self.config.ALGORITHM)
+        return AccessToken(token=encoded_jwt, jti=jti, expire_in=expire)
+
+    def encode_refresh_token(self, sub: str, jti: str) -> RefreshToken:
+        """签发刷新令牌（不写缓存）"""
+        now = datetime.now(timezone.utc)
+        expire = now + timedelta(seconds=self.config.REFRESH_TOKEN_EXPIRE)
+        payload = {
+            "iat": now,
+            "sub": sub,
+            "exp": expire,
+            "jti": jti,
+            "alg": self.config.ALGORITHM,
+            "typ": "JWT",
+            "flg": self.config.RF_TOKEN_KEY,
+        }
+
+        encoded_jwt = jwt.encode(payload, self.config.SECRET_KEY, algorithm=self.config.ALGORITHM)
+        return RefreshToken(token=encoded_jwt, expire_in=expire)
+
+    async def create_access_token(
+        self,
+        sub: str,
+        multi_login: bool,
+        userinfo: TokenUserInfo,
+        additional_claims: dict[str, Any] = None,
+    ) -> AccessToken:
+        """创建访问令牌"""
+        if not isinstance(sub, str):
+            sub = str(sub)
+
+        flg = self.config.AC_TOKEN_KEY
+        access_token = self.encode_access_token(sub, additional_claims)
 
         if not multi_login:
-            await JWTTokenCache(flg, sub, "").delete_prefix()
+            await JWTTokenCache(flg, sub, "").delete_all()
+            await self.local_cache.revoke(sub)
 
-        await JWTTokenCache(flg, sub, jti).add(
+        await JWTTokenCache(flg, sub, access_token.jti).add(
             userinfo.model_dump_json(), self.config.ACCESS_TOKEN_EXPIRE
         )
 
-        return AccessToken(token=encoded_jwt, jti=jti, expire_in=expire)
+        return access_token
 
     async def create_refresh_token(
         self,
@@ -108,28 +210,15 @@ class JWTManager:
         multi_login: bool,
     ) -> RefreshToken:
         """创建刷新令牌"""
-
-        now = datetime.now(timezone.utc)
-        expire = now + timedelta(seconds=self.config.REFRESH_TOKEN_EXPIRE)
         flg = self.config.RF_TOKEN_KEY
-        payload = {
-            "iat": now,
-            "sub": sub,
-            "exp": expire,
-            "jti": jti,
-            "alg": self.config.ALGORITHM,
-            "typ": "JWT",
-            "flg": flg,
-        }
-
-        encoded_jwt = jwt.encode(payload, self.config.SECRET_KEY, algorithm=self.config.ALGORITHM)
+        refresh_token = self.encode_refresh_token(sub, jti)
 
         if not multi_login:
-            await JWTTokenCache(flg, sub, "").delete_prefix()
+            await JWTTokenCache(flg, sub, "").delete_all()
 
         await JWTTokenCache(flg, sub, jti).add(sub, self.config.REFRESH_TOKEN_EXPIRE)
 
-        return RefreshToken(token=encoded_jwt, expire_in=expire)
+        return refresh_token
 
     def verify_token(self, token: str, verify_exp=True) -> TokenData:
         """验证令牌并返回payload"""
@@ -171,28 +260,55 @@ class JWTManager:
             raise AuthException("Invalid token", code=AppCode.AUTH_INVALID, errmsg="token无效")
         return TokenUserInfo.model_validate_json(token_cache)
 
+    async def authenticate(self, token: str, verify_exp=True) -> TokenUserInfo:
+        """
+        校验 access token 并加载用户信息，优先命中进程内缓存
+
+        :param verify_exp: 是否校验过期时间，不校验时不走缓存
+        :return:
+        """
+        if verify_exp and (cached := self.local_cache.get(token)):
+            return cached.userinfo
+
+        payload = self.verify_token(token, verify_exp=verify_exp)
+        userinfo = await self.load_from_cache(payload.user_id, payload.jti, payload.flg)
+        if verify_exp:
+            self.local_cache.set(token, payload, userinfo)
+        return userinfo
+
+    async def revoke_access_token(self, user_id: int, jti: str) -> None:
+        """删除 access token 并广播失效各 worker 的本地缓存"""
+        await JWTTokenCache(self.config.AC_TOKEN_KEY, user_id, jti).delete()
+        await self.local_cache.revoke(user_id, jti)
+
     async def refresh_access_token(
         self, refresh_token: str, multi_login: bool, userinfo: TokenUserInfo
     ) -> tuple[AccessToken, RefreshToken]:
-        """使用刷新令牌获取新的访问令牌"""
+        """使用刷新令牌获取新的访问令牌，校验、吊销、签发在一次 redis 脚本调用中完成"""
         token_obj = self.verify_token(refresh_token)
         if not token_obj or token_obj.flg != self.config.RF_TOKEN_KEY:
             raise AuthException("Invalid token", code=AppCode.AUTH_INVALID, errmsg="token无效")
 
-        token_cache = JWTTokenCache(self.config.RF_TOKEN_KEY, token_obj.user_id, token_obj.jti)
-        user_id = await token_cache.get()
-        if not user_id or int(user_id) != token_obj.user_id:
+        user_id = str(token_obj.user_id)
+        access_token = self.encode_access_token(user_id)
+        new_refresh_token = self.encode_refresh_token(user_id, access_token.jti)
+
+        rotated = await JWTTokenCache.rotate(
+            user_id,
+            token_obj.jti,
+            access_token.jti,
+            userinfo.model_dump_json(),
+            self.config.ACCESS_TOKEN_EXPIRE,
+            self.config.REFRESH_TOKEN_EXPIRE,
+            multi_login,
+        )
+        if not rotated:
+            # 已被使用（并发重放）或已吊销
             raise AuthException("Invalid token", code=AppCode.AUTH_INVALID, errmsg="token无效")
 
-        await token_cache.delete()
-        await JWTTokenCache(self.config.AC_TOKEN_KEY, token_obj.user_id, token_obj.jti).delete()
-
-        access_token: AccessToken = await self.create_access_token(user_id, multi_login, userinfo)
-        refresh_token: RefreshToken = await self.create_refresh_token(
-            user_id, access_token.jti, multi_login
-        )
+        await self.local_cache.revoke(user_id, None if not multi_login else token_obj.jti)
 
-        return access_token, refresh_token
+        return access_token, new_refresh_token
 
     async def get_token(self, request: Request, verify=False, verify_exp=True) -> TokenData | str:
         """
@@ -3,11 +3,11 @@ from fastapi.security.utils import get_authorization_scheme_param
 from starlette.authentication import AuthCredentials, AuthenticationBackend, AuthenticationError
 from fastapi import Request
 
-from app.config import settings
 from app.core.app_code import AppCode
 from app.core.exception import AuthException
 from app.core.http_handler import make_json_response, make_response
 from app.ext.jwt import TokenUserInfo, jwt_manager
+from app.middlewares.route_auth import ROUTE_AUTH_STATE_KEY, RouteAuth, route_auth_table
 
 
 class _AuthenticationError(AuthenticationError):
@@ -48,21 +48,16 @@ class JwtAuthMiddleware(AuthenticationBackend):
         return make_json_response(exc.msg, code=exc.code, errmsg=exc.errmsg)
 
     @staticmethod
-    async def jwt_authentication(token: str, request) -> TokenUserInfo:
+    async def jwt_authentication(token: str, verify_exp: bool = True) -> TokenUserInfo:
         """
         JWT 认证
 
         :param token: JWT token
+        :param verify_exp: 是否校验过期时间（刷新 token 接口不校验）
         :return:
         """
         try:
-            token_payload = jwt_manager.verify_token(
-                token, verify_exp=request.url.path != "/v1/auth/refresh"
-            )
-            user_id = token_payload.user_id
-            userinfo = await jwt_manager.load_from_cache(
-                user_id, token_payload.jti, token_payload.flg
-            )
+            userinfo = await jwt_manager.authenticate(token, verify_exp=verify_exp)
             if not userinfo:
                 raise _AuthenticationError(
                     code=AppCode.AUTH_INVALID, msg="token expired", errmsg="登录状态已过期"
@@ -84,23 +79,24 @@ class JwtAuthMiddleware(AuthenticationBackend):
         :return:
         """
 
-        token = request.headers.get("Authorization")
-        path = request.url.path
+        route_auth = route_auth_table.lookup(request.url.path)
+        request.scope.setdefault("state", {})[ROUTE_AUTH_STATE_KEY] = route_auth
 
-        if not token:
+        # 白名单或未注册的路径，不解析 token
+        if route_auth is None or route_auth is RouteAuth.PUBLIC:
             return
 
-        if path in settings.WHITE_ROUTE_LIST:
+        token = request.headers.get("Authorization")
+        if not token:
             return
-        for pattern in settings.WHITE_ROUTE_PATTERN:
-            if pattern.match(path):
-                return
 
         scheme, token = get_authorization_scheme_param(token)
         if scheme.lower() != "bearer":
             return
 
-        user = await self.jwt_authentication(token, request)
+        user = await self.jwt_authentication(
+            token, verify_exp=route_auth is not RouteAuth.REFRESH_ONLY
+        )
 
         return AuthCredentials(["authenticated"]), user
 
@@ -0,0 +1,117 @@
+from enum import IntEnum
+from typing import Iterable
+
+from starlette.routing import BaseRoute, Mount
+
+from app.config import settings
+
+
+ROUTE_AUTH_STATE_KEY = "route_auth"
+
+# 仅允许使用过期 access token 的路由（刷新 token 时只校验签名）
+REFRESH_ONLY_ROUTES = {f"{settings.FASTAPI_API_V1_PATH}/auth/refresh"}
+
+
+class RouteAuth(IntEnum):
+    PUBLIC = 0  # 白名单，不解析 token
+    AUTHENTICATED = 1  # 解析并校验 token
+    REFRESH_ONLY = 2  # 解析 token，但不校验过期时间
+
+
+class _Node:
+    __slots__ = ("children", "param", "rest", "auth")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.param: _Node | None = None  # {xx} 路径参数段
+        self.rest: RouteAuth | None = None  # {xx:path} 或 Mount，匹配剩余全部路径
+        self.auth: RouteAuth | None = None
+
+
+class RouteAuthTable:
+    """
+    路由鉴权分类表
+
+    启动时根据已注册的路由模板预先计算每个路由的鉴权类型：
+    - 无路径参数的路由存入 dict，O(1) 查找
+    - 含路径参数的路由按路径段建前缀树，查找只做 dict 访问，不跑正则
+    未注册的路径返回 None，鉴权中间件不再解析 token，直接交给路由返回 404
+    """
+
+    def __init__(self):
+        self._static: dict[str, RouteAuth] = {}
+        self._root = _Node()
+
+    @staticmethod
+    def classify(path: str) -> RouteAuth:
+        if path in settings.WHITE_ROUTE_LIST:
+            return RouteAuth.PUBLIC
+        for pattern in settings.WHITE_ROUTE_PATTERN:
+            if pattern.match(path):
+                return RouteAuth.PUBLIC
+        if path in REFRESH_ONLY_ROUTES:
+            return RouteAuth.REFRESH_ONLY
+        return RouteAuth.AUTHENTICATED
+
+    def build(self, routes: Iterable[BaseRoute], prefix: str = "") -> None:
+        for route in routes:
+            path = prefix + getattr(route, "path", "")
+            if isinstance(route, Mount):
+                if route.routes:
+                    self.build(route.routes, path)
+                else:
+                    self._add(path, self.classify(path), rest=True)
+                continue
+            self._add(path, self.classify(path))
+
+        # 白名单中未注册为路由的路径（如 docs 关闭时）同样视为公开
+        for path in settings.WHITE_ROUTE_LIST:
+            self._static.setdefault(path, RouteAuth.PUBLIC)
+
+    def _add(self, path: str, auth: RouteAuth, rest: bool = False) -> None:
+        if "{" not in path and not rest:
+            self._static[path] = auth
+            return
+
+        node = self._root
+        for seg in path.strip("/").split("/"):
+            if not seg:
+                continue
+            if seg.startswith("{") and seg.endswith(":path}"):
+                rest = True
+                break
+            if "{" in seg:
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+            else:
+                node = node.children.setdefault(seg, _Node())
+
+        if rest:
+            node.rest = auth
+        else:
+            node.auth = auth
+
+    def lookup(self, path: str) -> RouteAuth | None:
+        auth = self._static.get(path)
+        if auth is not None:
+            return auth
+        return self._walk(self._root, path.strip("/").split("/"), 0)
+
+    def _walk(self, node: _Node, segs: list[str], i: int) -> RouteAuth | None:
+        if i == len(segs):
+            return node.auth if node.auth is not None else node.rest
+
+        child = node.children.get(segs[i])
+        if child is not None:
+            auth = self._walk(child, segs, i + 1)
+            if auth is not None:
+                return auth
+        if node.param is not None and segs[i]:
+            auth = self._walk(node.param, segs, i + 1)
+            if auth is not None:
+                return auth
+        return node.rest
+
+
+route_auth_table = RouteAuthTable()
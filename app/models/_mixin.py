@@ -1,3 +1,4 @@
+from dataclasses import dataclass, field
 from typing import Any, Generic, List, Dict, Union, Literal, Sequence, Mapping
 import time
 
@@ -15,6 +16,9 @@ from sqlalchemy import (
     SmallInteger,
     update,
     TIMESTAMP,
+    cast,
+    column,
+    values as sa_values,
 )
 from sqlalchemy.orm import joinedload, defer, selectinload, declared_attr, exc, relationship
 from sqlalchemy.dialects.postgresql import insert
@@ -23,6 +27,18 @@ from fastapi import HTTPException
 from app.core.types import Model
 
 
+# asyncpg 单条语句绑定参数上限为 32767，预留部分给 onupdate 等额外参数
+MAX_BIND_PARAMS = 32000
+# batch_create 自动使用 COPY 的最小行数（行数较少时多行 INSERT 更快）
+COPY_MIN_ROWS = 200
+
+
+@dataclass
+class BatchUpdateResult:
+    matched: list = field(default_factory=list)
+    unmatched: list = field(default_factory=list)
+
+
 class BaseMixin(Generic[Model]):
     def __init__(self, model: type[Model]):
         self.model = model
@@ -79,35 +95,167 @@ class BaseMixin(Generic[Model]):
         await self.save(session, instance, commit=commit)
         return instance
 
-    async def batch_create(self, session: AsyncSession, data: List[Dict], commit=True):
+    def _fill_defaults(self, data: List[Dict]) -> List[Dict]:
+        """补齐 Python 端默认值（如 ULID 主键）；server_default 字段未传时交给数据库"""
+        defaults = [
+            (c.name, c.default.arg)
+            for c in self.model.__table__.columns
+            if c.default is not None and not c.default.is_sequence
+        ]
+        rows = []
+        for row in data:
+            row = dict(row)
+            for name, arg in defaults:
+                if name not in row:
+                    row[name] = arg(None) if callable(arg) else arg
+            rows.append(row)
+        return rows
+
+    async def _copy_rows(self, session: AsyncSession, names: tuple, rows: List[Dict]) -> int:
+        """asyncpg COPY 写入（与 session 同一连接、同一事务）"""
+        table = self.model.__table__
+        conn = await session.connection()
+        driver_conn = (await conn.get_raw_connection()).driver_connection
+
+        cols = [table.c[n] for n in names]
+        # 复用 SQLAlchemy 方言层的绑定处理（JSON 序列化等），与 INSERT 路径写入的数据一致
+        dialect = conn.dialect
+        procs = [c.type.dialect_impl(dialect).bind_processor(dialect) for c in cols]
+        records = [
+            tuple(proc(row[n]) if proc else row[n] for n, proc in zip(names, procs)) for row in rows
+        ]
+        await driver_conn.copy_records_to_table(
+            table.name, records=records, columns=list(names), schema_name=table.schema
+        )
+        return len(records)
+
+    async def batch_create(
+        self,
+        session: AsyncSession,
+        data: List[Dict],
+        commit=True,
+        returning: Sequence = None,
+        use_copy: bool = None,
+    ):
+        """
+        批量插入
+
+        - 行数达到 COPY_MIN_ROWS 时走 asyncpg COPY（copy_records_to_table），否则走多行 INSERT
+        - 需要 returning 或非 asyncpg 驱动时走多行 INSERT（按绑定参数上限分片）
+        - Python 端默认值（ULID 主键等）在写入前补齐；未传的 server_default 字段由数据库生成
+        - 各行字段不一致时按字段集合分组写入
+
+        :param returning: 返回字段，如 (Model.id,)
+        :param use_copy: 强制是否使用 COPY，None 时按行数自动选择
+        :return: 有 returning 时返回行列表，否则返回插入行数
+        """
         if not data:
-            return 0
-        ret = await session.run_sync(lambda s: s.bulk_insert_mappings(self.model, data))
-        await session.flush()
-        if commit:
-            await session.commit()
+            return [] if returning else 0
+
+        groups: dict[tuple, list[dict]] = {}
+        for row in self._fill_defaults(data):
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        conn = await session.connection()
+        if use_copy is None:
+            use_copy = len(data) >= COPY_MIN_ROWS
+        use_copy = use_copy and not returning and conn.dialect.driver == "asyncpg"
+
+        ret = [] if returning else 0
+        try:
+            await session.flush()
+            for names, rows in groups.items():
+                if use_copy:
+                    ret += await self._copy_rows(session, names, rows)
+                    continue
+                size = self.chunk_rows(len(names))
+                for i in range(0, len(rows), size):
+                    stmt = insert(self.model).values(rows[i : i + size])
+                    if returning:
+                        ret.extend((await session.execute(stmt.returning(*returning))).all())
+                    else:
+                        ret += (await session.execute(stmt)).rowcount
+            if commit:
+                await session.commit()
+        except Exception as e:
+            await session.rollback()
+            raise e
 
         return ret
 
+    @staticmethod
+    def chunk_rows(ncols: int) -> int:
+        """单条语句最多容纳的行数，保证绑定参数数量低于 asyncpg/Postgres 上限"""
+        return max(1, MAX_BIND_PARAMS // max(ncols, 1))
+
     async def batch_update(
         self,
         session: AsyncSession,
         values: List[Dict],
         commit=True,
         handle_unmatch: Literal["raise", "abort", "ignore"] = "abort",
-    ):
-        try:
-            await session.run_sync(lambda s: s.bulk_update_mappings(self.model, values))
-            await session.flush()
-            if commit:
-                await session.commit()
-        except exc.StaleDataError as e:
+    ) -> BatchUpdateResult:
+        """
+        批量更新（按主键）
+
+        每个分片一条语句：UPDATE t SET c = v.c FROM (VALUES ...) AS v WHERE t.pk = v.pk RETURNING t.pk；
+        字段不一致的行按字段集合分组，分组内按绑定参数上限自动分片
+
+        :param values: 每行须包含全部主键字段
+        :param handle_unmatch: 存在未匹配的主键时：raise 抛出 StaleDataError，abort 返回 404，ignore 忽略；
+            raise/abort 会回滚本次更新
+        :return: 匹配/未匹配的主键
+        """
+        result = BatchUpdateResult()
+        if not values:
+            return result
+
+        table = self.model.__table__
+        pk_cols = list(table.primary_key.columns)
+        pk_names = [c.name for c in pk_cols]
+
+        groups: dict[tuple, list[dict]] = {}
+        for row in values:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        for names, rows in groups.items():
+            set_names = [n for n in names if n not in pk_names]
+            if not set_names:
+                continue
+            cols = [table.c[n] for n in pk_names + set_names]
+
+            for i in range(0, len(rows), self.chunk_rows(len(cols))):
+                chunk = rows[i : i + self.chunk_rows(len(cols))]
+                v = sa_values(*(column(c.name, c.type) for c in cols), name="v").data(
+                    [tuple(row[c.name] for c in cols) for row in chunk]
+                )
+                stmt = (
+                    update(table)
+                    # 某列在分片内全为 NULL 时 VALUES 推断为 text，显式转换为目标列类型
+                    .values({n: cast(v.c[n], table.c[n].type) for n in set_names})
+                    .where(*(table.c[n] == v.c[n] for n in pk_names))
+                    .returning(*pk_cols)
+                )
+                matched = {tuple(r) for r in (await session.execute(stmt)).all()}
+                for row in chunk:
+                    pk = tuple(row[n] for n in pk_names)
+                    (result.matched if pk in matched else result.unmatched).append(
+                        pk[0] if len(pk) == 1 else pk
+                    )
+
+        if result.unmatched and handle_unmatch != "ignore":
+            await session.rollback()
             if handle_unmatch == "raise":
-                raise e
-            elif handle_unmatch == "abort":
-                raise HTTPException(404, detail="批量更新失败，数据不存在！")
-            else:
-                pass
+                raise exc.StaleDataError(
+                    f"{table.name}: expected to update {len(values)} rows, "
+                    f"{len(result.matched)} matched"
+                )
+            raise HTTPException(404, detail="批量更新失败，数据不存在！")
+
+        await session.flush()
+        if commit:
+            await session.commit()
+        return result
 
     async def update(
         self, session: AsyncSession, instance: Model, data: dict, commit=True, **kwargs
@@ -155,27 +303,26 @@ class BaseMixin(Generic[Model]):
     ):
         if returning is not None and not isinstance(data, (Mapping, Sequence)):
             returning = None
+        if returning is not None and not isinstance(returning, Sequence):
+            returning = (returning,)
+
+        def build(values):
+            stmt = (
+                insert(self.model)
+                .values(values)
+                .on_conflict_do_nothing(constraint, index_elements, index_where)
+            )
+            return stmt.returning(*returning) if returning else stmt
 
-        stmt = (
-            insert(self.model)
-            .values(data)
-            .on_conflict_do_nothing(constraint, index_elements, index_where)
-        )
-        if returning:
-            if isinstance(returning, Sequence):
-                stmt = stmt.returning(*returning)
-            else:
-                stmt = stmt.returning(returning)
-
-        ret = await session.execute(stmt)
-        if returning:
-            if isinstance(data, Mapping):
+        if isinstance(data, Mapping):
+            ret = await session.execute(build(data))
+            if returning:
                 ret = ret.first()
                 ret = ret and ret[0]
             else:
-                ret = ret.all()
+                ret = ret.rowcount
         else:
-            ret = ret.rowcount
+            ret = await self._execute_chunks(session, data, build, returning)
 
         await session.flush()
         if commit:
@@ -196,7 +343,8 @@ class BaseMixin(Generic[Model]):
     ):
         """
         :param session:
-        :param data: 更新数据字典，支持批量插入，若为批量插入，每条记录的key必须一致，不能缺失
+        :param data: 更新数据字典，支持批量插入，若为批量插入，每条记录的key必须一致，不能缺失；
+            批量数据超过绑定参数上限时自动分片执行
         :param constraint: 唯一约束
         :param index_elements: 唯一约束, `constraint` 和 `index_elements`只能传递其中一个参数
         :param index_where: 更细粒度控制唯一约束，当满足唯一约束和index_where条件的才会触发更新
@@ -204,35 +352,37 @@ class BaseMixin(Generic[Model]):
         :param _set: 存在时更新的字段值
         :param returning: 返回值
         :param commit:
-        :return: 若有returning且插入单个记录，返回对应属性；否则返回rowcount
+        :return: 若有returning且插入单个记录，返回对应属性；批量插入返回各分片合并后的行列表；
+            否则返回rowcount（各分片之和）
         """
         try:
             if isinstance(data, Mapping):
-                stmt = insert(self.model).values(**data)
                 set_ = data if not _set else _set
             else:
-                stmt = insert(self.model).values(data)
-                set_ = {c: getattr(stmt.excluded, c) for c in data[0].keys()} if not _set else _set
-
-            do_update_stmt = stmt.on_conflict_do_update(
-                constraint=constraint,
-                index_elements=index_elements,
-                index_where=index_where,
-                set_=set_,
-                where=where,
-            )
-            if returning:
-                do_update_stmt = do_update_stmt.returning(*returning)
+                set_ = _set
+
+            def build(values):
+                stmt = insert(self.model).values(values)
+                do_update_stmt = stmt.on_conflict_do_update(
+                    constraint=constraint,
+                    index_elements=index_elements,
+                    index_where=index_where,
+                    set_=set_ or {c: getattr(stmt.excluded, c) for c in data[0].keys()},
+                    where=where,
+                )
+                if returning:
+                    do_update_stmt = do_update_stmt.returning(*returning)
+                return do_update_stmt
 
-            ret = await session.execute(do_update_stmt)
-            if returning:
-                if isinstance(data, Mapping):
+            if isinstance(data, Mapping):
+                ret = await session.execute(build(data))
+                if returning:
                     ret = ret.first()
                     ret = ret and ret[0]
                 else:
-                    ret = ret.all()
+                    ret = ret.rowcount
             else:
-                ret = ret.rowcount
+                ret = await self._execute_chunks(session, data, build, returning)
 
             await session.flush()
             if commit:
@@ -244,6 +394,30 @@ class BaseMixin(Generic[Model]):
             await session.rollback()
             raise e
 
+    async def _execute_chunks(
+        self, session: AsyncSession, data: Sequence[Mapping], build, returning
+    ) -> Union[list, int]:
+        """
+        多行 INSERT 按绑定参数上限分片，在同一事务内依次执行，合并 RETURNING 结果与 rowcount
+
+        同一连接上的语句只能串行执行，分片间不做并发
+        """
+        if not data:
+            return [] if returning else 0
+
+        # 未传入但有 Python 端默认值的字段，多行 INSERT 中每行同样占用绑定参数
+        names = {k for row in data for k in row.keys()}
+        names |= {c.name for c in self.model.__table__.columns if c.default is not None}
+        size = self.chunk_rows(len(names))
+        ret = [] if returning else 0
+        for i in range(0, len(data), size):
+            result = await session.execute(build(data[i : i + size]))
+            if returning:
+                ret.extend(result.all())
+            else:
+                ret += result.rowcount
+        return ret
+
     @classmethod
     async def execute_sql(
         cls, session: AsyncSession, sql: str, *, params: dict = None, query_one: bool = False
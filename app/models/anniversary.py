@@ -80,6 +80,17 @@ class AnniversaryMemberModel(ULIDModel, TSModel):
     joined_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
 
+class AnnivVisibilityModel(Base):
+    """纪念日可见性（由 anniversary / anniversary_member / share_group_member 派生的冗余表）"""
+
+    __tablename__ = "anniversary_visibility"
+    __table_args__ = (Index("ix_anniversary_visibility_anniv_id", "anniv_id"),)
+
+    user_id = Column(BigInteger, primary_key=True, comment="可见用户ID")
+    anniv_id = Column(String(32), primary_key=True, comment="纪念日ID")
+    via = Column(SmallInteger, primary_key=True, comment="可见来源 AnnivVisibleVia")
+
+
 class AnniversaryTag(Base):
     """纪念日标签"""
 
@@ -112,6 +123,12 @@ class ReminderSlot(ULIDModel, TSModel):
     __tablename__ = "reminder_slot"
     __table_args__ = (
         UniqueConstraint("rule_id", "offset_days", "trigger_time", name="uq_reminder_slot_dedup"),
+        # 提醒分发按 next_trigger_at 认领到期 slot；已结束（NULL）的 slot 不进入索引
+        Index(
+            "ix_reminder_slot_next_trigger_at",
+            "next_trigger_at",
+            postgresql_where=text("next_trigger_at IS NOT NULL"),
+        ),
     )
 
     rule_id = Column(String(32), comment="提醒规则ID")
@@ -0,0 +1,108 @@
+from typing import Iterable
+
+from sqlalchemy import BigInteger, cast, delete, literal, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constant import AnnivVisibleVia
+from app.models._mixin import BaseMixin
+from app.models.anniversary import AnniversaryMemberModel, AnniversaryModel, AnnivVisibilityModel
+from app.models.user import ShareGroupMemberModel
+
+
+class AnnivVisibilityRepo(BaseMixin[AnnivVisibilityModel]):
+    """
+    纪念日可见性冗余表维护
+
+    数据来源：
+    - 归属者：anniversary.owner_id
+    - 共享成员：anniversary_member(ttype=2)
+    - 共享组成员：anniversary_member(ttype=1) join share_group_member
+
+    源数据变更后按纪念日或按用户整体重算（先删后插），不做增量加减，保证与源表一致
+    """
+
+    COLS = ("user_id", "anniv_id", "via")
+
+    @staticmethod
+    def _source_stmt(user_ids: list[int] = None, anniv_ids: list[str] = None):
+        am, sgm = AnniversaryMemberModel, ShareGroupMemberModel
+
+        owner = select(
+            AnniversaryModel.owner_id,
+            AnniversaryModel.id,
+            literal(int(AnnivVisibleVia.OWNER)),
+        )
+        member = select(
+            cast(am.tid, BigInteger),
+            am.anniv_id,
+            literal(int(AnnivVisibleVia.MEMBER)),
+        ).where(am.ttype == 2, am.tid.regexp_match(r"^\d+$"))
+        group = (
+            select(sgm.user_id, am.anniv_id, literal(int(AnnivVisibleVia.GROUP)))
+            .select_from(am)
+            .join(sgm, sgm.group_id == am.tid)
+            .where(am.ttype == 1)
+        )
+
+        if user_ids is not None:
+            owner = owner.where(AnniversaryModel.owner_id.in_(user_ids))
+            member = member.where(am.tid.in_([str(i) for i in user_ids]))
+            group = group.where(sgm.user_id.in_(user_ids))
+        if anniv_ids is not None:
+            owner = owner.where(AnniversaryModel.id.in_(anniv_ids))
+            member = member.where(am.anniv_id.in_(anniv_ids))
+            group = group.where(am.anniv_id.in_(anniv_ids))
+
+        return union_all(owner, member, group)
+
+    async def _refill(self, session: AsyncSession, *cond, commit: bool, **source_filter) -> int:
+        await session.execute(delete(self.model).where(*cond))
+        ret = await session.execute(
+            insert(self.model)
+            .from_select(self.COLS, self._source_stmt(**source_filter))
+            .on_conflict_do_nothing()
+        )
+        await session.flush()
+        if commit:
+            await session.commit()
+        return ret.rowcount
+
+    async def refresh_annivs(
+        self, session: AsyncSession, anniv_ids: Iterable[str], commit=False
+    ) -> int:
+        """纪念日成员变更后重算这些纪念日的可见用户"""
+        anniv_ids = list(set(anniv_ids))
+        if not anniv_ids:
+            return 0
+        return await self._refill(
+            session, self.model.anniv_id.in_(anniv_ids), commit=commit, anniv_ids=anniv_ids
+        )
+
+    async def refresh_users(
+        self, session: AsyncSession, user_ids: Iterable[int], commit=False
+    ) -> int:
+        """用户加入/退出共享组后重算这些用户可见的纪念日"""
+        user_ids = list({int(i) for i in user_ids})
+        if not user_ids:
+            return 0
+        return await self._refill(
+            session, self.model.user_id.in_(user_ids), commit=commit, user_ids=user_ids
+        )
+
+    async def list_user_ids(self, session: AsyncSession, anniv_ids: Iterable[str]) -> list[int]:
+        """可见这些纪念日的全部用户"""
+        anniv_ids = list(set(anniv_ids))
+        if not anniv_ids:
+            return []
+        ret = await session.execute(
+            select(self.model.user_id).where(self.model.anniv_id.in_(anniv_ids)).distinct()
+        )
+        return ret.scalars().all()
+
+    async def rebuild(self, session: AsyncSession, commit=True) -> int:
+        """全量重建（回填历史数据 / 修复不一致）"""
+        return await self._refill(session, commit=commit)
+
+
+anniv_visibility_repo = AnnivVisibilityRepo(AnnivVisibilityModel)
@@ -1,27 +1,45 @@
+import asyncio
 from collections import defaultdict
+from datetime import datetime
 from typing import List, Literal
 from redis import retry
-from sqlalchemy import BigInteger, and_, cast, delete, exists, or_, select
+from sqlalchemy import (
+    BigInteger,
+    and_,
+    cast,
+    delete,
+    exists,
+    literal_column,
+    or_,
+    select,
+    true,
+    type_coerce,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from sqlalchemy.sql import func, case
 from ulid import ULID
 
-from app.constant import AnniversaryType, RepeatType
+from app.constant import AnniversaryType, AnnivVisibleVia, RepeatType
+from app.core.exception import ValidateError
 from app.models._mixin import BaseMixin
 from app.models.anniversary import (
     AnnivMediaModel,
     AnniversaryModel,
     AnniversaryMemberModel,
     AnniversaryTag,
+    AnnivVisibilityModel,
     ReminderRule,
     ReminderSlot,
 )
 from app.models.base import StateModel
 from app.models.sys import MediaModel
 from app.models.tags import TagModel
+from app.repo.anniv_visibility import anniv_visibility_repo
+from app.repo.loader import get_loaders
 from app.repo.media import media_repo
 from app.repo.tags import tag_repo
-from app.repo.user import share_group_repo, user_repo
 from app.schemas.anniversary import (
     AnnivMemberSchema,
     CreateTagSchema,
@@ -29,16 +47,19 @@ from app.schemas.anniversary import (
     RemindRuleSchema,
 )
 from app.schemas.common import UpdateMediaSchema
+from app.services.cache.remind import RemindWheelCache
 from app.utils.common import diff_sequence_data, parse_sort_str
 from app.utils.dater import DT
-from app.utils.paginator import CursorPaginatedResponse, ScrollPaginator
+from app.utils.paginator import CursorPaginatedResponse, KeysetPaginator, ScrollPaginator
 
 
 class AnnivMemberRepo(BaseMixin[AnniversaryMemberModel]):
     async def batch_add(self, session, data: list[dict], commit=True):
         ret = await self.insert_do_update(
-            session, data, constraint="uq_anniversary_member_anniv_idttypetid", commit=commit
+            session, data, constraint="uq_anniversary_member_anniv_idttypetid", commit=False
         )
+        await anniv_visibility_repo.refresh_annivs(session, [i["anniv_id"] for i in data])
+        commit and await session.commit()
         return ret
 
     async def list_anniv_member(self, session, anniv_id: str) -> AnnivMemberSchema:
@@ -52,12 +73,14 @@ class AnnivMemberRepo(BaseMixin[AnniversaryMemberModel]):
             elif i.ttype == 2:  # member
                 uids.append(i.tid)
 
+        loaders = get_loaders(session)
+        groups, users = await asyncio.gather(
+            loaders.groups.load_many(gids), loaders.users.load_many(uids)
+        )
         if gids:
-            ret.groups = await share_group_repo.list(session, group_id=gids)
+            ret.groups = list(groups.values())
         if uids:
-            ret.users = await user_repo.list_by_uid(
-                session, uids, only_cols=user_repo.BASE_USER_COLS
-            )
+            ret.users = list(users.values())
 
         return ret
 
@@ -67,34 +90,20 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
         item = await self.create(session, data, commit=commit)
         return item
 
-    async def get_share_stmt(self, session, cur_user_id, anniv_ids: List[str] | str = None):
-        exist_cond = []
-        if anniv_ids:
-            if isinstance(anniv_ids, str):
-                exist_cond.append(AnniversaryMemberModel.anniv_id == anniv_ids)
-            else:
-                exist_cond.append(AnniversaryMemberModel.anniv_id.in_(anniv_ids))
-
-        share_group_ids = await share_group_repo.list_me_joined_group_ids(session, cur_user_id)
-        where_stmt_member = and_(
-            AnniversaryMemberModel.ttype == 2, AnniversaryMemberModel.tid == str(cur_user_id)
-        )
+    def visible_cond(self, cur_user_id: int):
+        """
+        当前用户可见：归属者，或共享模式下的共享成员/共享组成员
 
-        if share_group_ids:
-            where_stmt_group = and_(
-                AnniversaryMemberModel.ttype == 1, AnniversaryMemberModel.tid.in_(share_group_ids)
-            )
-            exist_cond.append(
-                or_(
-                    where_stmt_member,
-                    where_stmt_group,
-                )
+        基于 anniversary_visibility 主键 (user_id, anniv_id, via) 的关联子查询，无需预先查询用户所在组
+        """
+        visibility = AnnivVisibilityModel
+        return exists(
+            select(1).where(
+                visibility.user_id == cur_user_id,
+                visibility.anniv_id == self.model.id,
+                or_(visibility.via == AnnivVisibleVia.OWNER, self.model.share_mode == 1),
             )
-        else:
-            exist_cond.append(where_stmt_member)
-
-        member_or_group_exists = exists(select(1).where(*exist_cond))
-        return member_or_group_exists
+        )
 
     async def retrieve_or_404(self, session, anniv_id: str, user_id: int = None):
         cond = [self.model.state == 1, self.model.id == anniv_id]
@@ -134,20 +143,64 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
 
         cond = [self.model.state == 1, self.model.id == anniv_id]
         if include_share:
-            member_or_group_exists = await self.get_share_stmt(session, user_id, anniv_ids=anniv_id)
-            cond.append(
-                or_(
-                    self.model.owner_id == user_id,
-                    and_(self.model.share_mode == 1, member_or_group_exists),
-                )
-            )
+            cond.append(self.visible_cond(user_id))
 
             item = await self.first_or_404(session, *cond)
             return item
 
+    def relation_columns(self):
+        """
+        纪念日的标签、媒体聚合为 jsonb 数组（关联子查询），与纪念日在同一条语句中返回
+
+        子查询不参与排序，Postgres 会在 LIMIT 之后才计算，只作用于当前页
+        """
+        empty = literal_column("'[]'::jsonb")
+        tags = (
+            select(
+                func.coalesce(
+                    func.jsonb_agg(
+                        func.jsonb_build_object("id", TagModel.id, "name", TagModel.name)
+                    ),
+                    empty,
+                )
+            )
+            .select_from(AnniversaryTag)
+            .join(TagModel, TagModel.id == AnniversaryTag.tag_id)
+            .where(AnniversaryTag.anniv_id == self.model.id, TagModel.state == 1)
+            .scalar_subquery()
+        )
+        medias = (
+            select(
+                func.coalesce(
+                    func.jsonb_agg(
+                        func.jsonb_build_object(
+                            "id",
+                            MediaModel.id,
+                            "type",
+                            MediaModel.type,
+                            "path",
+                            MediaModel.path,
+                            "utime",
+                            MediaModel.utime,
+                        )
+                    ),
+                    empty,
+                )
+            )
+            .select_from(AnnivMediaModel)
+            .join(MediaModel, MediaModel.id == AnnivMediaModel.media_id)
+            .where(AnnivMediaModel.anniv_id == self.model.id)
+            .scalar_subquery()
+        )
+        return type_coerce(tags, JSONB).label("tags"), type_coerce(medias, JSONB).label("medias")
+
     async def list_feed(
-        self, session: AsyncSession, cur_user_id: int, params: QueryAnnivSchema
-    ) -> CursorPaginatedResponse[AnniversaryModel]:
+        self,
+        session: AsyncSession,
+        cur_user_id: int,
+        params: QueryAnnivSchema,
+        with_relations: bool = False,
+    ) -> CursorPaginatedResponse[AnniversaryModel] | CursorPaginatedResponse[tuple]:
         """list feeds, include:
         owner + share member + share group
 
@@ -155,9 +208,8 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
             session (_type_): _description_
             cur_user_id (int): _description_
             params (QueryAnnivSchema): _description_
+            with_relations (bool): 一并返回聚合后的标签、媒体，items 为 (纪念日, tags, medias)
         """
-        now = DT.now_time()
-
         cond = [self.model.state == 1]
         if params.event_year:
             cond.append(self.model.event_year == params.event_year)
@@ -168,38 +220,45 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
         if params.name:
             cond.append(self.model.name.ilike(f"%{params.name}%"))
 
-        if params.order_by == "default":
-            orders = (
-                case((self.model.next_trigger_at < now, 1), else_=0).label("is_past").asc(),
-                case(
-                    (self.model.next_trigger_at >= now, self.model.next_trigger_at), else_=None
-                ).asc(),
-                case(
-                    (self.model.next_trigger_at < now, self.model.next_trigger_at), else_=None
-                ).desc(),
-            )
-        else:
-            orders = (
-                getattr(getattr(self.model, col), sort)() for col, sort in params.order_by.items()
-            )
+        columns = [self.model, *self.relation_columns()] if with_relations else [self.model]
+        stmt = select(*columns).where(*cond, self.visible_cond(cur_user_id))
 
-        member_or_group_exists = await self.get_share_stmt(session, cur_user_id)
+        try:
+            _, ctx = KeysetPaginator.decode_cursor(params.last)
+            now = datetime.fromisoformat(ctx["now"]) if ctx.get("now") else DT.now_time()
+            if now.tzinfo is None:
+                raise ValueError("naive cursor time")
+        except (ValueError, TypeError):
+            raise ValidateError("invalid cursor", errmsg="分页参数错误")
 
-        stmt = (
-            select(self.model)
-            .where(
-                *cond,
-                or_(
-                    self.model.owner_id == cur_user_id,
-                    and_(self.model.share_mode == 1, member_or_group_exists),
-                ),
+        if params.order_by == "default":
+            # 即将到来的在前（由近到远），已过去的在后（由近到远）；
+            # 以首页查询时刻为分界并写入游标，翻页期间分界不变
+            ctx = {"now": now.isoformat()}
+            is_past = self.model.next_trigger_at < now
+            keys = [
+                (case((is_past, 1), else_=0), False),
+                (case((~is_past, self.model.next_trigger_at), else_=None), False),
+                (case((is_past, self.model.next_trigger_at), else_=None), True),
+                (self.model.id, True),
+            ]
+        else:
+            ctx = None
+            keys = []
+            for col, sort in (params.order_by or {}).items():
+                column = self.model.__table__.columns.get(col)
+                if column is None or column.nullable or sort not in ("asc", "desc"):
+                    raise ValidateError(f"invalid order_by: {col}.{sort}", errmsg="排序参数错误")
+                keys.append((getattr(self.model, col), sort == "desc"))
+            if "id" not in (params.order_by or {}):
+                keys.append((self.model.id, True))
+
+        try:
+            return await KeysetPaginator(session, stmt, keys).paginate(
+                params.last, params.limit, max_limit=200, ctx=ctx
             )
-            .order_by(*orders, self.model.id.desc())
-        )
-
-        query = (await session.execute(stmt)).scalars().all()
-
-        return CursorPaginatedResponse(last=0, has_more=False, items=query)
+        except ValueError:
+            raise ValidateError("invalid cursor", errmsg="分页参数错误")
 
     async def get_anniv_by_id(self, session, ids: List[int]):
         stmt = select(self.model).where(self.model.state == 1, self.model.id.in_(ids))
@@ -223,17 +282,13 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
 
     async def get_next(self, session, cur_user_id: int, days=45):
         now = DT.now_time()
-        member_or_group_exists = await self.get_share_stmt(session, cur_user_id)
         stmt = (
             select(self.model)
             .where(
                 self.model.state == 1,
                 self.model.next_trigger_at >= now,
                 self.model.next_trigger_at <= DT.after_n_day(days),
-                or_(
-                    self.model.owner_id == cur_user_id,
-                    and_(self.model.share_mode == 1, member_or_group_exists),
-                ),
+                self.visible_cond(cur_user_id),
             )
             .order_by(self.model.next_trigger_at)
             .limit(3)
@@ -242,15 +297,62 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
         result = await session.execute(stmt)
         return result.scalars().all()
 
+    async def get_dashboard_stat(
+        self, session, cur_user_id: int, year: int, days=45, limit=3
+    ) -> tuple[int, int, list[AnniversaryModel]]:
+        """
+        首页统计单条 SQL：年度总数、共享数、近期纪念日
+
+        visible CTE 只做一次可见性判断，年度总数/共享数用 FILTER 聚合，近期纪念日 LEFT JOIN 到聚合行上
+
+        :return: (year_total, share_total, next_annivs)
+        """
+        m = self.model
+        now = DT.now_time()
+        visible = select(m).where(m.state == 1, self.visible_cond(cur_user_id)).cte("visible")
+        v = visible.c
+
+        agg = select(
+            func.count()
+            .filter(
+                v.owner_id == cur_user_id,
+                or_(
+                    and_(
+                        v.next_trigger_at >= DT.str2date(f"{year}-01-01"),
+                        v.next_trigger_at <= DT.str2date(f"{year}-12-31"),
+                    ),
+                    v.type == AnniversaryType.BIRTHDAY,
+                ),
+            )
+            .label("year_total"),
+            func.count().filter(v.share_mode == 1).label("share_total"),
+        ).cte("agg")
+
+        upcoming = (
+            select(visible)
+            .where(v.next_trigger_at >= now, v.next_trigger_at <= DT.after_n_day(days))
+            .order_by(v.next_trigger_at)
+            .limit(limit)
+            .subquery("upcoming")
+        )
+        next_anniv = aliased(m, upcoming)
+
+        stmt = (
+            select(agg.c.year_total, agg.c.share_total, next_anniv)
+            .select_from(agg)
+            .outerjoin(upcoming, true())
+            .order_by(upcoming.c.next_trigger_at)
+        )
+        rows = (await session.execute(stmt)).all()
+        if not rows:
+            return 0, 0, []
+        return rows[0].year_total, rows[0].share_total, [r[2] for r in rows if r[2] is not None]
+
     async def get_share_cnt(self, session, cur_user_id: int):
-        member_or_group_exists = await self.get_share_stmt(session, cur_user_id)
         stmt = select(func.count(self.model.id)).where(
             self.model.state == 1,
             self.model.share_mode == 1,
-            or_(
-                self.model.owner_id == cur_user_id,
-                and_(self.model.share_mode == 1, member_or_group_exists),
-            ),
+            self.visible_cond(cur_user_id),
         )
         ret = await session.execute(stmt)
         return ret.scalar() or 0
@@ -264,7 +366,7 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
         tag_ids = {i.id for i in tags if i.id} | {i["id"] for i in new_tags}
 
         to_add_data = [{"anniv_id": anniv_id, "tag_id": tid} for tid in tag_ids]
-        await session.run_sync(lambda s: s.bulk_insert_mappings(AnniversaryTag, to_add_data))
+        await anniv_tag_repo.batch_create(session, to_add_data, commit=False)
 
         commit and await session.commit()
 
@@ -292,9 +394,7 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
             )
             if new_tag:
                 to_add_data = [{"anniv_id": anniv_id, "tag_id": i["id"]} for i in new_tag]
-                await session.run_sync(
-                    lambda s: s.bulk_insert_mappings(AnnivMediaModel, to_add_data)
-                )
+                await anniv_tag_repo.batch_create(session, to_add_data, commit=False)
 
         commit and await session.commit()
 
@@ -322,7 +422,7 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
         media_ids = {i.id for i in media if i.id} | {i["id"] for i in new_media}
 
         to_add_data = [{"anniv_id": anniv_id, "media_id": tid} for tid in media_ids]
-        await session.run_sync(lambda s: s.bulk_insert_mappings(AnnivMediaModel, to_add_data))
+        await anniv_media_repo.batch_create(session, to_add_data, commit=False)
 
         commit and await session.commit()
 
@@ -350,9 +450,7 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
             new_media = await media_repo.edit(session, [i for i in media if not i.id], commit=False)
             if new_media:
                 to_add_data = [{"anniv_id": anniv_id, "media_id": i["id"]} for i in new_media]
-                await session.run_sync(
-                    lambda s: s.bulk_insert_mappings(AnnivMediaModel, to_add_data)
-                )
+                await anniv_media_repo.batch_create(session, to_add_data, commit=False)
 
         commit and await session.commit()
 
@@ -383,6 +481,45 @@ class AnnivRepo(BaseMixin[AnniversaryModel]):
     async def batch_edit(self, session, data: list):
         return await self.batch_update(session, data, handle_unmatch="ignore")
 
+    async def lock_expired_repeating(
+        self, session: AsyncSession, now: datetime, after_id: str | None, limit: int
+    ):
+        """
+        按 id 键集分页锁定 next_trigger_at 已过期的重复纪念日，附带重新计算所需的字段；
+        列名与 RemindRepo.claim_due 一致（offset_days=0，trigger_time 为纪念日时间），可共用计算逻辑
+
+        FOR UPDATE SKIP LOCKED：跳过正在被编辑的行，避免用旧日期覆盖用户刚修改的 next_trigger_at
+        """
+        anniv = self.model
+        stmt = (
+            select(
+                anniv.id,
+                literal_column("0").label("offset_days"),
+                func.coalesce(anniv.event_time, literal_column("'00:00'::time")).label(
+                    "trigger_time"
+                ),
+                anniv.event_date,
+                anniv.tz,
+                anniv.repeat_type,
+                anniv.calendar_type,
+                anniv.lunar_year,
+                anniv.lunar_month,
+                anniv.lunar_day,
+                anniv.lunar_is_leap,
+            )
+            .where(
+                anniv.state == 1,
+                anniv.repeat_type != RepeatType.NONE,
+                anniv.next_trigger_at < now,
+            )
+            .order_by(anniv.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        if after_id:
+            stmt = stmt.where(anniv.id > after_id)
+        return (await session.execute(stmt)).all()
+
 
 class RemindRepo(BaseMixin[ReminderRule]):
     async def add(
@@ -410,6 +547,12 @@ class RemindRepo(BaseMixin[ReminderRule]):
 
             rules.append(rule)
         session.add_all(rules)
+        await session.flush()
+
+        # 近期触发的 slot 写入时间轮（事务未提交时被弹出会因查不到而跳过，由兜底扫描补发）
+        await RemindWheelCache().schedule(
+            (slot.id, slot.next_trigger_at) for rule in rules for slot in rule.slots
+        )
 
         commit and await session.commit()
         return rules
@@ -422,14 +565,104 @@ class RemindRepo(BaseMixin[ReminderRule]):
         data: RemindRuleSchema,
         commit=True,
     ):
+        old_slot_ids = (
+            await session.scalars(
+                select(ReminderSlot.id)
+                .join(ReminderRule, ReminderRule.id == ReminderSlot.rule_id)
+                .where(ReminderRule.anniv_id == anniv_id)
+            )
+        ).all()
         result = await session.execute(self.filter(self.model.anniv_id == anniv_id))
         for rule in result.scalars():
             await session.delete(rule)
+        # 先执行删除：同一次 flush 中 INSERT 先于 DELETE，会与 (anniv_id, user_id) 唯一约束冲突
+        await session.flush()
 
         await self.add(session, anniv_id, user_ids, data, commit=False)
+        await RemindWheelCache().delete(*old_slot_ids)
         commit and await session.commit()
 
+    async def list_upcoming(self, session: AsyncSession, until: datetime):
+        """next_trigger_at <= until 的 slot：(id, next_trigger_at)"""
+        stmt = select(ReminderSlot.id, ReminderSlot.next_trigger_at).where(
+            ReminderSlot.next_trigger_at.is_not(None), ReminderSlot.next_trigger_at <= until
+        )
+        return (await session.execute(stmt)).all()
+
+    async def claim_due(
+        self, session: AsyncSession, now: datetime, limit: int, slot_ids: list[str] = None
+    ):
+        """
+        认领到期的提醒 slot（next_trigger_at <= now），附带分发和推进所需的规则、纪念日字段
+
+        FOR UPDATE OF reminder_slot SKIP LOCKED：多个 worker 并发认领时跳过彼此已锁定的行，
+        行锁持续到调用方提交事务，期间须推进 next_trigger_at，避免提交后被再次认领。
+        规则已停用、纪念日已删除的 slot 同样返回（enabled=False），由调用方置空 next_trigger_at
+
+        :param slot_ids: 只认领指定的 slot（时间轮弹出的成员）
+        """
+        stmt = (
+            self._slot_stmt()
+            .where(ReminderSlot.next_trigger_at.is_not(None), ReminderSlot.next_trigger_at <= now)
+            .order_by(ReminderSlot.next_trigger_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=ReminderSlot)
+        )
+        if slot_ids is not None:
+            stmt = stmt.where(ReminderSlot.id.in_(slot_ids))
+        return (await session.execute(stmt)).all()
+
+    async def lock_expired_slots(
+        self, session: AsyncSession, before: datetime, after_id: str | None, limit: int
+    ):
+        """
+        按 id 键集分页锁定 next_trigger_at < before 的 slot，字段同 claim_due
+
+        与分发并发时 SKIP LOCKED 跳过分发中的行
+        """
+        stmt = (
+            self._slot_stmt()
+            .where(ReminderSlot.next_trigger_at.is_not(None), ReminderSlot.next_trigger_at < before)
+            .order_by(ReminderSlot.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=ReminderSlot)
+        )
+        if after_id:
+            stmt = stmt.where(ReminderSlot.id > after_id)
+        return (await session.execute(stmt)).all()
+
+    @staticmethod
+    def _slot_stmt():
+        """slot 附带分发和推进所需的规则、纪念日字段"""
+        anniv = AnniversaryModel
+        return (
+            select(
+                ReminderSlot.id,
+                ReminderSlot.offset_days,
+                ReminderSlot.trigger_time,
+                ReminderSlot.next_trigger_at,
+                ReminderRule.user_id,
+                ReminderRule.channels,
+                and_(ReminderRule.enabled.is_(True), anniv.state == 1).label("enabled"),
+                anniv.id.label("anniv_id"),
+                anniv.name,
+                anniv.event_date,
+                anniv.tz,
+                anniv.repeat_type,
+                anniv.calendar_type,
+                anniv.lunar_year,
+                anniv.lunar_month,
+                anniv.lunar_day,
+                anniv.lunar_is_leap,
+            )
+            .join(ReminderRule, ReminderRule.id == ReminderSlot.rule_id)
+            .join(anniv, anniv.id == ReminderRule.anniv_id)
+        )
+
 
 anniv_member_repo = AnnivMemberRepo(AnniversaryMemberModel)
 anniv_repo = AnnivRepo(AnniversaryModel)
 remind_repo = RemindRepo(ReminderRule)
+anniv_tag_repo = BaseMixin(AnniversaryTag)
+anniv_media_repo = BaseMixin(AnnivMediaModel)
+reminder_slot_repo = BaseMixin(ReminderSlot)
@@ -0,0 +1,142 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, Hashable, Iterable, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.anniversary import AnniversaryModel
+from app.models.user import ShareGroupModel, User
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+LOADERS_KEY = "loaders"
+
+
+class DataLoader(Generic[K, V]):
+    """
+    批量加载器
+
+    同一事件循环 tick 内发起的 load 合并为一次 batch_fn(keys) 调用（一条 IN 查询），
+    结果在 loader 生命周期内缓存，同一 key 只查询一次。不存在的 key 返回 None
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[list[K]], Awaitable[dict[K, V]]],
+        key_fn: Callable[[Any], K] = None,
+        max_batch: int = 1000,
+    ):
+        """
+        :param batch_fn: 接收 key 列表，返回 {key: value}
+        :param key_fn: key 归一化，如 tid 字符串转 int
+        :param max_batch: 单次查询的最大 key 数量
+        """
+        self._batch_fn = batch_fn
+        self._key_fn = key_fn
+        self._max_batch = max_batch
+        self._cache: dict[K, asyncio.Future] = {}
+        self._queue: list[K] = []
+        self._tasks: set[asyncio.Task] = set()
+
+    def load(self, key) -> Awaitable[V | None]:
+        if self._key_fn is not None:
+            key = self._key_fn(key)
+
+        fut = self._cache.get(key)
+        if fut is not None:
+            return fut
+
+        loop = asyncio.get_running_loop()
+        fut = self._cache[key] = loop.create_future()
+        self._queue.append(key)
+        if len(self._queue) == 1:
+            # 多等一轮事件循环，让同一批 gather 中后创建的任务也能加入本次批量
+            loop.call_soon(loop.call_soon, self._dispatch)
+        return fut
+
+    async def load_many(self, keys: Iterable) -> dict[K, V]:
+        """返回 {key: value}，不存在的 key 不包含在结果中"""
+        keys = list(dict.fromkeys(self._key_fn(k) if self._key_fn else k for k in keys))
+        values = await asyncio.gather(*(self.load(k) for k in keys))
+        return {k: v for k, v in zip(keys, values) if v is not None}
+
+    def prime(self, key: K, value: V) -> None:
+        """写入已查到的数据，避免重复查询"""
+        if key not in self._cache:
+            fut = asyncio.get_running_loop().create_future()
+            fut.set_result(value)
+            self._cache[key] = fut
+
+    def clear(self, *keys: K) -> None:
+        """数据变更后清除缓存，不传 key 时全部清除"""
+        if not keys:
+            self._cache.clear()
+        for key in keys:
+            self._cache.pop(key, None)
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        for i in range(0, len(keys), self._max_batch):
+            task = asyncio.create_task(self._run(keys[i : i + self._max_batch]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, keys: list[K]) -> None:
+        try:
+            ret = await self._batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                # 失败的结果不缓存，后续 load 会重新查询
+                fut = self._cache.pop(key, None)
+                if fut is not None and not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for key in keys:
+            fut = self._cache.get(key)
+            if fut is not None and not fut.done():
+                fut.set_result(ret.get(key))
+
+
+class Loaders:
+    """
+    请求级 loader 集合，挂在 session.info 上，与 session（即 SessionDep 的一次请求）同生命周期
+
+    只用于只读查询；同一请求内修改了对应数据后需调用 clear
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        # 各 loader 可能在同一 tick 触发查询，同一 session 上不能并发执行
+        self._lock = asyncio.Lock()
+        self.users: DataLoader[int, User] = DataLoader(self._load_users, key_fn=int)
+        self.groups: DataLoader[str, ShareGroupModel] = DataLoader(self._load_groups)
+        self.annivs: DataLoader[str, AnniversaryModel] = DataLoader(self._load_annivs)
+
+    async def _execute(self, stmt):
+        async with self._lock:
+            return (await self.session.execute(stmt)).scalars().all()
+
+    async def _load_users(self, ids: list[int]) -> dict[int, User]:
+        ret = await self._execute(select(User).where(User.id.in_(ids)))
+        return {i.id: i for i in ret}
+
+    async def _load_groups(self, ids: list[str]) -> dict[str, ShareGroupModel]:
+        ret = await self._execute(select(ShareGroupModel).where(ShareGroupModel.id.in_(ids)))
+        return {i.id: i for i in ret}
+
+    async def _load_annivs(self, ids: list[str]) -> dict[str, AnniversaryModel]:
+        stmt = select(AnniversaryModel).where(
+            AnniversaryModel.state == 1, AnniversaryModel.id.in_(ids)
+        )
+        ret = await self._execute(stmt)
+        return {i.id: i for i in ret}
+
+
+def get_loaders(session: AsyncSession) -> Loaders:
+    loaders = session.info.get(LOADERS_KEY)
+    if loaders is None:
+        loaders = session.info[LOADERS_KEY] = Loaders(session)
+    return loaders
@@ -1,5 +1,5 @@
 from operator import imod
-from typing import List
+from typing import Iterable, List
 from fastapi import HTTPException
 from sqlalchemy import Select, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,7 +8,9 @@ from sqlalchemy.orm import load_only, noload
 from app.models._mixin import BaseMixin
 from app.models.sys import SettingsModel
 from app.models.user import ShareGroupMemberModel, ShareGroupModel, User, UserSettings
+from app.repo.anniv_visibility import anniv_visibility_repo
 from app.schemas.user import CreateGroupSchema, SimpleUser
+from app.services.cache.anniv import AnnivStatCache
 from app.utils.paginator import Paginator
 
 
@@ -48,7 +50,12 @@ class ShareGroupRepo(BaseMixin[ShareGroupModel]):
         cur_user_id: int = None,
         only_cols: list = None,
         load_members=True,
+        joined_group_ids: Iterable[str] = None,
     ) -> list[ShareGroupModel]:
+        """
+        :param cur_user_id: 只返回公开组和该用户加入的组
+        :param joined_group_ids: cur_user_id 已加入的组 id（来自缓存），传入时不再关联成员表
+        """
         where = []
 
         if group_id:
@@ -66,12 +73,11 @@ class ShareGroupRepo(BaseMixin[ShareGroupModel]):
                 where.append(self.model.owner_id.in_(owner_id))
 
         if cur_user_id:
-            where.append(
-                or_(
-                    self.model.is_public == 1,
-                    (self.model.is_public == 0) & (self.model.members.any(user_id=cur_user_id)),
-                )
-            )
+            if joined_group_ids is not None:
+                joined = self.model.id.in_(list(joined_group_ids))
+            else:
+                joined = self.model.members.any(user_id=cur_user_id)
+            where.append(or_(self.model.is_public == 1, (self.model.is_public == 0) & joined))
 
         if kw:
             if kw.isdigit():
@@ -94,11 +100,13 @@ class ShareGroupRepo(BaseMixin[ShareGroupModel]):
     ):
         group = await self.create(session, group_data, commit=False)
 
+        user_ids = [i["user_id"] for i in member_data or ()]
         if member_data:
-            await session.run_sync(
-                lambda s: s.bulk_insert_mappings(ShareGroupMemberModel, member_data)
-            )
+            await share_group_member_repo.batch_create(session, member_data, commit=False)
+            await anniv_visibility_repo.refresh_users(session, user_ids)
         commit and await session.commit()
+        # 成员可见的纪念日已变化，提交后删除其首页统计快照
+        await AnnivStatCache.invalidate_users(user_ids)
         return group
 
     async def list_me_joined_group_ids(self, session: AsyncSession, user_id: int):
@@ -263,3 +271,4 @@ class UserRepo(BaseMixin[User]):
 user_repo: UserRepo = UserRepo(User)
 user_settings_repo: UserSettingsRepo = UserSettingsRepo(UserSettings)
 share_group_repo: ShareGroupRepo = ShareGroupRepo(ShareGroupModel)
+share_group_member_repo: BaseMixin[ShareGroupMemberModel] = BaseMixin(ShareGroupMemberModel)
@@ -2,8 +2,9 @@ from typing import List
 from fastapi import Request
 from slowapi.util import get_remote_address, get_ipaddr
 
-from app.core.dependencies import RequireAuthDep, SessionDep
+from app.core.dependencies import ApiKeyDep, RequireAuthDep, SessionDep
 from app.core.http_handler import RespModel, make_response
+from app.core.metrics import mw_latency, near_cache_hits, stage_latency
 from app.ext.limiter import limiter
 from app.routers import BaseAPIRouter
 from app.schemas.common import EmailSchema
@@ -57,3 +58,18 @@ async def get_group_detail(session: SessionDep, cur_user: RequireAuthDep, id: st
 async def craate_group(session: SessionDep, cur_user: RequireAuthDep, data: CreateGroupSchema):
     await UserService().create_group(session, cur_user, data)
     return make_response()
+
+
+@router.get("/metrics/latency", summary="中间件分层耗时直方图（当前 worker）")
+async def get_latency_metrics(api_key: ApiKeyDep, route: str = None):
+    return make_response(data=mw_latency.snapshot(route))
+
+
+@router.get("/metrics/stages", summary="接口内并发查询阶段耗时直方图（当前 worker）")
+async def get_stage_metrics(api_key: ApiKeyDep, name: str = None):
+    return make_response(data=stage_latency.snapshot(name))
+
+
+@router.get("/metrics/near_cache", summary="进程内近端缓存命中率（当前 worker）")
+async def get_near_cache_metrics(api_key: ApiKeyDep, name: str = None):
+    return make_response(data=near_cache_hits.snapshot(name))
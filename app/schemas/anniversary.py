@@ -125,20 +125,22 @@ class CreateAnnivSchema(BaseModel):
 
         if self.remind_rule and self.remind_rule.slots:
             # 去重
-            slot_sets = {(i.offset_days, i.trigger_time) for i in self.remind_rule.slots}
-            self.remind_rule.slots = []
-
-            for offset_days, trigger_time in slot_sets:
-                slot = RemindConfig(offset_days=offset_days, trigger_time=trigger_time)
-                slot.next_trigger_at = calculator.calculate_next_trigger(
-                    remind_config=slot,
-                    event_date=_calc_event_date,
-                    repeat_type=self.repeat_type,
-                    calendar_type=self.calendar_type,
-                    is_leap=self.lunar_is_leap,
+            slot_sets = list({(i.offset_days, i.trigger_time) for i in self.remind_rule.slots})
+            n = len(slot_sets)
+            next_triggers = calculator.calculate_next_triggers(
+                event_dates=[_calc_event_date] * n,
+                repeat_types=[self.repeat_type] * n,
+                calendar_types=[self.calendar_type] * n,
+                offsets=[offset_days for offset_days, _ in slot_sets],
+                trigger_times=[trigger_time for _, trigger_time in slot_sets],
+                leaps=[self.lunar_is_leap] * n,
+            )
+            self.remind_rule.slots = [
+                RemindConfig(
+                    offset_days=offset_days, trigger_time=trigger_time, next_trigger_at=next_trigger
                 )
-
-                self.remind_rule.slots.append(slot)
+                for (offset_days, trigger_time), next_trigger in zip(slot_sets, next_triggers)
+            ]
 
         return self
 
@@ -177,7 +179,7 @@ class AnnivStat(BaseModel):
     next_anniv: List[AnnivSchema] = Field(default_factory=list)
 
 
-class QueryAnnivSchema(BaseModel):
+class QueryAnnivSchema(CursorPageQueryModel):
     name: str | None = Field(default=None)
     event_year: int | None = Field(default=None)
     event_date: date | None = Field(default=None)
@@ -186,7 +188,9 @@ class QueryAnnivSchema(BaseModel):
     is_reminder: bool | None = Field(default=None)
 
     order_by: str | None = Field(
-        default="event_date.desc", description="event_date.asc event_date.desc"
+        default="event_date.desc",
+        description="event_date.asc event_date.desc",
+        validate_default=True,
     )
 
     @field_validator("order_by", mode="after")
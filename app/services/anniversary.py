@@ -1,5 +1,6 @@
 import asyncio
 from typing import Any, List, Literal
+from app.config import settings
 from app.constant import (
     AnniversaryType,
     GroupRole,
@@ -7,6 +8,7 @@ from app.constant import (
     ResourceType,
     UserInterActionEnum,
 )
+from app.core.fanout import StageRunner
 from app.core.http_handler import CursorPageRespModel
 from app.ext.jwt import TokenUserInfo
 from app.repo.interaction import interaction_repo
@@ -21,7 +23,9 @@ from app.schemas.anniversary import (
     RemindRuleSchema,
 )
 from app.schemas.common import MediaSchema, TagsSchema
+from app.services.cache.anniv import AnnivStatCache
 from app.services.cache.counter import AnnivCounter
+from app.services.cache.decorator import cached
 from app.services.invite import InviteService
 from app.utils.dater import DT
 
@@ -98,6 +102,7 @@ class AnnivService:
             await InviteService(InviteTargetType.ANNIVERSARY).publish_invite_job(anniv_id)
 
         await session.commit()
+        await AnnivStatCache.invalidate_visible(session, [anniv_id])
 
         return data
 
@@ -114,32 +119,76 @@ class AnnivService:
         return rule
 
     @staticmethod
-    async def get_base_stat(session, cur_user: TokenUserInfo):
-        user_id = cur_user.id
-        year_total = await anniv_repo.get_year_total(session, user_id, DT.now_year())
-        next_annivs = await anniv_repo.get_next(session, user_id)
-        share_total = await anniv_repo.get_share_cnt(session, user_id)
-        return AnnivStat(year_total=year_total, share_total=share_total, next_anniv=next_annivs)
+    async def _query_base_stat(session, uid: int) -> AnnivStat:
+        year_total, share_total, next_anniv = await anniv_repo.get_dashboard_stat(
+            session, uid, DT.now_year()
+        )
+        return AnnivStat(year_total=year_total, share_total=share_total, next_anniv=next_anniv)
+
+    @staticmethod
+    @cached(AnnivStatCache, ("uid",), ttl=300, type_=AnnivStat)
+    async def _cached_base_stat(session, uid: int) -> AnnivStat:
+        return await AnnivService._query_base_stat(session, uid)
+
+    @staticmethod
+    async def get_base_stat(session, cur_user: TokenUserInfo) -> AnnivStat:
+        """首页统计：单条 SQL 查询，开启 ANNIV_STAT_CACHE 时读取用户快照"""
+        if settings.ANNIV_STAT_CACHE:
+            return await AnnivService._cached_base_stat(session, cur_user.id)
+        return await AnnivService._query_base_stat(session, cur_user.id)
 
     @staticmethod
     async def get_anniv_feed(
         session,
         cur_user: TokenUserInfo,
         params: QueryAnnivSchema,
+        with_relations: bool = None,
     ) -> CursorPageRespModel[List[AnnivFeedItem]]:
+        """
+        :param with_relations: 标签、媒体是否随纪念日在同一条 SQL 中聚合返回，
+            默认取 settings.ANNIV_FEED_AGG_RELATIONS；否则按页单独查询后在内存中分组
+        """
         uid = cur_user.id
-        paged = await anniv_repo.list_feed(session, uid, params)
-
-        anniv_ids = [i.id for i in paged.items]
-        tags_mapping = await anniv_repo.list_tag(session, anniv_ids)
-        medias_mapping = await anniv_repo.list_media(session, anniv_ids)
-        interaction_mapping = await interaction_repo.retrieve_state(
-            session, uid, ResourceType.ANNIV, anniv_ids
+        if with_relations is None:
+            with_relations = settings.ANNIV_FEED_AGG_RELATIONS
+
+        paged = await anniv_repo.list_feed(session, uid, params, with_relations=with_relations)
+
+        if not paged.items:
+            return paged
+
+        if with_relations:
+            annivs = [row[0] for row in paged.items]
+            tags_mapping = {row[0].id: row[1] for row in paged.items}
+            medias_mapping = {row[0].id: row[2] for row in paged.items}
+        else:
+            annivs = paged.items
+
+        anniv_ids = [i.id for i in annivs]
+        runner = StageRunner("anniv_feed_agg" if with_relations else "anniv_feed")
+        if not with_relations:
+            runner.add("tags", anniv_repo.list_tag, anniv_ids, db=True)
+            runner.add("medias", anniv_repo.list_media, anniv_ids, db=True)
+        enriched = await (
+            runner.add(
+                "interaction",
+                interaction_repo.retrieve_state,
+                uid,
+                ResourceType.ANNIV,
+                anniv_ids,
+                db=True,
+            )
+            .add("counter", AnnivCounter.get_many, anniv_ids)
+            .run()
         )
-        counter_mapping = await AnnivCounter.get_many(anniv_ids)
+        if not with_relations:
+            tags_mapping = enriched["tags"]
+            medias_mapping = enriched["medias"]
+        interaction_mapping = enriched["interaction"]
+        counter_mapping = enriched["counter"]
 
         items: list[AnnivFeedItem] = []
-        for anniv in paged.items:
+        for anniv in annivs:
             anniv_id = anniv.id
             item = AnnivFeedItem.model_validate(anniv)
             stats = counter_mapping.get(anniv_id)
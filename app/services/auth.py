@@ -334,7 +334,7 @@ class AuthService:
         jti = ac_token_paylod.jti
 
         response.delete_cookie(settings.COOKIE_REFRESH_TOKEN_KEY)
-        await JWTTokenCache("access", user_id, jti).delete()
+        await jwt_manager.revoke_access_token(user_id, jti)
 
         if rf_token:
             await JWTTokenCache("refresh", user_id, jti).delete()
@@ -1,9 +1,11 @@
 from abc import abstractmethod, ABC
 from enum import unique, Enum
-from typing import Iterable, Literal
+from typing import Iterable, Literal, Sequence
 
 from redis import StrictRedis
 
+from .near import near_cache
+
 
 @unique
 class CacheKey(Enum):
@@ -12,12 +14,21 @@ class CacheKey(Enum):
     VERIFY_PHONE_CODE = "verify_code:{}:{}"  # 验证码: {业务标识}:{手机号或三方账号}
     USER_STAT = "user_stat:{}"  # 用户统计：{用户id}
     UNREAD_MSG_CNT = "unread_msg_counter:{}"  # 用户未读消息计数：{用户id}
+    USER_GROUPS = "user_groups:{}"  # 用户加入的共享组 id 集合：{用户id}
     JWT_TOKEN = "jwt_token:{}:{}:{}-{}"  # JWT令牌：{app_name}:{token类型}:{user_id}-{jti}
+    JWT_TOKEN_INDEX = "jwt_token_index:{}:{}:{}"  # 用户JWT索引：{app_name}:{token类型}:{user_id}
 
+    ANNIV_STAT = "anniv_stat:{}"  # 首页纪念日统计快照：{用户id}
     COUNTER_ANNIV = "counter_anniv:{}"  # {anniv_id}
+    COUNTER_ANNIV_DIRTY = "counter_anniv_dirty"  # 待同步到 DB 的纪念日计数 id 集合
+    REMIND_WHEEL = "remind_wheel"  # 近期待触发的提醒：zset member=slot_id score=触发时间戳
+    REMIND_ROLLOVER_CHECKPOINT = "remind_rollover_checkpoint:{}"  # 滚动已过期触发时间的进度：{阶段}
 
 
 class BaseCache(ABC):
+    # 进程内近端缓存有效期（秒），0 表示读取直接访问 redis；写操作需调用 near_invalidate
+    NEAR_TTL: float = 0
+
     @property
     @abstractmethod
     def __KEY__(self):
@@ -35,6 +46,38 @@ class BaseCache(ABC):
     async def add(self, *args, **kwargs):
         pass
 
+    async def near_load(self, loader):
+        """经近端缓存读取 self.key，未命中时执行 loader 读 redis"""
+        return await near_cache.get_or_load(
+            CacheKey(self.__KEY__).name, self.key, loader, self.NEAR_TTL
+        )
+
+    async def near_invalidate(self):
+        """失效各 worker 的近端缓存"""
+        if self.NEAR_TTL > 0:
+            await near_cache.invalidate(self.key)
+
+    @staticmethod
+    async def batch_execute(
+        client: StrictRedis, cmd: str, keys: Sequence, *cmd_args, chunk_size=500, **cmd_options
+    ) -> list:
+        """
+        对每个 key 执行同一条命令，按 chunk_size 分批走 pipeline（非事务），每批一次网络往返
+
+        :param client: redis client
+        :param cmd: redis命令，如 HGETALL、GET
+        :param keys:
+        :param chunk_size: 每批 key 数量
+        :return: 与 keys 顺序一致的结果列表
+        """
+        results = []
+        for i in range(0, len(keys), chunk_size):
+            async with client.pipeline(transaction=False) as pipe:
+                for key in keys[i : i + chunk_size]:
+                    pipe.execute_command(cmd, key, *cmd_args, **cmd_options)
+                results.extend(await pipe.execute())
+        return results
+
     @staticmethod
     async def get_cache_data(
         client: StrictRedis,
@@ -46,6 +89,7 @@ class BaseCache(ABC):
         cmd_options=None,
         sep_rule=None,
         pk_name="id",
+        chunk_size=500,
     ):
         """
         获取缓存数据
@@ -56,37 +100,25 @@ class BaseCache(ABC):
         :param cmd_args: redis命令参数
         :param cmd_options: redis命令参数
         :param sep_rule: key分隔规则（为了获取id），从右向左分隔，元组3个元素分别表示：分隔字符、最大分隔次数、截取结果索引。
-            如(":", 1, 1)表示 按 `:` 从右至左分隔，最多分隔1次，取分隔结果的索引下标1
+            如(":", 1, 1)表示 按 `:` 从右至左分隔，最多分隔1次，取分隔结果的索引下标1；不传时id为key本身
         :param keys:
         :param pk_name:
+        :param chunk_size: 每次 pipeline 的 key 数量
         :return: 单值类型返回嵌套元组，hash类型返回嵌套字典
         """
-        if not cmd_args:
-            cmd_args = ()
-        if not cmd_options:
-            cmd_options = {}
-
-        async def check_key(_key):
-            ret = await client.execute_command(cmd, _key, *cmd_args, **cmd_options)
-            if (_id := _key.rsplit(sep_rule[0], sep_rule[1])[sep_rule[2]]) == "None":
-                return
-            return _id, ret
-
-        if data_type == "string":
-            data = []
-            for key in keys:
-                r = await check_key(key)
-                if r is None:
-                    continue
-                data.append((r[1]))
-            return data
-
-        elif data_type == "hash":
-            data = []
-            for key in keys:
-                r = await check_key(key)
-                if r is None:
-                    continue
-
-                data.append({pk_name: r[0], **r[1]})
-            return data
+        keys = list(keys)
+        results = await BaseCache.batch_execute(
+            client, cmd, keys, *(cmd_args or ()), chunk_size=chunk_size, **(cmd_options or {})
+        )
+
+        data = []
+        for key, ret in zip(keys, results):
+            _id = key.rsplit(sep_rule[0], sep_rule[1])[sep_rule[2]] if sep_rule else key
+            if _id == "None":
+                continue
+
+            if data_type == "string":
+                data.append(ret)
+            elif data_type == "hash":
+                data.append({pk_name: _id, **ret})
+        return data
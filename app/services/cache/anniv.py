@@ -0,0 +1,42 @@
+from typing import Iterable
+
+from app.database import redcache
+from app.repo.anniv_visibility import anniv_visibility_repo
+from . import BaseCache, CacheKey
+
+
+class AnnivStatCache(BaseCache):
+    """
+    首页纪念日统计快照（由 AnnivService.get_base_stat 的 cached 装饰器写入）
+
+    纪念日新增、修改、共享后，按 anniversary_visibility 找到所有可见用户并删除其快照；
+    共享组成员变化后删除成员的快照
+    """
+
+    __KEY__ = CacheKey.ANNIV_STAT.value
+
+    def __init__(self, uid: int):
+        self.key = self.__KEY__.format(uid)
+
+    async def get(self):
+        return await redcache.get(self.key)
+
+    async def add(self, data: str, expire=300):
+        return await redcache.set(self.key, data, ex=expire)
+
+    async def delete(self):
+        return await redcache.delete(self.key)
+
+    @classmethod
+    async def invalidate_visible(cls, session, anniv_ids: Iterable[str]) -> int:
+        """删除可见这些纪念日的所有用户的快照"""
+        uids = await anniv_visibility_repo.list_user_ids(session, anniv_ids)
+        return await cls.invalidate_users(uids)
+
+    @classmethod
+    async def invalidate_users(cls, uids: Iterable[int]) -> int:
+        """删除这些用户的快照（加入/退出共享组后可见纪念日变化）"""
+        keys = [cls.__KEY__.format(uid) for uid in set(uids)]
+        if not keys:
+            return 0
+        return await redcache.delete(*keys)
@@ -1,15 +1,26 @@
 from typing import List, Literal
 from app.database import redcache
 from app.services.cache import BaseCache, CacheKey
+from app.services.cache.near import near_cache
 
 
 AnnivCounterField = Literal["collect_cnt", "like_cnt", "share_cnt", "comment_cnt"]
 
 
 class AnnivCounter(BaseCache):
+    """
+    纪念日计数（write-behind）
+
+    计数先写 redis hash，变更过的 id 记入脏集合 `DIRTY_KEY`，由定时任务取出脏 id 批量回写 DB；
+    列表页批量读取经过进程内近端缓存，计数变更时广播失效
+    """
+
     __KEY__ = CacheKey.COUNTER_ANNIV.value
+    DIRTY_KEY = CacheKey.COUNTER_ANNIV_DIRTY.value
+    NEAR_TTL = 2
 
     def __init__(self, anniv_id: str):
+        self.anniv_id = anniv_id
         self.key = self.__KEY__.format(anniv_id)
 
     async def get(self):
@@ -23,24 +34,27 @@ class AnnivCounter(BaseCache):
         if not ids:
             return {}
 
-        async with redcache.pipeline() as pipe:
-            for rid in ids:
-                pipe.hgetall(cls.__KEY__.format(rid))
-
-            rows = await pipe.execute()
-
-            result = {id: {k: int(v) for k, v in d.items()} for id, d in zip(ids, rows)}
-
-            return result
+        rows = await near_cache.get_many_or_load(
+            CacheKey.COUNTER_ANNIV.name,
+            [cls.__KEY__.format(i) for i in ids],
+            lambda keys: cls.batch_execute(redcache, "HGETALL", keys),
+            cls.NEAR_TTL,
+        )
+        return {id: {k: int(v) for k, v in d.items()} for id, d in zip(ids, rows)}
 
     async def add(self, data: dict, ex=3600 * 24 * 3):
         async with redcache.pipeline() as pipe:
-            pipe.hset(self.key, mapping=data).expire(self.key, ex)
+            pipe.hset(self.key, mapping=data).expire(self.key, ex).sadd(
+                self.DIRTY_KEY, self.anniv_id
+            )
             ret = await pipe.execute()
-            return ret[0]
+        await self.near_invalidate()
+        return ret[0]
 
     async def delete(self):
-        return await redcache.delete(self.key)
+        ret = await redcache.delete(self.key)
+        await self.near_invalidate()
+        return ret
 
     async def exists(self):
         return await redcache.exists(self.key)
@@ -52,12 +66,31 @@ class AnnivCounter(BaseCache):
         :return:
         """
 
-        cnt = await redcache.script.hincr_if_exists(keys=[self.key], args=[field, amount])
-        if cnt is None or cnt >= 0:
-            return cnt
-
-        cnt = await redcache.script.hincr_if_exists(keys=[self.key], args=[field, -cnt])
+        cnt = await redcache.script.hincr_if_exists_mark(
+            keys=[self.key, self.DIRTY_KEY], args=[field, amount, self.anniv_id]
+        )
+        await self.near_invalidate()
         return cnt
 
     async def scan(self, count=5000):
-        return await redcache.scan_uk(self.key, count=count)
+        return [key async for key in redcache.scan_uk(self.key, count=count)]
+
+    @classmethod
+    async def mark_dirty(cls, ids: List[str]):
+        if not ids:
+            return 0
+        return await redcache.sadd(cls.DIRTY_KEY, *ids)
+
+    @classmethod
+    async def pop_dirty(cls, count=5000) -> List[str]:
+        """原子地取出（并移除）至多 count 个待同步 id"""
+        return await redcache.spop(cls.DIRTY_KEY, count) or []
+
+    @classmethod
+    async def expire_many(cls, ids: List[str], ex=3600 * 24 * 3):
+        if not ids:
+            return
+        async with redcache.pipeline(transaction=False) as pipe:
+            for rid in ids:
+                pipe.expire(cls.__KEY__.format(rid), ex)
+            await pipe.execute()
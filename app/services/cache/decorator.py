@@ -0,0 +1,194 @@
+import asyncio
+import inspect
+import random
+from functools import wraps
+from typing import Any, Awaitable, Callable, Literal, Sequence
+
+from msgspec import convert, json as msgspec_json, to_builtins
+from pydantic import BaseModel
+
+from app.core.loggers import app_logger
+from app.database import redcache
+from app.services.cache import BaseCache
+
+
+_MISSING = object()
+# 进程内正在加载的 key -> Future，同一 worker 内并发未命中只执行一次 loader
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def _enc_hook(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise NotImplementedError(f"不支持序列化的类型 {type(obj)}")
+
+
+def _decode(data, type_):
+    if type_ is None:
+        return data
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        return type_.model_validate(data)
+    return convert(data, type_, strict=False)
+
+
+class _StringStore:
+    """string 类型：msgspec json 序列化，支持缓存 None（负缓存）"""
+
+    supports_none = True
+
+    @staticmethod
+    async def load(client, key: str):
+        raw = await client.get(key)
+        return _MISSING if raw is None else msgspec_json.decode(raw)
+
+    @staticmethod
+    async def save(client, key: str, value, ttl: int):
+        await client.set(key, msgspec_json.encode(value, enc_hook=_enc_hook), ex=ttl)
+
+
+class _HashStore:
+    """hash 类型：与 hincr_if_exists 等按字段原地更新的缓存类共用同一个 key"""
+
+    supports_none = False
+
+    @staticmethod
+    async def load(client, key: str):
+        return await client.hgetall(key) or _MISSING
+
+    @staticmethod
+    async def save(client, key: str, value, ttl: int):
+        mapping = {k: v for k, v in to_builtins(value, enc_hook=_enc_hook).items() if v is not None}
+        if not mapping:
+            return
+        async with client.pipeline() as pipe:
+            pipe.hset(key, mapping=mapping).expire(key, ttl)
+            await pipe.execute()
+
+
+_STORES = {"string": _StringStore, "hash": _HashStore}
+
+
+async def _single_flight(key: str, loader: Callable[[], Awaitable[Any]]):
+    fut = _inflight.get(key)
+    if fut is not None:
+        return await asyncio.shield(fut)
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        ret = await loader()
+    except BaseException as e:
+        fut.set_exception(e)
+        fut.exception()  # 没有其他等待者时避免 "exception was never retrieved"
+        raise
+    else:
+        fut.set_result(ret)
+        return ret
+    finally:
+        _inflight.pop(key, None)
+
+
+def cached(
+    cache: type[BaseCache],
+    key_args: Sequence[str] = (),
+    *,
+    ttl: int = 3600,
+    jitter: float = 0.1,
+    data_type: Literal["string", "hash"] = "string",
+    type_=None,
+    negative_ttl: int = 0,
+    lock_ttl: float = 5,
+    client=redcache,
+):
+    """
+    cache-aside 装饰器，用于 repo/service 协程
+
+    - 缓存对象由被装饰函数的参数构造：cache(*[参数值 for 参数名 in key_args])，读写其 key；
+      读取经过 BaseCache.near_load，cache.NEAR_TTL > 0 时先查进程内近端缓存，回源写入后广播失效
+    - 未命中时：同一 worker 内并发请求合并为一次 loader 调用；跨 worker 通过 redis 短锁保证
+      只有一个 worker 回源，其余 worker 轮询缓存直到写入或锁超时
+    - 过期时间增加随机抖动，避免同一批 key 同时过期
+    - 被装饰函数新增 `invalidate(*args, **kwargs)` 调用 cache.delete()，`cache_key(*args, **kwargs)` 返回 key
+
+    :param cache: 缓存类，构造参数为 key_args 对应的参数值，delete() 需同时失效近端缓存
+    :param key_args: 组成 key 的参数名，顺序对应缓存类的构造参数
+    :param ttl: 过期时间（秒）
+    :param jitter: 过期时间随机增加的比例，0.1 表示增加 0~10%
+    :param data_type: string 为 msgspec json；hash 为 redis hash，与按字段原地更新的缓存类共用 key
+    :param type_: 反序列化类型，pydantic 模型或 msgspec 支持的类型，为空时返回原始数据
+    :param negative_ttl: 返回 None 时的缓存时间（秒），0 表示不缓存 None，仅 string 类型支持
+    :param lock_ttl: 回源锁的过期时间（秒），也是其他 worker 等待的最长时间
+    """
+    store = _STORES[data_type]
+
+    def decorator(fn):
+        sig = inspect.signature(fn)
+
+        def cache_obj(*args, **kwargs) -> BaseCache:
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return cache(*[bound.arguments[name] for name in key_args])
+
+        def cache_key(*args, **kwargs) -> str:
+            return cache_obj(*args, **kwargs).key
+
+        def decode(data):
+            return None if data is None else _decode(data, type_)
+
+        def expire(value) -> int:
+            if value is None:
+                return negative_ttl
+            return ttl + random.randint(0, int(ttl * jitter))
+
+        async def fill(obj: BaseCache, args, kwargs):
+            value = await fn(*args, **kwargs)
+            if value is not None or (store.supports_none and negative_ttl > 0):
+                await store.save(client, obj.key, value, expire(value))
+                # 近端缓存中可能是本次未命中的结果
+                await obj.near_invalidate()
+            return value
+
+        async def load_with_lock(obj: BaseCache, args, kwargs):
+            # RedisX.lock 为同步锁，这里使用 redis.asyncio 原生锁
+            raw_client = getattr(client, "client", client)
+            lock = raw_client.lock(f"{obj.key}:lock", timeout=lock_ttl, blocking=False)
+            if await lock.acquire():
+                try:
+                    # 拿到锁前其他 worker 可能刚写入
+                    data = await store.load(client, obj.key)
+                    if data is not _MISSING:
+                        return decode(data)
+                    return await fill(obj, args, kwargs)
+                finally:
+                    try:
+                        await lock.release()
+                    except Exception as e:
+                        app_logger.warning(f"缓存回源锁释放失败 {obj.key} {e}")
+
+            # 其他 worker 正在回源，等待其写入缓存
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + lock_ttl
+            while loop.time() < deadline:
+                await asyncio.sleep(0.05)
+                data = await store.load(client, obj.key)
+                if data is not _MISSING:
+                    return decode(data)
+            return await fill(obj, args, kwargs)
+
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            obj = cache_obj(*args, **kwargs)
+            # 近端缓存保存 redis 原始数据，每次调用反序列化出新对象，调用方修改返回值互不影响
+            data = await obj.near_load(lambda: store.load(client, obj.key))
+            if data is not _MISSING:
+                return decode(data)
+            return await _single_flight(obj.key, lambda: load_with_lock(obj, args, kwargs))
+
+        async def invalidate(*args, **kwargs):
+            return await cache_obj(*args, **kwargs).delete()
+
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
+        return wrapper
+
+    return decorator
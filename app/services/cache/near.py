@@ -0,0 +1,127 @@
+from itertools import count
+from typing import Any, Awaitable, Callable, Sequence
+
+from app.config import settings
+from app.core.loggers import app_logger
+from app.core.metrics import near_cache_hits
+from app.database import redcache
+from app.utils.lru import TTLLRUCache
+
+
+_MISSING = object()
+
+
+class NearCache:
+    """
+    redis 前的进程内近端缓存（每个 worker 一份）
+
+    - 有界 LRU，每个条目单独设置有效期，key 直接使用 redis key
+    - 每个 key 有版本号，失效时更新版本；回填时版本已变化说明读取期间发生了写入，丢弃回填结果
+    - 写操作通过 redis pub/sub 广播失效，各 worker 收到后删除本地条目；
+      消息丢失时最迟在条目有效期后失效，因此只适合可以容忍秒级延迟的数据
+    - 按 CacheKey 名称统计命中/未命中
+    """
+
+    CHANNEL = f"{settings.APP_NAME}:near_cache_invalidate"
+    # 读取中的版本号需要保留到回填完成，远大于一次 redis 往返即可
+    VERSION_TTL = 60
+
+    def __init__(self, maxsize: int, enable: bool = True):
+        self.enable = enable
+        self._data = TTLLRUCache(maxsize)
+        self._versions = TTLLRUCache(maxsize, self.VERSION_TTL)
+        self._seq = count(1)
+
+    def version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def get(self, name: str, key: str, default=None):
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            near_cache_hits.miss(name)
+            return default
+        near_cache_hits.hit(name)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float, version: int = None) -> None:
+        """
+        :param version: 读取前取到的版本号，与当前版本不一致时不写入
+        """
+        if version is not None and version != self.version(key):
+            return
+        self._data.set(key, value, ttl)
+
+    def evict(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key)
+            self._versions.set(key, next(self._seq))
+
+    async def invalidate(self, *keys: str) -> None:
+        """失效本地条目并广播到所有 worker"""
+        if not self.enable or not keys:
+            return
+        self.evict(*keys)
+        try:
+            await redcache.publish(self.CHANNEL, "\n".join(keys))
+        except Exception as e:
+            app_logger.error(f"近端缓存失效广播失败 {keys} {e}")
+
+    async def get_or_load(
+        self, name: str, key: str, loader: Callable[[], Awaitable[Any]], ttl: float
+    ) -> Any:
+        """
+        先查本地，未命中时执行 loader（读 redis）并回填
+
+        :param name: 统计名称，一般为 CacheKey 名称
+        :param ttl: 本地有效期（秒），<=0 时不缓存
+        """
+        if not self.enable or ttl <= 0:
+            return await loader()
+
+        value = self.get(name, key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        version = self.version(key)
+        value = await loader()
+        self.set(key, value, ttl, version)
+        return value
+
+    async def get_many_or_load(
+        self,
+        name: str,
+        keys: Sequence[str],
+        loader: Callable[[list[str]], Awaitable[list]],
+        ttl: float,
+    ) -> list:
+        """
+        批量版本：只对本地未命中的 key 执行 loader(keys)，返回与 keys 顺序一致的结果
+
+        :param loader: 接收未命中的 key 列表，返回顺序一致的结果列表
+        """
+        if not self.enable or ttl <= 0:
+            return await loader(list(keys))
+
+        values = [self.get(name, key, _MISSING) for key in keys]
+        missing = [i for i, v in enumerate(values) if v is _MISSING]
+        if not missing:
+            return values
+
+        missing_keys = [keys[i] for i in missing]
+        versions = [self.version(key) for key in missing_keys]
+        loaded = await loader(missing_keys)
+        for i, key, version, value in zip(missing, missing_keys, versions, loaded):
+            self.set(key, value, ttl, version)
+            values[i] = value
+        return values
+
+    def on_message(self, data: str) -> None:
+        self.evict(*data.split("\n"))
+
+    def listen(self) -> None:
+        """订阅失效广播，应用启动时调用"""
+        if self.enable:
+            redcache.subscribe(self.CHANNEL, self.on_message)
+
+
+near_cache = NearCache(settings.NEAR_CACHE_SIZE, settings.NEAR_CACHE_ENABLE)
@@ -0,0 +1,81 @@
+import time
+from datetime import datetime
+from typing import Iterable
+
+from app.config import settings
+from app.database import redcache
+from . import BaseCache, CacheKey
+
+
+class RemindWheelCache(BaseCache):
+    """
+    近期待触发的提醒时间轮：zset member=slot_id score=触发时间戳
+
+    只保存未来 REMIND_WHEEL_HORIZON 秒内的 slot，成员仅作为触发信号，分发时以 DB 中的
+    next_trigger_at 为准：已修改、已删除的 slot 即使残留在时间轮中也不会被发送
+    """
+
+    __KEY__ = CacheKey.REMIND_WHEEL.value
+
+    def __init__(self):
+        self.key = self.__KEY__
+
+    async def get(self, slot_id: str) -> float | None:
+        return await redcache.zscore(self.key, slot_id)
+
+    async def add(self, mapping: dict[str, float]) -> int:
+        if not mapping:
+            return 0
+        return await redcache.zadd(self.key, mapping)
+
+    async def delete(self, *slot_ids: str) -> int:
+        if not slot_ids:
+            return 0
+        return await redcache.zrem(self.key, *slot_ids)
+
+    async def schedule(self, slots: Iterable[tuple[str, datetime | None]]) -> int:
+        """
+        写入在时间轮范围内的 slot，范围外的由定期加载写入
+
+        :param slots: (slot_id, next_trigger_at)
+        """
+        if not settings.REMIND_WHEEL_ENABLE:
+            return 0
+        until = time.time() + settings.REMIND_WHEEL_HORIZON
+        mapping = {}
+        for slot_id, trigger_at in slots:
+            if trigger_at is None:
+                continue
+            ts = trigger_at.timestamp()
+            if ts <= until:
+                mapping[slot_id] = ts
+        return await self.add(mapping)
+
+    async def pop_due(self, now_ts: float, limit: int) -> list[str]:
+        """原子地取出并删除已到期的成员"""
+        return await redcache.script.zpop_by_score(keys=[self.key], args=[now_ts, limit])
+
+    async def next_due_at(self) -> float | None:
+        """最早的触发时间戳"""
+        ret = await redcache.zrange(self.key, 0, 0, withscores=True)
+        return ret[0][1] if ret else None
+
+
+class RemindRolloverCheckpoint(BaseCache):
+    """滚动已过期 next_trigger_at 的进度：已处理到的最大 id，任务中断后从该 id 之后继续"""
+
+    __KEY__ = CacheKey.REMIND_ROLLOVER_CHECKPOINT.value
+    # 保留两天，覆盖一次夜间任务失败后的下一轮
+    EXPIRE = 2 * 24 * 60 * 60
+
+    def __init__(self, phase: str):
+        self.key = self.__KEY__.format(phase)
+
+    async def get(self) -> str | None:
+        return await redcache.get(self.key)
+
+    async def add(self, last_id: str) -> bool:
+        return await redcache.set(self.key, last_id, ex=self.EXPIRE)
+
+    async def delete(self) -> int:
+        return await redcache.delete(self.key)
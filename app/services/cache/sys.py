@@ -9,19 +9,23 @@ class AvatarCache(BaseCache):
     """头像缓存"""
 
     __KEY__ = CacheKey.DEFAULT_AVATAR.value
+    NEAR_TTL = 300
 
     def __init__(self):
         self.key = self.__KEY__
 
     async def get(self):
-        return await redcache.lrange(self.key, 0, -1)
+        return await self.near_load(lambda: redcache.lrange(self.key, 0, -1))
 
     async def add(self, data: list, expire=3600 * 24 * 30):
         ret = await redcache.lpush(self.key, *data)
+        await self.near_invalidate()
         return ret
 
     async def delete(self):
-        return await redcache.delete(self.key)
+        ret = await redcache.delete(self.key)
+        await self.near_invalidate()
+        return ret
 
     async def exists(self):
         return await redcache.exists(self.key)
@@ -1,10 +1,12 @@
-from typing import Literal, TypeAlias
+import time
+from typing import Iterable, Literal, TypeAlias
 from app.config import settings
 from app.repo.interaction import interaction_repo
 from app.repo.relationship import fan_repo, follow_repo
 from app.schemas.notification import EmptyUnReadMsgCnt, UnReadMsgCntSchema
 from app.schemas.user import UserStats
 from . import BaseCache, CacheKey
+from .near import near_cache
 from app.database import pms_cache, redcache
 
 
@@ -43,6 +45,7 @@ class TokenCache(BaseCache):
 
 class JWTTokenCache(BaseCache):
     __KEY__ = CacheKey.JWT_TOKEN.value
+    __INDEX_KEY__ = CacheKey.JWT_TOKEN_INDEX.value
 
     def __init__(self, token_type, user_id, jti):
         """
@@ -51,39 +54,102 @@ class JWTTokenCache(BaseCache):
         token_type: 令牌类型，access 或 refresh
         user_id: 用户ID
         jti: jti
+
+        同时维护用户维度的令牌索引（zset，member=jti，score=过期时间戳），
+        用于按用户吊销全部令牌，避免 scan 整个 keyspace
         """
 
+        self.jti = jti
         self.key = self.__KEY__.format(settings.APP_NAME, token_type, user_id, jti)
+        self.key_prefix = self.__KEY__.format(settings.APP_NAME, token_type, user_id, "")
+        self.index_key = self.__INDEX_KEY__.format(settings.APP_NAME, token_type, user_id)
 
     async def get(self):
         return await pms_cache.get(self.key)
 
     async def add(self, data: str, expire):
         # data: sub
-        ret = await pms_cache.set(self.key, data, ex=expire)
+        ret = await pms_cache.script.token_add(
+            keys=[self.key, self.index_key], args=[data, expire, self.jti, int(time.time())]
+        )
         return ret
 
     async def delete(self):
-        return await pms_cache.delete(self.key)
+        return await pms_cache.script.token_delete(keys=[self.key, self.index_key], args=[self.jti])
 
     async def exists(self):
         return await pms_cache.exists(self.key)
 
-    async def delete_prefix(self):
-        return await pms_cache.delete_prefix(self.key)
+    async def delete_all(self, exclude_jti: str = ""):
+        """
+        删除该用户该类型的全部令牌
+
+        :param exclude_jti: 保留的 jti
+        :return: 删除数量
+        """
+        return await pms_cache.script.token_delete_all(
+            keys=[self.index_key], args=[self.key_prefix, exclude_jti]
+        )
+
+    @classmethod
+    async def rotate(
+        cls,
+        user_id: int | str,
+        old_jti: str,
+        new_jti: str,
+        access_data: str,
+        access_expire: int,
+        refresh_expire: int,
+        multi_login: bool,
+    ) -> bool:
+        """
+        原子轮换 refresh token：校验并吊销旧令牌、签发新的 access/refresh 令牌，一次往返完成
+
+        :param access_data: access token 缓存值（用户信息 json）
+        :param multi_login: 为 False 时同时吊销该用户其他会话
+        :return: 旧 refresh token 不存在或已被使用时返回 False
+        """
+        old_rf, old_ac = cls("refresh", user_id, old_jti), cls("access", user_id, old_jti)
+        new_ac, new_rf = cls("access", user_id, new_jti), cls("refresh", user_id, new_jti)
+
+        ret = await pms_cache.script.token_rotate(
+            keys=[
+                old_rf.key,
+                old_ac.key,
+                old_rf.index_key,
+                old_ac.index_key,
+                new_ac.key,
+                new_rf.key,
+            ],
+            args=[
+                str(user_id),
+                old_jti,
+                new_jti,
+                access_data,
+                access_expire,
+                str(user_id),
+                refresh_expire,
+                int(time.time()),
+                0 if multi_login else 1,
+                old_ac.key_prefix,
+                old_rf.key_prefix,
+            ],
+        )
+        return bool(ret)
 
 
 class UserStatCache(BaseCache):
     """用户统计属性缓存，如：关注数、粉丝数"""
 
     __KEY__ = CacheKey.USER_STAT.value
+    NEAR_TTL = 5
 
     def __init__(self, uid: int):
         self.uid = uid
         self.key = self.__KEY__.format(uid)
 
     async def get(self, session):
-        ret = await redcache.hgetall(self.key)
+        ret = await self.near_load(lambda: redcache.hgetall(self.key))
         if ret:
             return UserStats(**ret)
 
@@ -93,10 +159,13 @@ class UserStatCache(BaseCache):
         async with redcache.pipeline() as pipe:
             pipe.hset(self.key, mapping=data).expire(self.key, expire)
             ret = await pipe.execute()
-            return ret[0]
+        await self.near_invalidate()
+        return ret[0]
 
     async def delete(self):
-        return await redcache.delete(self.key)
+        ret = await redcache.delete(self.key)
+        await self.near_invalidate()
+        return ret
 
     async def exists(self):
         return await redcache.exists(self.key)
@@ -107,7 +176,9 @@ class UserStatCache(BaseCache):
         :param field:
         :return:
         """
-        return await redcache.script.hincr_if_exists(keys=[self.key], args=[field, 1])
+        cnt = await redcache.script.hincr_if_exists(keys=[self.key], args=[field, 1])
+        await self.near_invalidate()
+        return cnt
 
     async def decr(self, field: UserStatsField):
         """
@@ -116,15 +187,15 @@ class UserStatCache(BaseCache):
         :return:
         """
         cnt = await redcache.script.hincr_if_exists(keys=[self.key], args=[field, -1])
-        if cnt is None or cnt >= 0:
-            return cnt
-
-        cnt = await redcache.script.hincr_if_exists(keys=[self.key], args=[field, -cnt])
+        if cnt is not None and cnt < 0:
+            cnt = await redcache.script.hincr_if_exists(keys=[self.key], args=[field, -cnt])
+        await self.near_invalidate()
         return cnt
 
 
 class UnReadMsgCntCache(BaseCache):
     __KEY__ = CacheKey.UNREAD_MSG_CNT.value
+    NEAR_TTL = 3
 
     def __init__(self, uid: int):
         self.key = self.__KEY__.format(uid)
@@ -133,15 +204,28 @@ class UnReadMsgCntCache(BaseCache):
         async with redcache.pipeline() as pipe:
             pipe.hset(self.key, mapping=data).expire(self.key, exp)
             ret = await pipe.execute()
-            return ret[0]
+        await self.near_invalidate()
+        return ret[0]
 
     async def get(self):
-        ret = await redcache.hgetall(self.key)
+        ret = await self.near_load(lambda: redcache.hgetall(self.key))
         if ret:
             return UnReadMsgCntSchema(**ret)
 
     async def delete(self):
-        return await redcache.delete(self.key)
+        ret = await redcache.delete(self.key)
+        await self.near_invalidate()
+        return ret
+
+    @classmethod
+    async def delete_many(cls, uids: Iterable[int]) -> int:
+        """批量删除（如批量写入通知后），下次读取时回源重建"""
+        keys = [cls.__KEY__.format(uid) for uid in set(uids)]
+        if not keys:
+            return 0
+        ret = await redcache.delete(*keys)
+        await near_cache.invalidate(*keys)
+        return ret
 
     @property
     async def exists(self):
@@ -153,7 +237,9 @@ class UnReadMsgCntCache(BaseCache):
         :param field:
         :return:
         """
-        return await redcache.script.hincr_if_exists(keys=[self.key], args=[field, 1], amount=1)
+        cnt = await redcache.script.hincr_if_exists(keys=[self.key], args=[field, 1], amount=1)
+        await self.near_invalidate()
+        return cnt
 
     async def decr(self, field: UnReadMsgCntField, amount=1):
         """
@@ -163,10 +249,9 @@ class UnReadMsgCntCache(BaseCache):
         :return:
         """
         cnt = await redcache.script.hincr_if_exists(keys=[self.key], args=[field, -amount])
-        if cnt is None or cnt >= 0:
-            return cnt
-
-        cnt = await redcache.script.hincr_if_exists(keys=[self.key], args=[field, -cnt])
+        if cnt is not None and cnt < 0:
+            cnt = await redcache.script.hincr_if_exists(keys=[self.key], args=[field, -cnt])
+        await self.near_invalidate()
         return cnt
 
     async def reset_all(self):
@@ -178,4 +263,51 @@ class UnReadMsgCntCache(BaseCache):
     async def reset_one(self, field: UnReadMsgCntField):
         """重置某一类消息"""
         if self.exists:
-            return await redcache.hset(self.key, field, 0)
+            ret = await redcache.hset(self.key, field, 0)
+            await self.near_invalidate()
+            return ret
+
+
+class UserGroupsCache(BaseCache):
+    """
+    用户加入的共享组 id 集合
+
+    集合中固定包含占位成员 `EMPTY`，用于区分“未加载”和“未加入任何组”
+
+    成员变化后在提交后删除集合，由下次读取整体加载；读取与删除交错时可能写回旧集合，
+    过期时间较短以限制不一致的时长
+    """
+
+    __KEY__ = CacheKey.USER_GROUPS.value
+    EMPTY = "-"
+
+    def __init__(self, uid: int):
+        self.key = self.__KEY__.format(uid)
+
+    async def get(self) -> set[str] | None:
+        """未加载时返回 None"""
+        ret = await redcache.smembers(self.key)
+        if not ret:
+            return None
+        ret.discard(self.EMPTY)
+        return ret
+
+    async def add(self, group_ids: Iterable[str], expire=10 * 60):
+        async with redcache.pipeline() as pipe:
+            pipe.delete(self.key).sadd(self.key, self.EMPTY, *group_ids).expire(self.key, expire)
+            ret = await pipe.execute()
+        return ret[1]
+
+    async def delete(self):
+        return await redcache.delete(self.key)
+
+    async def exists(self):
+        return await redcache.exists(self.key)
+
+    @classmethod
+    async def invalidate(cls, user_ids: Iterable[int]) -> int:
+        """用户加入/退出组后删除其集合"""
+        keys = [cls.__KEY__.format(uid) for uid in set(user_ids)]
+        if not keys:
+            return 0
+        return await redcache.delete(*keys)
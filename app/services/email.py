@@ -111,6 +111,24 @@ class EmailService:
             body=self._get_invite_anniv_email_body(inviter, invitee, title, anniv_date, token),
         )
 
+    async def send_anniv_remind_email(
+        self, email: str, username: str, content: str, anniv_date: date, **kwargs
+    ):
+        """发送纪念日提醒邮件
+
+        Args:
+            email (str): 邮箱
+            username (str): 接收者
+            content (str): 提醒内容
+            anniv_date (date): 本次纪念日日期
+        """
+
+        await self._send_email(
+            to_email=email,
+            subject=self._get_email_subject(EmailBizEnum.REMIND_ANNIV),
+            body=self._get_remind_anniv_email_body(username, content, anniv_date),
+        )
+
     async def _send_email(self, to_email: str, subject: str, body: str):
         """
         实际发送邮件的方法
@@ -201,6 +219,24 @@ class EmailService:
 
         return html_body
 
+    def _get_remind_anniv_email_body(self, username: str, content: str, anniv_date: date) -> str:
+        html_content = f"""
+        <html>
+            <body>
+                <div style="padding: 20px; font-family: Arial, sans-serif;">
+                    <h2 style="color: #333;">纪念日提醒</h2>
+                    <p style="font-size: 16px; color: #666;">{username}，您好：</p>
+                    <p style="font-size: 20px; font-weight: bold; color: #007bff;">{content}</p>
+                    <p style="font-size: 14px; color: #999; margin-top: 20px;">
+                        纪念日日期：{anniv_date}
+                    </p>
+                </div>
+            </body>
+        </html>
+        """
+
+        return html_content
+
 
 # 创建全局实例
 email_service = EmailService()
@@ -8,6 +8,7 @@ from app.repo.interaction import interaction_repo
 from app.schemas.action import DoInteractionSchema
 from app.schemas.anniversary import AnnivStats
 from app.services.cache.counter import AnnivCounter, AnnivCounterField
+from app.services.cache.decorator import cached
 from app.utils.dater import DT
 
 
@@ -35,16 +36,16 @@ class InteractionService:
         if self.rtype == ResourceType.ANNIV:
             return await self.check_anniv_exist(session, rid)
 
-    async def update_anniv_counter(self, session, anniv_id: str, amount: int):
-        cache = AnnivCounter(anniv_id)
-        if not await cache.exists():
-            data = await anniv_repo.get_counter(session, anniv_id)
-            data[self._anniv_counter_name] += amount
-            await cache.add(data)
-
-            return 1
+    @staticmethod
+    @cached(AnnivCounter, ("anniv_id",), ttl=3 * 24 * 60 * 60, data_type="hash")
+    async def load_anniv_counter(session, anniv_id: str) -> dict:
+        """计数不在缓存中时从 DB 加载，并发未命中只回源一次"""
+        return await anniv_repo.get_counter(session, anniv_id)
 
-        return await cache.incr(self._anniv_counter_name, amount)
+    async def update_anniv_counter(self, session, anniv_id: str, amount: int):
+        # 先确保计数已加载到缓存，再原子累加；并发首次写入时不会互相覆盖
+        await self.load_anniv_counter(session, anniv_id)
+        return await AnnivCounter(anniv_id).incr(self._anniv_counter_name, amount)
 
     async def update_counter(self, session, rid: str, amount: int):
         if self.rtype == ResourceType.ANNIV:
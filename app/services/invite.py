@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 import secrets
 from time import time
@@ -17,10 +18,12 @@ from app.core.loggers import app_logger
 from app.ext.jwt import TokenUserInfo
 from app.models.invite import InviteModel
 from app.repo.anniversary import anniv_member_repo, anniv_repo
+from app.repo.loader import get_loaders
 from app.repo.user import share_group_repo, user_repo
 from app.schemas.anniversary import AnnivSchema, CreateAnnivSchema, InviteFieldSchema
 from app.repo.invite import invite_repo
 from app.schemas.invite import InviteItem
+from app.services.cache.anniv import AnnivStatCache
 from app.services.email import email_service
 from app.services.user import SettingsService, UserService
 from app.utils.common import gen_urlsafe_token, hash_token
@@ -176,14 +179,20 @@ class InviteService:
         if not invites:
             return
 
-        for item in invites:
-            user_ids = {item.inviter_id}
-            if item.invitee_user_id:
-                user_ids.add(item.invitee_user_id)
+        # 预先批量加载全部邀请涉及的用户和纪念日，循环内直接命中 loader 缓存
+        loaders = get_loaders(session)
+        user_mapping, anniv_mapping = await asyncio.gather(
+            loaders.users.load_many(
+                uid for item in invites for uid in (item.inviter_id, item.invitee_user_id) if uid
+            ),
+            loaders.annivs.load_many(item.tid for item in invites),
+        )
 
+        for item in invites:
             try:
-                anniv = await anniv_repo.retrieve_or_404(session, item.tid)
-                user_mapping = await UserService.get_user_mapping(session, list(user_ids))
+                anniv = anniv_mapping.get(item.tid)
+                if not anniv:
+                    raise HTTPException(status_code=404)
                 inviter = user_mapping.get(item.inviter_id)
                 invitee = user_mapping.get(item.invitee_user_id)
                 if not inviter:
@@ -256,12 +265,12 @@ class InviteService:
             if invite_ttype == 2:
                 invite_tid = cur_user and cur_user.id or None
             else:
-                share_group = await share_group_repo.retrieve(invite_tid)
+                share_group = await share_group_repo.retrieve(session, invite_tid)
                 if share_group.owner_id != cur_user.id:
                     raise PermissionDenied(errmsg="您已不属于此组成员")
 
             anniv_member = [{"ttype": invite_ttype, "tid": invite_tid, "anniv_id": invite.tid}]
-            anniv_member_repo.batch_add(session, anniv_member, commit=False)
+            await anniv_member_repo.batch_add(session, anniv_member, commit=False)
         else:
             invite.state = InviteState.DECLINED
 
@@ -269,6 +278,8 @@ class InviteService:
         invite.responded_at = DT.ts2time(now)
 
         await session.commit()
+        if action == "accept":
+            await AnnivStatCache.invalidate_visible(session, [invite.tid])
 
         # TODO 给 inviter 发送“对方已接受/已拒绝”的站内通知 / 邮件
         # ...
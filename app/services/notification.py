@@ -3,6 +3,7 @@ from collections import defaultdict
 from typing import List
 from typing_extensions import DefaultDict
 from app.constant import ResourceType, SysActionEnum, SysAnnounceActionEnum
+from app.core.fanout import StageRunner
 from app.core.types import TActionEnum
 from app.ext.jwt import TokenUserInfo
 from app.repo.anniversary import anniv_repo
@@ -12,14 +13,16 @@ from app.repo.notification import (
     remind_ntfy_repo,
     sys_ntfy_repo,
 )
-from app.repo.user import user_repo
+from app.repo.loader import get_loaders
 from app.schemas.anniversary import AnnivFeedItem
 from app.schemas.notification import (
     AnnounceNotifyItem,
     QueryRemindNotifySchema,
     RemindNotifyItem,
     SysNotifyItem,
+    UnReadMsgCntSchema,
 )
+from app.services.cache.decorator import cached
 from app.services.cache.user import UnReadMsgCntCache
 from app.utils.dater import DT
 
@@ -70,10 +73,13 @@ class RemindNtfyService(BaseNtfyService):
 
         uids = {uid for row in rows for uid in row.from_uids} | {cur_uid}
 
-        target_map = await self.get_targets(session, [(row.ttype, row.tid) for row in rows])
-        users_map = await user_repo.get_user_mapping(
-            session, uids, only_cols=user_repo.BASE_USER_COLS
+        enriched = await (
+            StageRunner("remind_ntfy")
+            .add("targets", self.get_targets, [(row.ttype, row.tid) for row in rows], db=True)
+            .add("users", get_loaders(session).users.load_many, uids)
+            .run()
         )
+        target_map, users_map = enriched["targets"], enriched["users"]
         items = []
         max_id_map: dict[int, int] = {}
         for item in rows:
@@ -91,14 +97,15 @@ class RemindNtfyService(BaseNtfyService):
 
         return paged
 
-    async def get_unread_msgcounts(self, session, uid: int) -> dict:
-        cache = UnReadMsgCntCache(uid)
-        data = await cache.get()
-        if not data:
-            data = await remind_ntfy_cursor_repo.get_unread_count(session, uid)
-            await cache.add(data.model_dump())
-
-        return data
+    @cached(
+        UnReadMsgCntCache,
+        ("uid",),
+        ttl=24 * 60 * 60,
+        data_type="hash",
+        type_=UnReadMsgCntSchema,
+    )
+    async def get_unread_msgcounts(self, session, uid: int) -> UnReadMsgCntSchema:
+        return await remind_ntfy_cursor_repo.get_unread_count(session, uid)
 
     async def reset_all_msgcounts(self, session, uid: int):
         now = DT.now_ts()
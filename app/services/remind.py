@@ -0,0 +1,448 @@
+"""
+提醒分发
+按 reminder_slot.next_trigger_at 认领到期提醒，投递到规则的各渠道，并在同一事务内推进下一次触发时间
+"""
+
+import asyncio
+import time
+import traceback
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.config import settings
+from app.constant import CalendarType, ReminderChannel, ResourceType, SysActionEnum
+from app.core.loggers import app_logger
+from app.database import db
+from app.repo.anniversary import anniv_repo, reminder_slot_repo, remind_repo
+from app.repo.loader import get_loaders
+from app.repo.notification import sys_ntfy_repo
+from app.services.cache.remind import RemindRolloverCheckpoint, RemindWheelCache
+from app.services.cache.user import UnReadMsgCntCache
+from app.services.email import email_service
+from app.utils.common import chunker
+from app.utils.dater import DT
+from app.utils.remind_calculator import RemindConfigCalculator
+
+
+class RemindDispatchService:
+    @staticmethod
+    def remind_content(name: str, offset_days: int) -> str:
+        if offset_days < 0:
+            return f"距离「{name}」还有 {-offset_days} 天"
+        if offset_days > 0:
+            return f"「{name}」已过去 {offset_days} 天"
+        return f"今天是「{name}」"
+
+    @staticmethod
+    def next_triggers(
+        rows, calculators: dict[str, RemindConfigCalculator], now: datetime = None
+    ) -> list[datetime | None]:
+        """按纪念日重复规则批量计算 slot 的下一次触发时间，不再重复时为 None；按时区分组计算"""
+        now = now or DT.now_time()
+        groups: dict[str, list[int]] = {}
+        for i, row in enumerate(rows):
+            groups.setdefault(row.tz, []).append(i)
+
+        ret: list[datetime | None] = [None] * len(rows)
+        for tz, indexes in groups.items():
+            calculator = calculators.get(tz)
+            if calculator is None:
+                calculator = calculators[tz] = RemindConfigCalculator(ZoneInfo(tz))
+            group = [rows[i] for i in indexes]
+            next_triggers = calculator.calculate_next_triggers(
+                event_dates=[
+                    date(row.lunar_year, row.lunar_month, row.lunar_day)
+                    if row.calendar_type == CalendarType.LUNAR
+                    else row.event_date
+                    for row in group
+                ],
+                repeat_types=[row.repeat_type for row in group],
+                calendar_types=[row.calendar_type for row in group],
+                offsets=[row.offset_days for row in group],
+                trigger_times=[row.trigger_time for row in group],
+                leaps=[row.lunar_is_leap for row in group],
+                now=now,
+            )
+            for i, next_trigger in zip(indexes, next_triggers):
+                ret[i] = next_trigger
+        return ret
+
+    @classmethod
+    async def dispatch_due(cls, session, batch_size: int = None, lag: int = None) -> int:
+        """
+        分发到期提醒
+
+        每批在一个事务内完成：认领（FOR UPDATE SKIP LOCKED）→ 写站内通知 → 推进 next_trigger_at → 提交，
+        多个 worker 同时执行时各自认领不同的行，不会重复发送。只处理本轮开始前到期的提醒，
+        之后到期的由下一轮处理；邮件在提交后投递到异步任务。整批失败时逐个重试，
+        仍失败的 slot 被停止，不会阻塞队列
+
+        :param batch_size: 每批认领数量
+        :param lag: 只处理逾期超过该时长（秒）的提醒，默认启用时间轮时为 REMIND_WHEEL_GRACE，
+            准点分发交给时间轮，这里只兜底
+        :return: 处理的 slot 数量
+        """
+        batch_size = batch_size or settings.REMIND_DISPATCH_BATCH
+        if lag is None:
+            lag = settings.REMIND_WHEEL_GRACE if settings.REMIND_WHEEL_ENABLE else 0
+        now = DT.now_time()
+        calculators: dict[str, RemindConfigCalculator] = {}
+
+        before = now - timedelta(seconds=lag)
+        total = 0
+        while True:
+            try:
+                rows = await remind_repo.claim_due(session, before, batch_size)
+            except Exception as e:
+                await cls._rollback(session)
+                traceback.print_exc()
+                app_logger.error(f"failed to claim reminders, errmsg：{str(e)}")
+                break
+            if not rows:
+                break
+
+            try:
+                await cls._dispatch(session, rows, now, calculators)
+            except Exception as e:
+                await cls._rollback(session)
+                traceback.print_exc()
+                app_logger.error(f"failed to dispatch reminders, retry one by one, errmsg：{str(e)}")
+                # 逐个分发，失败的 slot 被停止；仍有未处理的（如 DB 不可用）时结束本轮，避免反复认领
+                if await cls._dispatch_each(session, rows, before, now, calculators) < len(rows):
+                    break
+
+            total += len(rows)
+            if len(rows) < batch_size:
+                break
+
+        app_logger.info(f"succeeded to dispatch reminders, {total} slots")
+        return total
+
+    @classmethod
+    async def dispatch_slots(cls, session, slot_ids: list[str]) -> int:
+        """
+        分发时间轮弹出的 slot
+
+        同样按 next_trigger_at <= now 认领：已被其他 worker 分发、已修改或已删除的 slot 自动跳过
+        :return: 处理的 slot 数量
+        """
+        now = DT.now_time()
+        try:
+            rows = await remind_repo.claim_due(session, now, len(slot_ids), slot_ids=slot_ids)
+        except Exception as e:
+            await cls._rollback(session)
+            traceback.print_exc()
+            app_logger.error(f"failed to claim reminders {slot_ids}, errmsg：{str(e)}")
+            return 0
+        if not rows:
+            return 0
+
+        try:
+            await cls._dispatch(session, rows, now, {})
+        except Exception as e:
+            await cls._rollback(session)
+            traceback.print_exc()
+            app_logger.error(
+                f"failed to dispatch reminders {slot_ids}, retry one by one, errmsg：{str(e)}"
+            )
+            return await cls._dispatch_each(session, rows, now, now, {})
+        return len(rows)
+
+    @classmethod
+    async def _dispatch_each(
+        cls, session, rows, before: datetime, now: datetime, calculators: dict
+    ) -> int:
+        """
+        整批分发失败后逐个重新认领并分发，单个 slot 失败时置空其 next_trigger_at（停止该 slot）
+        并记录日志，不再阻塞后续提醒
+
+        :param before: 认领条件 next_trigger_at <= before，已被其他 worker 处理的 slot 自动跳过
+        :return: 已处理（分发或停止）的 slot 数量
+        """
+        handled = 0
+        for row in rows:
+            try:
+                claimed = await remind_repo.claim_due(session, before, 1, slot_ids=[row.id])
+                if claimed:
+                    await cls._dispatch(session, claimed, now, calculators)
+                handled += 1
+                continue
+            except Exception as e:
+                await cls._rollback(session)
+                app_logger.error(f"提醒 slot {row.id} 分发失败，停止该 slot：{e}")
+
+            try:
+                await reminder_slot_repo.batch_update(
+                    session,
+                    [{"id": row.id, "next_trigger_at": None}],
+                    commit=False,
+                    handle_unmatch="ignore",
+                )
+                await session.commit()
+                handled += 1
+            except Exception as e:
+                await cls._rollback(session)
+                app_logger.error(f"提醒 slot {row.id} 停止失败：{e}")
+        return handled
+
+    @staticmethod
+    async def _rollback(session):
+        await session.rollback()
+        # 回滚后 ORM 对象已过期，loader 中缓存的用户不能再使用
+        get_loaders(session).users.clear()
+
+    @classmethod
+    async def _dispatch(cls, session, rows, now: datetime, calculators: dict):
+        """投递一批已认领的提醒并提交，提交后清理未读计数缓存、投递邮件任务"""
+        site_uids, emails, slot_values = await cls._dispatch_batch(session, rows, now, calculators)
+        await session.commit()
+        # 提交后 ORM 对象已过期，下一批重新查询用户
+        get_loaders(session).users.clear()
+
+        await UnReadMsgCntCache.delete_many(site_uids)
+        await RemindWheelCache().schedule((i["id"], i["next_trigger_at"]) for i in slot_values)
+        if emails:
+            from app.tasks.anniv_task import send_remind_email
+
+            send_remind_email.delay(emails)
+
+    @classmethod
+    async def _dispatch_batch(cls, session, rows, now: datetime, calculators: dict):
+        """
+        投递一批已认领的提醒并推进 next_trigger_at，不提交
+
+        :return: (收到站内通知的用户 id, 待发送的邮件, 推进后的 slot)
+        """
+        min_trigger_at = now - timedelta(seconds=settings.REMIND_DISPATCH_MAX_DELAY)
+        slot_values = []
+        site_rows = []
+        email_rows = []
+
+        next_triggers = cls.next_triggers(rows, calculators)
+        for row, next_trigger_at in zip(rows, next_triggers):
+            if not row.enabled:
+                # 规则已停用或纪念日已删除，结束该 slot
+                slot_values.append({"id": row.id, "next_trigger_at": None})
+                continue
+
+            if next_trigger_at is not None and next_trigger_at <= now:
+                app_logger.warning(f"提醒 slot {row.id} 下次触发时间 {next_trigger_at} 未推进")
+                next_trigger_at = None
+            slot_values.append({"id": row.id, "next_trigger_at": next_trigger_at})
+
+            # 长时间积压（如分发停止后恢复）的提醒已失去意义，只推进不发送
+            if row.next_trigger_at < min_trigger_at:
+                continue
+
+            channels = set(row.channels or ())
+            if ReminderChannel.SITE in channels:
+                site_rows.append(row)
+            if ReminderChannel.EMAIL in channels:
+                email_rows.append(row)
+            if ReminderChannel.SMS in channels:
+                # 暂无短信发送实现，只记录后跳过，其他渠道照常发送
+                app_logger.info(f"提醒 slot {row.id} 短信渠道暂不支持，已跳过")
+
+        if site_rows:
+            await sys_ntfy_repo.batch_create(
+                session,
+                [
+                    {
+                        "title": "纪念日提醒",
+                        "content": cls.remind_content(row.name, row.offset_days),
+                        "to_uid": row.user_id,
+                        "action": SysActionEnum.SYS,
+                        "ttype": ResourceType.ANNIV,
+                        "tid": row.anniv_id,
+                        "ttime": DT.time2ts(row.next_trigger_at),
+                    }
+                    for row in site_rows
+                ],
+                commit=False,
+            )
+
+        emails = []
+        if email_rows:
+            users = await get_loaders(session).users.load_many(row.user_id for row in email_rows)
+            for row in email_rows:
+                user = users.get(row.user_id)
+                if not user or not user.email:
+                    continue
+                local_trigger_at = row.next_trigger_at.astimezone(ZoneInfo(row.tz))
+                emails.append(
+                    {
+                        "email": user.email,
+                        "username": user.username,
+                        "content": cls.remind_content(row.name, row.offset_days),
+                        "anniv_date": DT.date2str(
+                            local_trigger_at.date() - timedelta(days=row.offset_days)
+                        ),
+                    }
+                )
+
+        await reminder_slot_repo.batch_update(
+            session, slot_values, commit=False, handle_unmatch="ignore"
+        )
+        return [row.user_id for row in site_rows], emails, slot_values
+
+    @staticmethod
+    async def send_emails(items: list[dict]) -> int:
+        """发送提醒邮件，单封失败只记录日志"""
+        sent = 0
+        for item in items:
+            try:
+                await email_service.send_anniv_remind_email(**item)
+            except Exception as e:
+                app_logger.error(f"提醒邮件发送失败：{item['email']} {e}")
+                continue
+            sent += 1
+        return sent
+
+
+class RemindWheelService:
+    """
+    提醒时间轮（两级调度）：定期把未来 REMIND_WHEEL_HORIZON 秒内到期的 slot 从 DB 加载到 redis zset，
+    web worker 内的消费者按 score 弹出到期成员并准点分发。时间轮中的成员丢失（如弹出后分发失败）时，
+    由 RemindDispatchService.dispatch_due 的兜底扫描补发
+    """
+
+    # 时间轮为空或下一个成员较远时的最长等待时间（秒），新写入的近期成员最多延迟这么久
+    POLL_INTERVAL = 0.5
+    BATCH_SIZE = 500
+
+    @staticmethod
+    async def load(session) -> int:
+        """加载近期到期的 slot，重复加载只会覆盖 score"""
+        until = DT.now_time() + timedelta(seconds=settings.REMIND_WHEEL_HORIZON)
+        rows = await remind_repo.list_upcoming(session, until)
+
+        wheel = RemindWheelCache()
+        for batch in chunker(iter(rows), chunk_size=5000):
+            await wheel.add({slot_id: trigger_at.timestamp() for slot_id, trigger_at in batch})
+
+        app_logger.info(f"succeeded to load remind wheel, {len(rows)} slots")
+        return len(rows)
+
+    @classmethod
+    async def consume(cls):
+        """消费到期成员，常驻运行"""
+        wheel = RemindWheelCache()
+        while True:
+            try:
+                slot_ids = await wheel.pop_due(time.time(), cls.BATCH_SIZE)
+                if slot_ids:
+                    async with db.async_db_session() as session:
+                        await RemindDispatchService.dispatch_slots(session, slot_ids)
+                    continue
+
+                next_due_at = await wheel.next_due_at()
+                delay = cls.POLL_INTERVAL
+                if next_due_at is not None:
+                    delay = min(max(next_due_at - time.time(), 0), delay)
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                app_logger.error(f"提醒时间轮消费异常 {e}")
+                await asyncio.sleep(1)
+
+    @classmethod
+    def start(cls) -> asyncio.Task | None:
+        """启动后台消费任务，未启用时间轮时不启动"""
+        if not settings.REMIND_WHEEL_ENABLE:
+            return None
+        return asyncio.create_task(cls.consume())
+
+
+class RemindRolloverService:
+    """
+    夜间批量滚动已过期的 next_trigger_at
+
+    纪念日的 next_trigger_at 只在创建、编辑时计算，重复纪念日过期后需要推进到下一个周期，
+    否则会落入列表的“已过去”分组、从近期/年度统计中消失。slot 正常由分发推进，这里只处理
+    超过 REMIND_DISPATCH_MAX_DELAY 仍未分发的（分发停止期间积压的，分发也不会再发送），
+    更近的留给分发，不会漏发。
+
+    按 id 键集分页，每批一个事务：锁定 → 批量计算 → UPDATE ... FROM VALUES 写回 → 提交，
+    提交后把进度写入 redis；任务中断时下一轮从进度之后继续，完整跑完后清除进度
+    """
+
+    @classmethod
+    async def rollover(cls, session, batch_size: int = None) -> dict[str, int]:
+        """
+        :param batch_size: 每批处理行数
+        :return: 各阶段更新的行数
+        """
+        batch_size = batch_size or settings.REMIND_ROLLOVER_BATCH
+        return {
+            "anniv": await cls._run(session, "anniv", cls._rollover_annivs, batch_size),
+            "slot": await cls._run(session, "slot", cls._rollover_slots, batch_size),
+        }
+
+    @staticmethod
+    async def _run(session, phase: str, handler, batch_size: int) -> int:
+        checkpoint = RemindRolloverCheckpoint(phase)
+        last_id = await checkpoint.get()
+        if last_id:
+            app_logger.info(f"resume remind rollover {phase} after {last_id}")
+
+        now = DT.now_time()
+        calculators: dict[str, RemindConfigCalculator] = {}
+        scanned = updated = 0
+        start = time.perf_counter()
+        while True:
+            try:
+                rows, cnt = await handler(session, now, last_id, batch_size, calculators)
+            except Exception as e:
+                await session.rollback()
+                traceback.print_exc()
+                app_logger.error(f"failed to roll over {phase} after {last_id}, errmsg：{str(e)}")
+                break
+
+            if rows:
+                last_id = rows[-1].id
+                await checkpoint.add(last_id)
+                scanned += len(rows)
+                updated += cnt
+            if len(rows) < batch_size:
+                await checkpoint.delete()
+                break
+
+        elapsed = time.perf_counter() - start
+        app_logger.info(
+            f"succeeded to roll over {phase}, scanned {scanned} updated {updated} "
+            f"in {elapsed:.1f}s ({scanned / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+        return updated
+
+    @staticmethod
+    async def _rollover_annivs(session, now: datetime, after_id, limit: int, calculators: dict):
+        """推进一批重复纪念日并提交，无法计算出下一次触发时间的保持原值"""
+        rows = await anniv_repo.lock_expired_repeating(session, now, after_id, limit)
+        next_triggers = RemindDispatchService.next_triggers(rows, calculators, now)
+        values = [
+            {"id": row.id, "next_trigger_at": next_trigger}
+            for row, next_trigger in zip(rows, next_triggers)
+            if next_trigger is not None
+        ]
+        await anniv_repo.batch_update(session, values, commit=False, handle_unmatch="ignore")
+        await session.commit()
+        return rows, len(values)
+
+    @staticmethod
+    async def _rollover_slots(session, now: datetime, after_id, limit: int, calculators: dict):
+        """推进一批积压的 slot 并提交，规则停用、纪念日删除或不再重复的置空"""
+        before = now - timedelta(seconds=settings.REMIND_DISPATCH_MAX_DELAY)
+        rows = await remind_repo.lock_expired_slots(session, before, after_id, limit)
+        next_triggers = RemindDispatchService.next_triggers(rows, calculators, now)
+        values = [
+            {"id": row.id, "next_trigger_at": next_trigger if row.enabled else None}
+            for row, next_trigger in zip(rows, next_triggers)
+        ]
+        await reminder_slot_repo.batch_update(
+            session, values, commit=False, handle_unmatch="ignore"
+        )
+        await session.commit()
+
+        await RemindWheelCache().schedule((i["id"], i["next_trigger_at"]) for i in values)
+        return rows, len(values)
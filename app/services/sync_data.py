@@ -1,6 +1,6 @@
 import traceback
 from app.core.loggers import app_logger
-from app.database import redcache
+from app.repo.anniv_visibility import anniv_visibility_repo
 from app.repo.anniversary import anniv_repo
 from app.services.cache.counter import AnnivCounter
 from app.utils.common import chunker
@@ -8,33 +8,56 @@ from app.utils.common import chunker
 
 class SyncDataService:
     @staticmethod
-    async def synchronize_anniv_count(session):
+    async def synchronize_anniv_count(session, full_scan=False):
         """
         同步纪念日计数字段
-        :return:
+
+        只处理脏集合中的 id：SPOP 原子取出一批 → pipeline 读取计数 → 批量更新 DB → 续期缓存；
+        取出后再发生的变更会重新进入脏集合，由下一批/下一轮处理。缓存不删除，热点计数保持可用
+
+        :param full_scan: 先扫描全部计数 key 标记为脏（首次上线或脏集合丢失时使用）
+        :return: 同步条数
         """
 
         size = 5000
-        keys = await AnnivCounter("*").scan(count=size)
+        if full_scan:
+            keys = await AnnivCounter("*").scan(count=size)
+            for batch in chunker(iter(keys), chunk_size=size):
+                await AnnivCounter.mark_dirty([k.rsplit(":", 1)[1] for k in batch])
 
-        for batch in chunker(keys, chunk_size=size):
+        total = 0
+        while ids := await AnnivCounter.pop_dirty(size):
             try:
-                data = await AnnivCounter.get_cache_data(
-                    redcache, "hash", batch, cmd="HGETALL", sep_rule=(":", 1, 1)
-                )
-                if not data:
-                    continue
-                await anniv_repo.batch_edit(session, data)
-
-                ret = await redcache.delete(*batch)
-                app_logger.info(f"succeeded to synchronize bp count, deleted cache {ret} items")
+                mapping = await AnnivCounter.get_many(ids)
+                data = [{"id": rid, **cnt} for rid, cnt in mapping.items() if cnt]
+                if data:
+                    await anniv_repo.batch_edit(session, data)
+                    await AnnivCounter.expire_many([i["id"] for i in data])
+                total += len(data)
 
             except Exception as e:
                 await session.rollback()
                 traceback.print_exc()
-                app_logger.error(f"failed to synchronize bp count, errmsg：{str(e)}")
+                app_logger.error(f"failed to synchronize anniv count, errmsg：{str(e)}")
+
+                # 放回脏集合，下一轮重试
+                await AnnivCounter.mark_dirty(ids)
+                break
 
-                for k in batch:  # 更新失败延长缓存key过期时间
-                    await AnnivCounter(k).expire()
+        app_logger.info(f"succeeded to synchronize anniv count, {total} items")
+        return total
 
-                continue
+    @staticmethod
+    async def rebuild_anniv_visibility(session):
+        """
+        全量重建纪念日可见性表
+        :return: 写入行数
+        """
+        try:
+            total = await anniv_visibility_repo.rebuild(session)
+        except Exception:
+            await session.rollback()
+            raise
+
+        app_logger.info(f"succeeded to rebuild anniversary visibility, {total} rows")
+        return total
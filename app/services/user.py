@@ -11,6 +11,7 @@ from app.constant import GroupRole
 from app.ext.jwt import TokenUserInfo
 from app.models.user import ShareGroupModel, User
 from app.repo.interaction import interaction_repo
+from app.repo.loader import get_loaders
 from app.repo.relationship import fan_repo, follow_repo
 from app.repo.user import UserRepo, share_group_repo, user_repo, user_settings_repo
 from app.schemas.user import (
@@ -23,7 +24,8 @@ from app.schemas.user import (
     UserSchema,
     UserStats,
 )
-from app.services.cache.user import UserStatCache
+from app.services.cache.decorator import cached
+from app.services.cache.user import UserGroupsCache, UserStatCache
 from app.utils.dater import DT
 
 
@@ -87,13 +89,24 @@ class UserService:
 
     @staticmethod
     async def get_user_mapping(session, uids: list[int]) -> dict[int, User]:
-        data: User = await user_repo.list_by_uid(session, uids, only_cols=UserRepo.BASE_USER_COLS)
-        ret = {u.id: u for u in data}
-        return ret
+        return await get_loaders(session).users.load_many(uids)
+
+    @staticmethod
+    async def get_joined_group_ids(session, uid: int) -> set[str]:
+        """用户加入的共享组 id，优先读缓存"""
+        cache = UserGroupsCache(uid)
+        group_ids = await cache.get()
+        if group_ids is None:
+            group_ids = set(await share_group_repo.list_me_joined_group_ids(session, uid))
+            await cache.add(group_ids)
+        return group_ids
 
     @staticmethod
     async def get_group_list(session, uid: int, search: str):
-        items = await share_group_repo.list(session, cur_user_id=uid, kw=search)
+        joined = await UserService.get_joined_group_ids(session, uid)
+        items = await share_group_repo.list(
+            session, cur_user_id=uid, kw=search, joined_group_ids=joined
+        )
         return items
 
     @staticmethod
@@ -133,17 +146,19 @@ class UserService:
             for uid in member_ids
         ]
         ret = await share_group_repo.add(session, group_data, member_data)
+        # share_group_repo.add 已提交，删除成员的集合而不是追加，避免与提交前的读取交错后缺少新组
+        await UserGroupsCache.invalidate(member_ids)
 
         return ret
 
     @staticmethod
     async def get_group_detail(session, group_id: str) -> ShareGroupShema:
-        group = await share_group_repo.retrieve(session, group_id)
+        loaders = get_loaders(session)
+        group = await loaders.groups.load(group_id)
+        if not group:
+            raise HTTPException(status_code=404)
         members = group.members
-        users = await user_repo.list_by_uid(
-            session, {m.user_id for m in members}, only_cols=user_repo.BASE_USER_COLS
-        )
-        users_mapping = {u.id: u for u in users}
+        users_mapping = await loaders.users.load_many(m.user_id for m in members)
 
         group_item = ShareGroupShema.model_validate(group)
 
@@ -161,21 +176,15 @@ class UserService:
         return group_item
 
     @staticmethod
+    @cached(UserStatCache, ("uid",), ttl=12 * 60 * 60, data_type="hash", type_=UserStats)
     async def get_stats(session, uid: int):
-        cache = UserStatCache(uid)
-        data = await cache.get(session)
-        if data:
-            return data
-
         follow_cnt = await follow_repo.get_follow_cnt(session, uid)
         fan_cnt = await fan_repo.get_fan_cnt(session, uid)
         like_collect_cnt_mapping = await interaction_repo.get_like_collect_cnt(session, uid)
 
         # TODO comment
 
-        data = {"follow_cnt": follow_cnt, "fan_cnt": fan_cnt, **like_collect_cnt_mapping}
-        await cache.add(data)
-        return UserStats(**data)
+        return UserStats(follow_cnt=follow_cnt, fan_cnt=fan_cnt, **like_collect_cnt_mapping)
 
 
 class SettingsService:
@@ -4,6 +4,7 @@ from celery.utils.log import get_task_logger
 from app.constant import InviteTargetType
 import app.database.db as db
 from app.services.invite import InviteService
+from app.services.remind import RemindDispatchService
 from app.tasks._runtime import run_coro
 from make_celery import celery_app
 
@@ -19,3 +20,8 @@ async def _send_email_invite(ttype: InviteTargetType, tid: str):
 @celery_app.task(bind=True, queue="email-job")
 def send_email_invite(self, ttype: InviteTargetType, tid: str):
     return run_coro(_send_email_invite(ttype, tid))
+
+
+@celery_app.task(bind=True, queue="email-job")
+def send_remind_email(self, items: list[dict]):
+    return run_coro(RemindDispatchService.send_emails(items))
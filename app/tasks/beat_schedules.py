@@ -18,4 +18,20 @@ BEAT_SCHEDULES = {
         "schedule": crontab(minute="08", hour="*/6"),
         "args": (),
     },
+    "dispatch_reminders": {
+        "task": "app.tasks.sync_task.dispatch_reminders",
+        "schedule": crontab(minute="*"),
+        "args": (),
+    },
+    # 加载周期需小于 REMIND_WHEEL_HORIZON
+    "load_remind_wheel": {
+        "task": "app.tasks.sync_task.load_remind_wheel",
+        "schedule": crontab(minute="*/5"),
+        "args": (),
+    },
+    "rollover_next_trigger": {
+        "task": "app.tasks.sync_task.rollover_next_trigger",
+        "schedule": crontab(minute="30", hour="3"),
+        "args": (),
+    },
 }
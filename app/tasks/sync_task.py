@@ -1,6 +1,8 @@
 from celery.utils.log import get_task_logger
 
+from app.config import settings
 from app.database import db
+from app.services.remind import RemindDispatchService, RemindRolloverService, RemindWheelService
 from app.services.sync_data import SyncDataService
 from app.tasks._runtime import run_coro
 from make_celery import celery_app
@@ -17,3 +19,47 @@ async def _sync_anniv_count():
 @celery_app.task()
 def sync_anniv_count():
     return run_coro(_sync_anniv_count())
+
+
+async def _rebuild_anniv_visibility():
+    async with db.async_db_session() as session:
+        return await SyncDataService.rebuild_anniv_visibility(session)
+
+
+@celery_app.task()
+def rebuild_anniv_visibility():
+    """回填/重建纪念日可见性表：celery -A make_celery call app.tasks.sync_task.rebuild_anniv_visibility"""
+    return run_coro(_rebuild_anniv_visibility())
+
+
+async def _dispatch_reminders():
+    async with db.async_db_session() as session:
+        return await RemindDispatchService.dispatch_due(session)
+
+
+@celery_app.task()
+def dispatch_reminders():
+    return run_coro(_dispatch_reminders())
+
+
+async def _load_remind_wheel():
+    async with db.async_db_session() as session:
+        return await RemindWheelService.load(session)
+
+
+@celery_app.task()
+def load_remind_wheel():
+    if not settings.REMIND_WHEEL_ENABLE:
+        return 0
+    return run_coro(_load_remind_wheel())
+
+
+async def _rollover_next_trigger():
+    async with db.async_db_session() as session:
+        return await RemindRolloverService.rollover(session)
+
+
+@celery_app.task()
+def rollover_next_trigger():
+    """推进已过期的纪念日、提醒 slot 的 next_trigger_at，中断后再次执行从进度处继续"""
+    return run_coro(_rollover_next_trigger())
@@ -1,7 +1,123 @@
+import asyncio
+import secrets
+import time
+
 from starlette.testclient import TestClient
 
+from app.core.exception import AuthException
+from app.database import pms_cache
+from app.ext.jwt import TokenUserInfo, jwt_manager
+from app.services.auth import AuthService
+from app.services.cache.user import JWTTokenCache
+
+
+def _token_user() -> TokenUserInfo:
+    # 随机用户 id，避免与其他用例共享令牌索引
+    uid = 10**12 + secrets.randbelow(10**12)
+    return TokenUserInfo(id=uid, username='pytest', phone=None)
+
+
+async def _index_members(token_type: str, user_id: int) -> set[str]:
+    return set(await pms_cache.zrange(JWTTokenCache(token_type, user_id, '').index_key, 0, -1))
+
 
 def test_logout(client: TestClient, token_headers: dict[str, str]) -> None:
     response = client.post('/auth/logout', headers=token_headers)
     assert response.status_code == 200
-    assert response.json()['code'] == 0
\ No newline at end of file
+    assert response.json()['code'] == 0
+
+
+def test_single_login_revokes_other_sessions(client: TestClient) -> None:
+    userinfo = _token_user()
+    uid = userinfo.id
+
+    async def run():
+        olds = [await jwt_manager.create_access_token(uid, True, userinfo) for _ in range(3)]
+        new = await jwt_manager.create_access_token(uid, False, userinfo)
+        old_exists = [await JWTTokenCache('access', uid, t.jti).exists() for t in olds]
+        new_exists = await JWTTokenCache('access', uid, new.jti).exists()
+        return new.jti, old_exists, new_exists, await _index_members('access', uid)
+
+    new_jti, old_exists, new_exists, members = client.portal.call(run)
+    assert old_exists == [0, 0, 0]
+    assert new_exists == 1
+    assert members == {new_jti}
+
+
+def test_delete_all_keeps_exclude_jti(client: TestClient) -> None:
+    uid = _token_user().id
+    jtis = [f'jti-{i}' for i in range(3)]
+
+    async def run():
+        for jti in jtis:
+            await JWTTokenCache('refresh', uid, jti).add(str(uid), 60)
+        deleted = await JWTTokenCache('refresh', uid, '').delete_all(exclude_jti=jtis[0])
+        exists = [await JWTTokenCache('refresh', uid, jti).exists() for jti in jtis]
+        return deleted, exists, await _index_members('refresh', uid)
+
+    deleted, exists, members = client.portal.call(run)
+    assert deleted == 2
+    assert exists == [1, 0, 0]
+    assert members == {jtis[0]}
+
+
+def test_token_index_trims_expired_members(client: TestClient) -> None:
+    uid = _token_user().id
+    index_key = JWTTokenCache('access', uid, '').index_key
+
+    async def run():
+        # 过期成员：score 为过期时间戳，早于当前时间
+        await pms_cache.zadd(index_key, {'expired': int(time.time()) - 1})
+        await JWTTokenCache('access', uid, 'alive').add('{}', 60)
+        return await _index_members('access', uid), await pms_cache.ttl(index_key)
+
+    members, ttl = client.portal.call(run)
+    assert members == {'alive'}
+    assert 0 < ttl <= 60
+
+
+def test_refresh_token_reuse_has_one_winner(client: TestClient) -> None:
+    userinfo = _token_user()
+    uid = userinfo.id
+
+    async def run():
+        access, refresh = await AuthService.gen_jwt_token(userinfo)
+        results = await asyncio.gather(
+            *(jwt_manager.refresh_access_token(refresh.token, True, userinfo) for _ in range(5)),
+            return_exceptions=True,
+        )
+        winners = [r for r in results if not isinstance(r, BaseException)]
+        new_jti = winners[0][0].jti
+        state = [
+            await JWTTokenCache(token_type, uid, jti).exists()
+            for jti in (access.jti, new_jti)
+            for token_type in ('access', 'refresh')
+        ]
+        return results, winners, state
+
+    results, winners, state = client.portal.call(run)
+    assert len(winners) == 1
+    assert all(isinstance(r, AuthException) for r in results if r not in winners)
+    # 旧令牌对已吊销，新令牌对已写入
+    assert state == [0, 0, 1, 1]
+
+
+def test_refresh_token_single_login_revokes_other_sessions(client: TestClient) -> None:
+    userinfo = _token_user()
+    uid = userinfo.id
+
+    async def run():
+        _, refresh = await AuthService.gen_jwt_token(userinfo)
+        other, _ = await AuthService.gen_jwt_token(userinfo)
+        new_access, _ = await jwt_manager.refresh_access_token(refresh.token, False, userinfo)
+        return (
+            new_access.jti,
+            await JWTTokenCache('access', uid, other.jti).exists(),
+            await JWTTokenCache('refresh', uid, other.jti).exists(),
+            await _index_members('access', uid),
+            await _index_members('refresh', uid),
+        )
+
+    new_jti, other_access, other_refresh, access_members, refresh_members = client.portal.call(run)
+    assert (other_access, other_refresh) == (0, 0)
+    assert access_members == refresh_members == {new_jti}
@@ -0,0 +1,252 @@
+import secrets
+import time
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import exc
+
+from app.constant import InviteState, InviteTargetType
+from app.models import _mixin
+from app.models._mixin import BaseMixin
+from app.models.invite import InviteModel
+from app.models.tags import TagModel
+from app.models.user import UserSettings
+from app.tests.utils.db import async_test_db_session, async_test_engine
+
+
+pytestmark = pytest.mark.anyio
+
+
+tag_mixin = BaseMixin(TagModel)
+settings_mixin = BaseMixin(UserSettings)
+invite_mixin = BaseMixin(InviteModel)
+
+
+@pytest.fixture
+async def tags(db_session):
+    """已提交的标签（batch_update 的回滚需作用于已提交数据），用例结束后删除"""
+    prefix = f'pytest-{secrets.token_hex(4)}'
+    rows = [TagModel(name=f'{prefix}-{i}', create_by=1) for i in range(10)]
+    db_session.add_all(rows)
+    await db_session.commit()
+    yield rows
+    await db_session.execute(delete(TagModel).where(TagModel.name.startswith(prefix)))
+    await db_session.commit()
+
+
+async def _reload_tags(ids: list[str]) -> dict[str, TagModel]:
+    async with async_test_db_session() as session:
+        rows = (await session.execute(select(TagModel).where(TagModel.id.in_(ids)))).scalars()
+        return {t.id: t for t in rows}
+
+
+def _count_statements(verb: str):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith(verb):
+            statements.append(statement)
+
+    event.listen(async_test_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(async_test_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def count_updates():
+    yield from _count_statements('UPDATE')
+
+
+@pytest.fixture
+def count_inserts():
+    yield from _count_statements('INSERT')
+
+
+async def test_batch_update_mixed_shapes(db_session, tags):
+    values = [
+        {'id': tags[0].id, 'name': f'{tags[0].name}-renamed'},
+        {'id': tags[1].id, 'state': 0},
+        {'state': 0, 'name': f'{tags[2].name}-renamed', 'id': tags[2].id},
+        {'id': tags[3].id, 'name': f'{tags[3].name}-renamed'},
+    ]
+    result = await tag_mixin.batch_update(db_session, values)
+
+    assert sorted(result.matched) == sorted(t.id for t in tags[:4])
+    assert result.unmatched == []
+
+    saved = await _reload_tags([t.id for t in tags])
+    assert (saved[tags[0].id].name, saved[tags[0].id].state) == (f'{tags[0].name}-renamed', 1)
+    assert (saved[tags[1].id].name, saved[tags[1].id].state) == (tags[1].name, 0)
+    assert (saved[tags[2].id].name, saved[tags[2].id].state) == (f'{tags[2].name}-renamed', 0)
+    assert (saved[tags[3].id].name, saved[tags[3].id].state) == (f'{tags[3].name}-renamed', 1)
+    # 未出现在 values 中的行不受影响
+    assert all(saved[t.id].state == 1 and saved[t.id].name == t.name for t in tags[4:])
+
+
+@pytest.mark.parametrize('nrows, nstatements', [(3, 1), (4, 1), (5, 2), (8, 2), (9, 3)])
+async def test_batch_update_chunks_by_bind_params(
+    db_session, tags, count_updates, monkeypatch, nrows, nstatements
+):
+    # (id, state) 两列，每条语句最多 4 行
+    monkeypatch.setattr(_mixin, 'MAX_BIND_PARAMS', 8)
+    values = [{'id': t.id, 'state': 0} for t in tags[:nrows]]
+    result = await tag_mixin.batch_update(db_session, values)
+
+    assert len(count_updates) == nstatements
+    assert result.matched == [t.id for t in tags[:nrows]]
+    saved = await _reload_tags([t.id for t in tags])
+    assert [saved[t.id].state for t in tags] == [0] * nrows + [1] * (10 - nrows)
+
+
+async def test_batch_update_ignore_keeps_partial_update(db_session, tags):
+    values = [{'id': tags[0].id, 'state': 0}, {'id': 'missing', 'state': 0}]
+    result = await tag_mixin.batch_update(db_session, values, handle_unmatch='ignore')
+
+    assert result.matched == [tags[0].id]
+    assert result.unmatched == ['missing']
+    assert (await _reload_tags([tags[0].id]))[tags[0].id].state == 0
+
+
+@pytest.mark.parametrize(
+    'handle_unmatch, error', [('raise', exc.StaleDataError), ('abort', HTTPException)]
+)
+async def test_batch_update_unmatched_rolls_back(db_session, tags, handle_unmatch, error):
+    tag_id = tags[0].id
+    values = [{'id': tag_id, 'state': 0}, {'id': 'missing', 'state': 0}]
+    with pytest.raises(error) as e:
+        await tag_mixin.batch_update(db_session, values, handle_unmatch=handle_unmatch)
+
+    if handle_unmatch == 'abort':
+        assert e.value.status_code == 404
+    assert (await _reload_tags([tag_id]))[tag_id].state == 1
+
+
+async def test_batch_update_returns_composite_keys(db_session):
+    uid = 10**12 + secrets.randbelow(10**12)
+    db_session.add_all(UserSettings(user_id=uid, settings_id=i, value='OFF') for i in range(3))
+    await db_session.flush()
+
+    values = [
+        {'user_id': uid, 'settings_id': 2, 'value': 'ON'},
+        {'user_id': uid, 'settings_id': 0, 'value': 'ON'},
+        {'user_id': uid, 'settings_id': 9, 'value': 'ON'},
+    ]
+    result = await settings_mixin.batch_update(
+        db_session, values, commit=False, handle_unmatch='ignore'
+    )
+
+    # 主键按输入顺序返回，复合主键为元组
+    assert result.matched == [(uid, 2), (uid, 0)]
+    assert result.unmatched == [(uid, 9)]
+    saved = await db_session.execute(
+        select(UserSettings.settings_id, UserSettings.value)
+        .where(UserSettings.user_id == uid)
+        .order_by(UserSettings.settings_id)
+    )
+    assert saved.all() == [(0, 'ON'), (1, 'OFF'), (2, 'ON')]
+
+
+async def test_batch_update_all_null_column(db_session):
+    tid = f'pytest-{secrets.token_hex(4)}'
+    responded_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        {
+            'ttype': InviteTargetType.GROUP,
+            'tid': tid,
+            'inviter_id': i,
+            'token': secrets.token_urlsafe(16),
+            'expires_at': 1_900_000_000,
+            'responded_at': responded_at,
+        }
+        for i in range(3)
+    ]
+    await invite_mixin.batch_create(db_session, rows, commit=False, use_copy=False)
+    stmt = select(InviteModel.id).where(InviteModel.tid == tid).order_by(InviteModel.inviter_id)
+    ids = (await db_session.execute(stmt)).scalars().all()
+
+    # 同一分片内某列全为 NULL（VALUES 无法推断类型）与部分为 NULL
+    values = [{'id': ids[0], 'responded_at': None}, {'id': ids[1], 'responded_at': None}]
+    await invite_mixin.batch_update(db_session, values, commit=False)
+    values = [{'id': ids[2], 'responded_at': None, 'meta': {'k': 1}}]
+    await invite_mixin.batch_update(db_session, values, commit=False)
+
+    saved = await db_session.execute(
+        select(InviteModel.responded_at, InviteModel.meta)
+        .where(InviteModel.tid == tid)
+        .order_by(InviteModel.inviter_id)
+        .execution_options(populate_existing=True)
+    )
+    assert saved.all() == [(None, {}), (None, {}), (None, {'k': 1})]
+
+
+def _invite_rows(tid: str, n: int) -> list[dict]:
+    """覆盖 JSONB、IntEnum、可空时间，以及未传的 Python 默认值 / server_default 字段"""
+    rows = []
+    for i in range(n):
+        row = {
+            'ttype': InviteTargetType.GROUP,
+            'tid': tid,
+            'inviter_id': i,
+            'token': secrets.token_urlsafe(16),
+            'expires_at': 1_900_000_000,
+            'invitee_email': None if i % 2 else f'{i}@example.com',
+        }
+        if i % 3:
+            row['meta'] = {'role': i, 'nested': {'tags': ['a', 'b'], 'ok': True, 'none': None}}
+            row['state'] = InviteState.ACCEPTED
+            row['responded_at'] = datetime(2026, 1, 1, i, tzinfo=timezone.utc)
+            row['invitee_user_id'] = None
+        rows.append(row)
+    return rows
+
+
+async def _load_invites(session, tid: str) -> list[dict]:
+    skip = {'id', 'tid', 'token', 'ctime', 'utime'}
+    columns = InviteModel.__table__.columns
+    rows = (
+        await session.execute(
+            select(InviteModel).where(InviteModel.tid == tid).order_by(InviteModel.inviter_id)
+        )
+    ).scalars()
+    now = int(time.time())
+    loaded = []
+    for row in rows:
+        # ULID 主键由 _fill_defaults 生成，ctime/utime 由 server_default 生成
+        assert len(row.id) == 26
+        assert abs(row.ctime - now) < 60 and abs(row.utime - now) < 60
+        loaded.append({c.name: getattr(row, c.name) for c in columns if c.name not in skip})
+    return loaded
+
+
+async def test_batch_create_copy_matches_insert(db_session, count_inserts):
+    copy_tid, insert_tid = f'pytest-{secrets.token_hex(4)}', f'pytest-{secrets.token_hex(4)}'
+
+    copied = await invite_mixin.batch_create(
+        db_session, _invite_rows(copy_tid, 12), commit=False, use_copy=True
+    )
+    assert count_inserts == []
+    inserted = await invite_mixin.batch_create(
+        db_session, _invite_rows(insert_tid, 12), commit=False, use_copy=False
+    )
+    assert count_inserts != []
+    assert copied == inserted == 12
+
+    copy_rows = await _load_invites(db_session, copy_tid)
+    assert copy_rows == await _load_invites(db_session, insert_tid)
+    assert copy_rows[0]['meta'] == {} and copy_rows[0]['state'] == InviteState.PENDING
+    assert copy_rows[0]['invitee_user_id'] == 0
+    assert copy_rows[1]['meta']['nested'] == {'tags': ['a', 'b'], 'ok': True, 'none': None}
+    assert copy_rows[1]['responded_at'] == datetime(2026, 1, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize('nrows, uses_copy', [(4, False), (5, True)])
+async def test_batch_create_picks_copy_by_row_count(
+    db_session, count_inserts, monkeypatch, nrows, uses_copy
+):
+    monkeypatch.setattr(_mixin, 'COPY_MIN_ROWS', 5)
+    tid = f'pytest-{secrets.token_hex(4)}'
+    assert await invite_mixin.batch_create(db_session, _invite_rows(tid, nrows), commit=False)
+    assert (count_inserts == []) is uses_copy
+    assert len(await _load_invites(db_session, tid)) == nrows
@@ -0,0 +1,108 @@
+import secrets
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import delete
+from ulid import ULID
+
+from app.constant import AnniversaryType
+from app.models.anniversary import AnniversaryMemberModel, AnniversaryModel, AnnivVisibilityModel
+from app.models.user import ShareGroupMemberModel, ShareGroupModel
+from app.repo.anniv_visibility import anniv_visibility_repo
+from app.repo.anniversary import anniv_repo
+from app.repo.user import share_group_repo
+from app.services.cache.anniv import AnnivStatCache
+from app.utils.dater import DT
+
+
+pytestmark = pytest.mark.anyio
+
+
+def _anniv(owner: int, days: int, share_mode=0, type_=AnniversaryType.ANNIVERSARY, state=1):
+    return AnniversaryModel(
+        id=str(ULID()),
+        name=f'pytest-{days}',
+        event_year=2000,
+        event_date=date(2000, 1, 1),
+        type=type_,
+        share_mode=share_mode,
+        owner_id=owner,
+        state=state,
+        create_by=owner,
+        update_by=owner,
+        next_trigger_at=DT.now_time() + timedelta(days=days),
+    )
+
+
+@pytest.fixture
+async def users(db_session, redis_clients):
+    """归属者、共享组成员、共享成员、无近期纪念日的用户、无任何纪念日的用户"""
+    uids = [10**12 + secrets.randbelow(10**12) for _ in range(5)]
+    group_id = str(ULID())
+    yield uids, group_id
+
+    am, sgm, visibility = AnniversaryMemberModel, ShareGroupMemberModel, AnnivVisibilityModel
+    await db_session.execute(delete(am).where(am.tid.in_([group_id] + [str(i) for i in uids])))
+    await db_session.execute(delete(visibility).where(visibility.user_id.in_(uids)))
+    await db_session.execute(delete(AnniversaryModel).where(AnniversaryModel.owner_id.in_(uids)))
+    await db_session.execute(delete(sgm).where(sgm.group_id == group_id))
+    await db_session.execute(delete(ShareGroupModel).where(ShareGroupModel.id == group_id))
+    await db_session.commit()
+    await AnnivStatCache.invalidate_users(uids)
+
+
+async def test_dashboard_stat_matches_separate_queries(db_session, users):
+    (owner, group_member, member, idle, empty), group_id = users
+    annivs = {
+        'own': _anniv(owner, 10),
+        'group': _anniv(owner, 5, share_mode=1),
+        'member': _anniv(owner, 100, share_mode=1),
+        'birthday': _anniv(owner, 200, type_=AnniversaryType.BIRTHDAY),
+        'deleted': _anniv(owner, 3, state=0),
+        # 未开启共享：组成员不可见
+        'private': _anniv(owner, 7),
+        'idle': _anniv(idle, 300),
+    }
+    db_session.add_all(annivs.values())
+    db_session.add_all(
+        [
+            AnniversaryMemberModel(anniv_id=annivs['group'].id, ttype=1, tid=group_id),
+            AnniversaryMemberModel(anniv_id=annivs['private'].id, ttype=1, tid=group_id),
+            AnniversaryMemberModel(anniv_id=annivs['member'].id, ttype=2, tid=str(member)),
+        ]
+    )
+    await db_session.flush()
+    await anniv_visibility_repo.refresh_annivs(db_session, [i.id for i in annivs.values()])
+    await db_session.commit()
+
+    # 加入共享组后可见纪念日变化，成员的快照须被删除
+    await AnnivStatCache(group_member).add('{}')
+    group_data = {
+        'id': group_id,
+        'name': 'pytest',
+        'owner_id': owner,
+        'create_by': owner,
+        'update_by': owner,
+    }
+    member_data = [{'user_id': uid, 'group_id': group_id} for uid in (owner, group_member)]
+    await share_group_repo.add(db_session, group_data, member_data)
+    assert await AnnivStatCache(group_member).get() is None
+
+    year = DT.now_year()
+    stats = {}
+    for uid in (owner, group_member, member, idle, empty):
+        year_total, share_total, next_annivs = await anniv_repo.get_dashboard_stat(
+            db_session, uid, year
+        )
+        assert year_total == await anniv_repo.get_year_total(db_session, uid, year)
+        assert share_total == await anniv_repo.get_share_cnt(db_session, uid)
+        next_ids = [i.id for i in next_annivs]
+        assert next_ids == [i.id for i in await anniv_repo.get_next(db_session, uid)]
+        stats[uid] = share_total, next_ids
+
+    a = {k: v.id for k, v in annivs.items()}
+    assert stats[owner] == (2, [a['group'], a['private'], a['own']])
+    assert stats[group_member] == (1, [a['group']])
+    assert stats[member] == (1, [])
+    assert stats[idle] == (0, [])
+    assert stats[empty] == (0, [])
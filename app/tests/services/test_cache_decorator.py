@@ -0,0 +1,140 @@
+import asyncio
+import secrets
+
+import pytest
+from msgspec import json as msgspec_json
+
+from app.database import redcache
+from app.schemas.user import UserStats
+from app.services.cache.anniv import AnnivStatCache
+from app.services.cache.decorator import cached
+from app.services.cache.user import UserStatCache
+
+
+pytestmark = pytest.mark.anyio
+
+LOCK_TTL = 0.3
+
+
+def _uid() -> int:
+    # 随机用户 id，避免与其他用例共享缓存 key
+    return 10**12 + secrets.randbelow(10**12)
+
+
+class Loader:
+    """记录回源次数的被装饰函数"""
+
+    def __init__(self, ret=None, delay: float = 0):
+        self.ret = ret
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, uid: int):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.ret
+
+
+@pytest.fixture
+async def cache_uid(redis_clients):
+    uid = _uid()
+    yield uid
+    await redcache.delete(AnnivStatCache(uid).key, UserStatCache(uid).key)
+
+
+async def test_concurrent_misses_load_once(cache_uid):
+    loader = Loader({'total': 1}, delay=0.1)
+    fn = cached(AnnivStatCache, ('uid',))(loader)
+
+    results = await asyncio.gather(*(fn(cache_uid) for _ in range(5)))
+    assert results == [{'total': 1}] * 5
+    assert loader.calls == 1
+
+    # 已写入缓存，不再回源
+    assert await fn(cache_uid) == {'total': 1}
+    assert loader.calls == 1
+
+
+async def test_waits_for_other_worker_holding_lock(cache_uid):
+    loader = Loader({'total': 1})
+    fn = cached(AnnivStatCache, ('uid',), lock_ttl=LOCK_TTL)(loader)
+    key = fn.cache_key(cache_uid)
+
+    # 模拟其他 worker 持有回源锁，并在等待期间写入缓存
+    lock = redcache.client.lock(f'{key}:lock', timeout=5)
+    assert await lock.acquire(blocking=False)
+    try:
+        task = asyncio.create_task(fn(cache_uid))
+        await asyncio.sleep(0.1)
+        await redcache.set(key, msgspec_json.encode({'total': 2}), ex=60)
+        assert await task == {'total': 2}
+    finally:
+        await lock.release()
+    assert loader.calls == 0
+
+
+async def test_loads_itself_after_lock_wait_times_out(cache_uid):
+    loader = Loader({'total': 1})
+    fn = cached(AnnivStatCache, ('uid',), lock_ttl=LOCK_TTL)(loader)
+    key = fn.cache_key(cache_uid)
+
+    lock = redcache.client.lock(f'{key}:lock', timeout=5)
+    assert await lock.acquire(blocking=False)
+    try:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert await fn(cache_uid) == {'total': 1}
+        assert loop.time() - start >= LOCK_TTL
+    finally:
+        await lock.release()
+    assert loader.calls == 1
+    assert msgspec_json.decode(await redcache.get(key)) == {'total': 1}
+
+
+async def test_negative_caching(cache_uid):
+    loader = Loader(None)
+    fn = cached(AnnivStatCache, ('uid',), negative_ttl=60)(loader)
+
+    assert await fn(cache_uid) is None
+    assert await fn(cache_uid) is None
+    assert loader.calls == 1
+    assert 0 < await redcache.ttl(fn.cache_key(cache_uid)) <= 60
+
+    # 未开启负缓存时每次都回源
+    other = Loader(None)
+    fn = cached(AnnivStatCache, ('uid',))(other)
+    await fn(_uid())
+    await fn(_uid())
+    assert other.calls == 2
+
+
+async def test_invalidate_deletes_key(cache_uid):
+    loader = Loader({'total': 1})
+    fn = cached(AnnivStatCache, ('uid',))(loader)
+
+    await fn(cache_uid)
+    assert await fn.invalidate(cache_uid) == 1
+    await fn(cache_uid)
+    assert loader.calls == 2
+
+
+async def test_hash_round_trip_shares_key_with_hincr(cache_uid):
+    loader = Loader(UserStats(follow_cnt=1, fan_cnt=2))
+    fn = cached(UserStatCache, ('uid',), data_type='hash', type_=UserStats)(loader)
+
+    assert await fn(cache_uid) == UserStats(follow_cnt=1, fan_cnt=2)
+    assert await redcache.hgetall(UserStatCache(cache_uid).key) == {
+        'follow_cnt': '1',
+        'fan_cnt': '2',
+        'like_cnt': '0',
+        'collect_cnt': '0',
+        'comment_cnt': '0',
+    }
+
+    # 按字段原地更新后，装饰器读取到的是更新后的值
+    await UserStatCache(cache_uid).incr('fan_cnt')
+    await UserStatCache(cache_uid).decr('follow_cnt')
+    ret = await fn(cache_uid)
+    assert isinstance(ret, UserStats)
+    assert ret == UserStats(follow_cnt=0, fan_cnt=3)
+    assert loader.calls == 1
@@ -0,0 +1,51 @@
+import secrets
+
+import pytest
+
+from app.database import redcache
+from app.schemas.notification import UnReadMsgCntSchema
+from app.schemas.user import UserStats
+from app.services.cache.user import UnReadMsgCntCache, UserStatCache
+from app.services.notification import RemindNtfyService
+from app.services.user import UserService
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def uid(redis_clients):
+    # 随机用户 id，避免与其他用例共享缓存 key
+    uid = 10**12 + secrets.randbelow(10**12)
+    yield uid
+    await UserStatCache(uid).delete()
+    await UnReadMsgCntCache(uid).delete()
+
+
+async def test_get_stats_reads_through_near_cache(uid):
+    # 缓存已存在时不回源 DB，session 为空
+    await UserStatCache(uid).add({'follow_cnt': 1, 'fan_cnt': 2})
+    assert await UserService.get_stats(None, uid) == UserStats(follow_cnt=1, fan_cnt=2)
+
+    # 绕过缓存类直接修改 redis：NEAR_TTL 内仍读取本地副本
+    await redcache.hset(UserStatCache(uid).key, 'fan_cnt', 10)
+    assert await UserService.get_stats(None, uid) == UserStats(follow_cnt=1, fan_cnt=2)
+
+    # 经缓存类写入时失效近端缓存
+    await UserStatCache(uid).incr('fan_cnt')
+    assert await UserService.get_stats(None, uid) == UserStats(follow_cnt=1, fan_cnt=11)
+
+
+async def test_get_unread_msgcounts_reads_through_near_cache(uid):
+    service = RemindNtfyService()
+    await UnReadMsgCntCache(uid).add({'sys_cnt': 1, 'like_cnt': 2})
+    first = await service.get_unread_msgcounts(None, uid)
+    assert (first.sys_cnt, first.like_cnt) == (1, 2)
+
+    await redcache.hset(UnReadMsgCntCache(uid).key, 'like_cnt', 10)
+    assert await service.get_unread_msgcounts(None, uid) == first
+
+    await UnReadMsgCntCache(uid).decr('sys_cnt')
+    ret = await service.get_unread_msgcounts(None, uid)
+    assert isinstance(ret, UnReadMsgCntSchema)
+    assert (ret.sys_cnt, ret.like_cnt) == (0, 10)
@@ -0,0 +1,254 @@
+import secrets
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.constant import ReminderChannel, RepeatType
+from app.database import redcache
+from app.models.anniversary import AnniversaryModel, ReminderRule, ReminderSlot
+from app.repo.anniversary import remind_repo
+from app.repo.loader import get_loaders
+from app.schemas.anniversary import RemindConfig, RemindRuleSchema
+from app.services.cache.remind import RemindRolloverCheckpoint, RemindWheelCache
+from app.services.remind import RemindDispatchService, RemindRolloverService
+from app.utils.dater import DT
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def _seed_slots(session: AsyncSession, uid: int, count: int) -> list[str]:
+    """每个纪念日一条规则、一个已到期的 slot，按到期时间从早到晚返回 slot id"""
+    now = DT.now_time()
+    slot_ids = []
+    for i in range(count):
+        anniv = AnniversaryModel(
+            name=f'pytest-{i}',
+            event_year=2000,
+            event_date=date(2000, 1, 1),
+            type=1,
+            repeat_type=RepeatType.DAILY,
+            owner_id=uid,
+            create_by=uid,
+            update_by=uid,
+            next_trigger_at=now,
+        )
+        session.add(anniv)
+        await session.flush()
+        # 暂无短信发送实现，分发时只跳过，不产生其他数据
+        rule = ReminderRule(anniv_id=anniv.id, user_id=uid, channels=[ReminderChannel.SMS])
+        session.add(rule)
+        await session.flush()
+        slot = ReminderSlot(
+            rule_id=rule.id,
+            trigger_time=time(9),
+            next_trigger_at=now - timedelta(minutes=count - i),
+        )
+        session.add(slot)
+        await session.flush()
+        slot_ids.append(slot.id)
+    await session.commit()
+    return slot_ids
+
+
+async def _cleanup(session: AsyncSession, uid: int):
+    rule_ids = select(ReminderRule.id).where(ReminderRule.user_id == uid)
+    await session.execute(delete(ReminderSlot).where(ReminderSlot.rule_id.in_(rule_ids)))
+    await session.execute(delete(ReminderRule).where(ReminderRule.user_id == uid))
+    await session.execute(delete(AnniversaryModel).where(AnniversaryModel.owner_id == uid))
+    await session.commit()
+
+
+@pytest.fixture
+async def uid(db_session, redis_clients):
+    uid = 10**12 + secrets.randbelow(10**12)
+    yield uid
+    await _cleanup(db_session, uid)
+
+
+@pytest.fixture
+async def due_slots(db_session, uid):
+    return await _seed_slots(db_session, uid, 3)
+
+
+async def _next_triggers(session: AsyncSession, slot_ids: list[str]) -> list:
+    stmt = select(ReminderSlot.id, ReminderSlot.next_trigger_at).where(
+        ReminderSlot.id.in_(slot_ids)
+    )
+    mapping = dict((await session.execute(stmt)).all())
+    return [mapping[i] for i in slot_ids]
+
+
+async def test_dispatch_due_stops_poison_slot(db_session, due_slots, monkeypatch):
+    poison = due_slots[0]
+    next_triggers = RemindDispatchService.next_triggers
+
+    def failing_next_triggers(rows, calculators, now=None):
+        if any(row.id == poison for row in rows):
+            raise ValueError('poison slot')
+        return next_triggers(rows, calculators, now)
+
+    monkeypatch.setattr(RemindDispatchService, 'next_triggers', failing_next_triggers)
+
+    # 第一批包含失败的 slot，逐个重试后继续处理下一批
+    now = DT.now_time()
+    assert await RemindDispatchService.dispatch_due(db_session, batch_size=2, lag=0) == 3
+
+    stopped, *advanced = await _next_triggers(db_session, due_slots)
+    assert stopped is None
+    assert all(i > now for i in advanced)
+
+    # 失败的 slot 已停止，不会再被认领
+    assert await RemindDispatchService.dispatch_due(db_session, batch_size=2, lag=0) == 0
+
+
+async def test_dispatch_clears_user_loader_after_commit(db_session, due_slots):
+    users = get_loaders(db_session).users
+    users.prime(1, None)
+
+    assert await RemindDispatchService.dispatch_slots(db_session, due_slots) == 3
+    assert users._cache == {}
+
+
+async def _anniv_triggers(session: AsyncSession, uid: int) -> dict:
+    stmt = (
+        select(AnniversaryModel.id, AnniversaryModel.next_trigger_at)
+        .where(AnniversaryModel.owner_id == uid)
+        .order_by(AnniversaryModel.id)
+        .execution_options(populate_existing=True)
+    )
+    return dict((await session.execute(stmt)).all())
+
+
+async def test_rollover_resumes_from_checkpoint(db_session, uid, monkeypatch):
+    checkpoint = RemindRolloverCheckpoint('anniv')
+    # 从种子数据之前的最大 id 之后开始，只处理本用例的纪念日
+    start = await db_session.scalar(select(func.max(AnniversaryModel.id)))
+    await _seed_slots(db_session, uid, 5)
+    expired = await _anniv_triggers(db_session, uid)
+    ids = list(expired)
+    if start:
+        await checkpoint.add(start)
+    else:
+        await checkpoint.delete()
+
+    handler = RemindRolloverService._rollover_annivs
+    calls = []
+
+    async def stop_after_first_batch(*args):
+        calls.append(args)
+        if len(calls) > 1:
+            raise ConnectionError('interrupted')
+        return await handler(*args)
+
+    # 第一批提交后中断：进度停在第一批最后一条
+    now = DT.now_time()
+    updated = await RemindRolloverService._run(db_session, 'anniv', stop_after_first_batch, 2)
+    assert updated == 2
+    assert await checkpoint.get() == ids[1]
+    triggers = await _anniv_triggers(db_session, uid)
+    assert all(triggers[i] > now for i in ids[:2])
+    assert all(triggers[i] == expired[i] for i in ids[2:])
+
+    # 无法计算下一次触发时间的保持原值
+    next_triggers = RemindDispatchService.next_triggers
+
+    def skip_one(rows, calculators, now=None):
+        return [
+            None if row.id == ids[3] else ret
+            for row, ret in zip(rows, next_triggers(rows, calculators, now))
+        ]
+
+    monkeypatch.setattr(RemindDispatchService, 'next_triggers', skip_one)
+
+    # 第二轮从进度之后继续，只推进剩余的行，跑完后清除进度
+    advanced = dict(triggers)
+    updated = await RemindRolloverService._run(db_session, 'anniv', handler, 2)
+    assert updated == 2
+    assert await checkpoint.get() is None
+    triggers = await _anniv_triggers(db_session, uid)
+    assert [triggers[i] for i in ids[:2]] == [advanced[i] for i in ids[:2]]
+    assert triggers[ids[2]] > now and triggers[ids[4]] > now
+    assert triggers[ids[3]] == expired[ids[3]]
+
+
+@pytest.fixture
+async def wheel(redis_clients):
+    # 独立的 key，避免与其他用例写入的时间轮成员混在一起
+    wheel = RemindWheelCache()
+    wheel.key = f'pytest:{wheel.key}:{secrets.token_hex(4)}'
+    yield wheel
+    await redcache.delete(wheel.key)
+
+
+async def test_wheel_pop_due_by_score_and_limit(wheel):
+    await wheel.add({'a': 100, 'b': 200, 'c': 300, 'd': 400})
+
+    # 只取出到期（score <= now）的成员并从时间轮删除
+    assert await wheel.pop_due(200, 10) == ['a', 'b']
+    assert await wheel.get('a') is None and await wheel.get('b') is None
+    assert await wheel.pop_due(250, 10) == []
+    assert await wheel.get('c') == 300
+
+    # 每次最多取出 limit 个，按触发时间从早到晚
+    await wheel.add({'a': 100, 'b': 200})
+    assert await wheel.pop_due(350, 2) == ['a', 'b']
+    assert await wheel.pop_due(350, 2) == ['c']
+    assert await wheel.next_due_at() == 400
+
+
+async def _slot_ids(session: AsyncSession, anniv_id: str) -> dict:
+    stmt = (
+        select(ReminderSlot.offset_days, ReminderSlot.id)
+        .join(ReminderRule, ReminderRule.id == ReminderSlot.rule_id)
+        .where(ReminderRule.anniv_id == anniv_id)
+    )
+    return dict((await session.execute(stmt)).all())
+
+
+async def test_remind_edit_reschedules_wheel(db_session, uid, monkeypatch):
+    monkeypatch.setattr(settings, 'REMIND_WHEEL_ENABLE', True)
+    wheel = RemindWheelCache()
+    now = DT.now_time()
+    anniv = AnniversaryModel(
+        name='pytest-wheel',
+        event_year=2000,
+        event_date=date(2000, 1, 1),
+        type=1,
+        owner_id=uid,
+        create_by=uid,
+        update_by=uid,
+        next_trigger_at=now,
+    )
+    db_session.add(anniv)
+    await db_session.flush()
+
+    near, far = now + timedelta(minutes=1), now + timedelta(days=1)
+
+    def rule(*slots):
+        configs = [
+            RemindConfig(offset_days=offset, trigger_time=time(9), next_trigger_at=next_trigger)
+            for offset, next_trigger in slots
+        ]
+        return RemindRuleSchema(channels=[ReminderChannel.SMS], slots=configs)
+
+    # 只有时间轮范围内的 slot 写入时间轮
+    await remind_repo.add(db_session, anniv.id, [uid], rule((0, near), (-1, far)))
+    old = await _slot_ids(db_session, anniv.id)
+    assert await wheel.get(old[0]) == near.timestamp()
+    assert await wheel.get(old[-1]) is None
+
+    # 编辑后旧 slot 移出时间轮，新的近期 slot 写入
+    near = now + timedelta(minutes=2)
+    await remind_repo.edit(db_session, anniv.id, [uid], rule((0, near), (-2, far)))
+    new = await _slot_ids(db_session, anniv.id)
+    try:
+        assert sorted(new) == [-2, 0] and not set(old.values()) & set(new.values())
+        assert all([await wheel.get(i) is None for i in old.values()])
+        assert await wheel.get(new[0]) == near.timestamp()
+        assert await wheel.get(new[-2]) is None
+    finally:
+        await wheel.delete(*new.values())
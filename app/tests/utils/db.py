@@ -7,7 +7,7 @@ from app.config import settings
 
 
 TEST_DB_URL = settings.DB_MAIN_TEST_URL
-_, async_test_db_session = init_async_engine_and_session(TEST_DB_URL)
+async_test_engine, async_test_db_session = init_async_engine_and_session(TEST_DB_URL)
 
 
 async def override_get_session() -> AsyncGenerator[AsyncSession, None]:
@@ -0,0 +1,128 @@
+import random
+from datetime import date, time, timedelta
+
+import pytest
+from lunar_python import Lunar, LunarMonth, LunarYear, Solar
+
+from app.constant import CalendarType, RepeatType
+from app.schemas.anniversary import RemindConfig
+from app.utils.lunar_table import DATA_FILE, END_YEAR, START_YEAR, LunarTable, dump
+from app.utils.remind_calculator import RemindConfigCalculator
+
+
+@pytest.fixture(scope='module')
+def table() -> LunarTable:
+    assert DATA_FILE.exists()
+    return LunarTable.load()
+
+
+def _months(year: int) -> list[int]:
+    leap = LunarYear.fromYear(year).getLeapMonth()
+    months = list(range(1, 13))
+    if leap:
+        months.insert(leap, -leap)
+    return months
+
+
+def _first_day(year: int, month: int) -> date:
+    solar = Solar.fromJulianDay(LunarMonth.fromYm(year, month).getFirstJulianDay())
+    return date(solar.getYear(), solar.getMonth(), solar.getDay())
+
+
+def _lunar_python_to_lunar(d: date) -> tuple[int, int, int]:
+    lunar = Solar.fromYmd(d.year, d.month, d.day).getLunar()
+    return lunar.getYear(), lunar.getMonth(), lunar.getDay()
+
+
+def test_shipped_file_is_up_to_date(tmp_path):
+    # 数据文件须与 lunar_python 当前生成的结果一致
+    path = tmp_path / 'lunar_table.bin'
+    dump(path)
+    assert path.read_bytes() == DATA_FILE.read_bytes()
+
+
+def test_every_month_matches_lunar_python(table):
+    for year in range(START_YEAR, END_YEAR + 1):
+        leap = LunarYear.fromYear(year).getLeapMonth()
+        assert table.leap_month(year) == leap
+        for month in _months(year):
+            days = LunarMonth.fromYm(year, month).getDayCount()
+            first = _first_day(year, month)
+            assert table.month_days(year, month) == days
+            assert table.lunar_to_solar(year, month, 1) == first
+            assert table.lunar_to_solar(year, month, days) == first + timedelta(days=days - 1)
+            assert table.solar_to_lunar(first) == (year, month, 1)
+            assert table.solar_to_lunar(first + timedelta(days=days - 1)) == (year, month, days)
+        # 该年不存在的闰月、小月三十
+        for month in range(1, 13):
+            if month != leap:
+                assert table.lunar_to_solar(year, -month, 1) is None
+        small = [m for m in _months(year) if table.month_days(year, m) == 29]
+        assert all(table.lunar_to_solar(year, m, 30) is None for m in small)
+
+
+def test_sampled_solar_days_match_lunar_python(table):
+    rng = random.Random(20261017)
+    first, last = table.min_ordinal, table.max_ordinal
+    days = [date.fromordinal(rng.randint(first, last)) for _ in range(300)]
+    for d in days:
+        assert table.solar_to_lunar(d) == _lunar_python_to_lunar(d), d
+
+
+def test_leap_months(table):
+    # 2023 闰二月，2020 闰四月，2033 闰十一月
+    assert table.leap_month(2023) == 2 and table.leap_month(2024) == 0
+    assert table.lunar_to_solar(2023, -2, 1) == date(2023, 3, 22)
+    assert table.lunar_to_solar(2023, 3, 1) == date(2023, 4, 20)
+    assert table.solar_to_lunar(date(2020, 5, 23)) == (2020, -4, 1)
+    assert table.lunar_to_solar(2033, -11, 1) == _first_day(2033, -11)
+    assert table.lunar_to_solar(2024, -2, 1) is None
+
+
+def test_range_edges(table):
+    assert (table.start_year, table.end_year) == (START_YEAR, END_YEAR)
+    assert not table.covers_year(START_YEAR - 1) and not table.covers_year(END_YEAR + 1)
+
+    first = date.fromordinal(table.min_ordinal)
+    last = date.fromordinal(table.max_ordinal)
+    assert first == _first_day(START_YEAR, 1) == date(1900, 1, 31)
+    assert last + timedelta(days=1) == _first_day(END_YEAR + 1, 1)
+    assert table.solar_to_lunar(first) == (START_YEAR, 1, 1)
+    assert table.solar_to_lunar(last) == _lunar_python_to_lunar(last)
+    assert table.solar_to_lunar(first - timedelta(days=1)) is None
+    assert table.solar_to_lunar(last + timedelta(days=1)) is None
+    assert table.lunar_to_solar(START_YEAR - 1, 12, 1) is None
+    assert table.lunar_to_solar(END_YEAR + 1, 1, 1) is None
+
+
+@pytest.mark.parametrize('d', [date(1850, 3, 3), date(1900, 1, 30), date(2102, 6, 1)])
+def test_calculator_falls_back_outside_range(d):
+    calculator = RemindConfigCalculator()
+    assert calculator._solar_to_lunar(d) == _lunar_python_to_lunar(d)
+
+
+@pytest.mark.parametrize('year, month, day', [(1850, 1, 1), (2150, 1, 1), (2150, 6, 15)])
+def test_calculator_lunar_to_solar_falls_back_outside_range(year, month, day):
+    solar = Lunar.fromYmd(year, month, day).getSolar()
+    expected = date(solar.getYear(), solar.getMonth(), solar.getDay())
+    assert RemindConfigCalculator()._lunar_to_solar(year, month, day) == expected
+
+
+@pytest.mark.parametrize(
+    'calendar_type, event',
+    [(CalendarType.GREGORIAN, date(2001, 1, 31)), (CalendarType.LUNAR, date(2001, 8, 15))],
+)
+def test_weekly_repeat_terminates(calendar_type, event):
+    # 按周重复曾因每次累加后回到原日期（_add_delta）而死循环，现为按周数直接计算
+    calculator = RemindConfigCalculator()
+    solar_event = event
+    if calendar_type == CalendarType.LUNAR:
+        solar_event = calculator._lunar_to_solar(event.year, event.month, event.day)
+    for reference in (date(2026, 2, 28), date(2026, 3, 1), date(2099, 12, 31)):
+        ret = calculator._get_next_anniversary(event, RepeatType.WEEKLY, calendar_type, reference)
+        assert reference <= ret < reference + timedelta(days=7)
+        assert (ret - solar_event).days % 7 == 0
+
+    config = RemindConfig(offset_days=0, trigger_time=time(9))
+    ret = calculator.calculate_next_trigger(config, event, RepeatType.WEEKLY, calendar_type)
+    assert ret is not None and ret.weekday() == solar_event.weekday()
@@ -0,0 +1,155 @@
+import base64
+import json
+import secrets
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constant import AnnivVisibleVia
+from app.core.exception import ValidateError
+from app.models.anniversary import AnniversaryModel, AnnivVisibilityModel
+from app.repo import anniversary as anniv_module
+from app.repo.anniversary import anniv_repo
+from app.schemas.anniversary import QueryAnnivSchema
+from app.utils.paginator import KeysetPaginator
+
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime(2026, 6, 1, 12, tzinfo=timezone.utc)
+
+
+async def _seed(session: AsyncSession, offsets: list[int]) -> tuple[int, list[AnniversaryModel]]:
+    """按 NOW 的天数偏移写入纪念日（不提交），返回 (可见用户, 纪念日列表)"""
+    uid = 10**12 + secrets.randbelow(10**12)
+    annivs = []
+    for i, days in enumerate(offsets):
+        trigger = NOW + timedelta(days=days)
+        annivs.append(
+            AnniversaryModel(
+                name=f'pytest-{i}',
+                event_year=trigger.year,
+                event_date=date(2000, 1, 1) + timedelta(days=i % 3),
+                type=1,
+                owner_id=uid,
+                create_by=uid,
+                update_by=uid,
+                next_trigger_at=trigger,
+            )
+        )
+    session.add_all(annivs)
+    await session.flush()
+    session.add_all(
+        AnnivVisibilityModel(user_id=uid, anniv_id=a.id, via=AnnivVisibleVia.OWNER)
+        for a in annivs
+    )
+    await session.flush()
+    return uid, annivs
+
+
+async def _collect(session: AsyncSession, uid: int, limit: int, **params) -> list[list]:
+    pages, last = [], None
+    while True:
+        query = QueryAnnivSchema(last=last, limit=limit, **params)
+        paged = await anniv_repo.list_feed(session, uid, query)
+        pages.append([a.id for a in paged.items])
+        if not paged.has_more:
+            return pages
+        last = paged.last
+
+
+def _raw_cursor(data) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+
+@pytest.fixture
+def fixed_now(monkeypatch):
+    monkeypatch.setattr(anniv_module.DT, 'now_time', lambda: NOW)
+
+
+def _default_order(annivs: list[AnniversaryModel]) -> list[str]:
+    upcoming = [a for a in annivs if a.next_trigger_at >= NOW]
+    past = [a for a in annivs if a.next_trigger_at < NOW]
+    # 同一时间按 id 倒序
+    upcoming.sort(key=lambda a: a.id, reverse=True)
+    upcoming.sort(key=lambda a: a.next_trigger_at)
+    past.sort(key=lambda a: (a.next_trigger_at, a.id), reverse=True)
+    return [a.id for a in upcoming + past]
+
+
+async def test_default_order_crosses_past_boundary(db_session, fixed_now, monkeypatch):
+    uid, annivs = await _seed(db_session, [3, 1, 0, 7, -1, -4, -2, 2])
+
+    first = await anniv_repo.list_feed(
+        db_session, uid, QueryAnnivSchema(limit=4, order_by='default')
+    )
+    # 第一页恰好止于最后一个即将到来的纪念日：past 时间字段为 NULL
+    values, ctx = KeysetPaginator.decode_cursor(first.last)
+    assert values[0] == 0 and values[1] is not None and values[2] is None
+    assert ctx == {'now': NOW.isoformat()}
+
+    # 翻页期间真实时间推进，分界仍以游标中的 now 为准
+    monkeypatch.setattr(anniv_module.DT, 'now_time', lambda: NOW + timedelta(days=30))
+    second = await anniv_repo.list_feed(
+        db_session, uid, QueryAnnivSchema(last=first.last, limit=4, order_by='default')
+    )
+    values, _ = KeysetPaginator.decode_cursor(second.last)
+    assert values[0] == 1 and values[1] is None and values[2] is not None
+    assert not second.has_more
+
+    ids = [a.id for a in first.items] + [a.id for a in second.items]
+    assert ids == _default_order(annivs)
+
+
+async def test_default_order_breaks_ties_by_id(db_session, fixed_now):
+    uid, annivs = await _seed(db_session, [1, 1, 1, -1, -1, -1])
+
+    pages = await _collect(db_session, uid, limit=1, order_by='default')
+    assert all(len(page) == 1 for page in pages)
+    assert [page[0] for page in pages] == _default_order(annivs)
+
+
+async def test_custom_order_by(db_session, fixed_now):
+    uid, annivs = await _seed(db_session, [1, 2, 3, 4, 5, 6, 7])
+
+    by_id = sorted(annivs, key=lambda a: a.id, reverse=True)
+
+    pages = await _collect(db_session, uid, limit=3, order_by='event_date.asc')
+    expected = sorted(by_id, key=lambda a: a.event_date)
+    assert [i for page in pages for i in page] == [a.id for a in expected]
+
+    # 未传 order_by 时默认 event_date.desc
+    pages = await _collect(db_session, uid, limit=3)
+    expected = sorted(by_id, key=lambda a: a.event_date, reverse=True)
+    assert [i for page in pages for i in page] == [a.id for a in expected]
+
+
+@pytest.mark.parametrize('order_by', ['description.asc', 'not_a_column.asc', 'event_date.up'])
+async def test_custom_order_by_rejects_invalid_columns(db_session, order_by):
+    with pytest.raises(ValidateError):
+        await anniv_repo.list_feed(db_session, 1, QueryAnnivSchema(order_by=order_by))
+
+
+@pytest.mark.parametrize(
+    'last',
+    [
+        12345,
+        'not-base64!!',
+        _raw_cursor([1, 2]),
+        _raw_cursor({'k': 'abcd', 'c': {}}),
+        _raw_cursor({'k': [0, None, None], 'c': {}}),
+        _raw_cursor({'k': [0, 'tomorrow', None, 'x'], 'c': {}}),
+        _raw_cursor({'k': [True, None, None, 'x'], 'c': {}}),
+        _raw_cursor({'k': [0, {'$dt': '2026-06-01T00:00:00'}, None, 'x'], 'c': {}}),
+        _raw_cursor({'k': [0, {'$dt': 'garbage'}, None, 'x'], 'c': {}}),
+        _raw_cursor({'k': [0, None, None, 'x'], 'c': []}),
+        _raw_cursor({'k': [0, None, None, 'x'], 'c': {'now': 'garbage'}}),
+        _raw_cursor({'k': [0, None, None, 'x'], 'c': {'now': 1}}),
+        _raw_cursor({'k': [0, None, None, 'x'], 'c': {'now': '2026-06-01T00:00:00'}}),
+    ],
+)
+async def test_tampered_cursor_is_validate_error(db_session, last):
+    with pytest.raises(ValidateError) as exc:
+        await anniv_repo.list_feed(db_session, 1, QueryAnnivSchema(last=last, order_by='default'))
+    assert exc.value.code == 422
@@ -0,0 +1,193 @@
+import itertools
+from datetime import date, datetime, time, timezone
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.constant import CalendarType, RepeatType
+from app.schemas.anniversary import RemindConfig
+from app.services.remind import RemindDispatchService
+from app.utils import remind_calculator
+from app.utils.remind_calculator import RemindConfigCalculator
+
+
+TIMEZONES = ['Asia/Shanghai', 'America/New_York', 'Pacific/Kiritimati', 'UTC']
+
+NOWS = [
+    datetime(2026, 1, 31, 0, 30, tzinfo=timezone.utc),
+    datetime(2026, 2, 28, 12, tzinfo=timezone.utc),
+    datetime(2027, 3, 1, 1, tzinfo=timezone.utc),
+    datetime(2028, 2, 29, 0, 30, tzinfo=timezone.utc),
+    datetime(2026, 12, 31, 23, 30, tzinfo=timezone.utc),
+]
+
+GREGORIAN_DATES = [
+    date(2000, 2, 29),  # 闰日
+    date(2024, 2, 29),
+    date(2025, 1, 31),  # 月末：31 日 → 30/28/29 日
+    date(2025, 8, 31),
+    date(2025, 3, 30),
+    date(2026, 2, 28),
+    date(2026, 1, 31),
+    date(2027, 6, 15),  # 未来的纪念日
+]
+
+# 农历日期以 date 存储：闰月、三十、腊月
+LUNAR_DATES = [
+    (date(2000, 1, 1), False),
+    (date(2020, 4, 15), True),  # 2020 闰四月
+    (date(2023, 2, 28), True),  # 2023 闰二月
+    (date(2001, 12, 30), False),
+    (date(2001, 8, 15), False),
+]
+
+REPEATS = list(RepeatType)
+OFFSETS = [-7, -1, 0, 3]
+TRIGGER_TIMES = [time(0), time(9), time(23, 59)]
+
+
+class _FixedDatetime(datetime):
+    now_at: datetime = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.now_at.astimezone(tz)
+
+
+@pytest.fixture
+def fix_now(monkeypatch):
+    """calculate_next_trigger 使用 datetime.now，固定为指定时间与批量计算对比"""
+    monkeypatch.setattr(remind_calculator, 'datetime', _FixedDatetime)
+
+    def set_now(now: datetime):
+        _FixedDatetime.now_at = now
+
+    return set_now
+
+
+def _rows() -> list[tuple]:
+    """(event_date, repeat_type, calendar_type, offset, trigger_time, is_leap)"""
+    events = [(d, CalendarType.GREGORIAN, False) for d in GREGORIAN_DATES]
+    events += [(d, CalendarType.LUNAR, leap) for d, leap in LUNAR_DATES]
+    return [
+        (d, repeat_type, calendar_type, offset, trigger_time, leap)
+        for (d, calendar_type, leap), repeat_type, offset, trigger_time in itertools.product(
+            events, REPEATS, OFFSETS, TRIGGER_TIMES
+        )
+    ]
+
+
+def _single(calculator: RemindConfigCalculator, row: tuple) -> datetime | None:
+    d, repeat_type, calendar_type, offset, trigger_time, leap = row
+    config = RemindConfig(offset_days=offset, trigger_time=trigger_time)
+    return calculator.calculate_next_trigger(config, d, repeat_type, calendar_type, leap)
+
+
+@pytest.mark.parametrize('now', NOWS, ids=lambda now: now.isoformat())
+@pytest.mark.parametrize('tz', TIMEZONES)
+def test_batch_matches_single_row(fix_now, now, tz):
+    fix_now(now)
+    calculator = RemindConfigCalculator(ZoneInfo(tz))
+    rows = _rows()
+
+    batch = calculator.calculate_next_triggers(*zip(*rows), now=now)
+    assert len(batch) == len(rows)
+    for row, ret in zip(rows, batch):
+        assert ret == _single(calculator, row), row
+        assert ret is None or ret > now, row
+
+
+def test_dispatcher_groups_mixed_timezones(fix_now):
+    now = NOWS[1]
+    fix_now(now)
+    rows = []
+    for i, (d, repeat_type, calendar_type, offset, trigger_time, leap) in enumerate(_rows()):
+        lunar = calendar_type == CalendarType.LUNAR
+        rows.append(
+            SimpleNamespace(
+                tz=TIMEZONES[i % len(TIMEZONES)],
+                event_date=d,
+                lunar_year=d.year if lunar else None,
+                lunar_month=d.month if lunar else None,
+                lunar_day=d.day if lunar else None,
+                lunar_is_leap=leap,
+                repeat_type=repeat_type,
+                calendar_type=calendar_type,
+                offset_days=offset,
+                trigger_time=trigger_time,
+            )
+        )
+
+    batch = RemindDispatchService.next_triggers(rows, {}, now)
+    for row, ret in zip(rows, batch):
+        calculator = RemindConfigCalculator(ZoneInfo(row.tz))
+        expected = _single(
+            calculator,
+            (
+                row.event_date,
+                row.repeat_type,
+                row.calendar_type,
+                row.offset_days,
+                row.trigger_time,
+                row.lunar_is_leap,
+            ),
+        )
+        assert ret == expected
+        assert ret is None or ret.tzinfo == ZoneInfo(row.tz)
+
+
+@pytest.mark.parametrize(
+    'event, repeat_type, now, expected',
+    [
+        # 闰日：平年取 2 月 28 日，闰年回到 2 月 29 日
+        (date(2024, 2, 29), RepeatType.YEARLY, datetime(2026, 3, 1), date(2027, 2, 28)),
+        (date(2024, 2, 29), RepeatType.YEARLY, datetime(2027, 3, 1), date(2028, 2, 29)),
+        (date(2024, 2, 29), RepeatType.MONTHLY, datetime(2026, 3, 1), date(2026, 3, 29)),
+        # 月末：31 日按月重复取当月最后一天
+        (date(2025, 1, 31), RepeatType.MONTHLY, datetime(2026, 2, 1), date(2026, 2, 28)),
+        (date(2025, 1, 31), RepeatType.MONTHLY, datetime(2026, 4, 1), date(2026, 4, 30)),
+        (date(2025, 1, 31), RepeatType.MONTHLY, datetime(2028, 2, 1), date(2028, 2, 29)),
+        (date(2025, 8, 31), RepeatType.HALF_YEARLY, datetime(2026, 1, 1), date(2026, 2, 28)),
+        (date(2025, 8, 31), RepeatType.THREE_MONTHLY, datetime(2025, 9, 1), date(2025, 11, 30)),
+        # 按周、按天
+        (date(2026, 1, 1), RepeatType.WEEKLY, datetime(2026, 1, 2), date(2026, 1, 8)),
+        (date(2026, 1, 1), RepeatType.DAILY, datetime(2026, 3, 5, 10), date(2026, 3, 6)),
+        # 不重复：过去的返回 None
+        (date(2026, 1, 1), RepeatType.NONE, datetime(2026, 1, 1, 10), None),
+        (date(2026, 1, 1), RepeatType.NONE, datetime(2025, 12, 31), date(2026, 1, 1)),
+    ],
+)
+def test_known_next_triggers(fix_now, event, repeat_type, now, expected):
+    tz = ZoneInfo('Asia/Shanghai')
+    now = now.replace(tzinfo=tz)
+    fix_now(now)
+    calculator = RemindConfigCalculator(tz)
+    row = (event, repeat_type, CalendarType.GREGORIAN, 0, time(9), False)
+
+    [ret] = calculator.calculate_next_triggers(*zip(row), now=now)
+    assert ret == _single(calculator, row)
+    assert ret == (None if expected is None else datetime.combine(expected, time(9), tz))
+
+
+@pytest.mark.parametrize(
+    'event, repeat_type, offset, now, expected',
+    [
+        # 提前提醒的间隔不小于重复周期时，提醒日仍不早于今天
+        (date(2026, 1, 1), RepeatType.DAILY, -7, datetime(2026, 3, 5, 10), date(2026, 3, 6)),
+        (date(2026, 1, 1), RepeatType.WEEKLY, -7, datetime(2026, 1, 2), date(2026, 1, 8)),
+        (date(2024, 2, 29), RepeatType.YEARLY, -1, datetime(2027, 2, 27, 10), date(2028, 2, 28)),
+        # 推后提醒：纪念日已过、提醒日未到
+        (date(2026, 1, 1), RepeatType.NONE, 3, datetime(2026, 1, 2), date(2026, 1, 4)),
+    ],
+)
+def test_offset_next_triggers(fix_now, event, repeat_type, offset, now, expected):
+    tz = ZoneInfo('Asia/Shanghai')
+    now = now.replace(tzinfo=tz)
+    fix_now(now)
+    calculator = RemindConfigCalculator(tz)
+    row = (event, repeat_type, CalendarType.GREGORIAN, offset, time(9), False)
+
+    [ret] = calculator.calculate_next_triggers(*zip(row), now=now)
+    assert ret == _single(calculator, row)
+    assert ret == datetime.combine(expected, time(9), tz)
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Hashable
+
+
+_MISSING = object()
+
+
+class TTLLRUCache:
+    """
+    进程内有界 LRU 缓存，每个条目单独设置过期时间
+
+    仅用于单个 worker 内部（asyncio 单线程访问，不加锁）
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60):
+        """
+        :param maxsize: 最大条目数，超出后淘汰最久未使用的条目
+        :param ttl: 默认过期时间（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        expire_at, value = item
+        if expire_at <= monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None) -> None:
+        """
+        :param ttl: 过期时间（秒），默认使用 self.ttl；<=0 时不写入
+        """
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0:
+            return
+
+        self._data[key] = (monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default=None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
@@ -0,0 +1,203 @@
+"""
+农历查表
+
+1900~2100 农历年的月份数据预先由 lunar_python 生成并保存为二进制文件（scripts/build_lunar_table.py），
+加载后展开为按月排列的 array：每月初一的公历序数、月份（负数为闰月）、所属农历年，
+农历与公历互转只需数组下标运算，不再构造 Lunar/Solar 对象
+
+文件格式（小端）：
+    header: b"LNR1" + 起始年(uint16) + 年数 n(uint16)
+    int32[n + 1]: 每年正月初一的公历序数（date.toordinal），最后一个为 n 年后的正月初一
+    int8[n]: 闰月月份，0 表示无闰月
+    uint16[n]: 大小月掩码，第 k 位对应该年第 k 个月（含闰月，从 0 开始），1 表示 30 天，0 表示 29 天
+"""
+
+import struct
+import sys
+from array import array
+from datetime import date
+from pathlib import Path
+from typing import NamedTuple
+
+
+DATA_FILE = Path(__file__).with_name("lunar_table.bin")
+START_YEAR = 1900
+END_YEAR = 2100
+
+_MAGIC = b"LNR1"
+_HEADER = struct.Struct("<4sHH")
+# 朔望月平均长度，用于估算公历日期所在的月份下标
+_SYNODIC_MONTH = 29.530588
+
+
+class LunarDate(NamedTuple):
+    year: int
+    month: int  # 负数表示闰月，与 lunar_python Lunar.getMonth() 一致
+    day: int
+
+
+def _read_array(typecode: str, buf: bytes, offset: int, count: int) -> tuple[array, int]:
+    arr = array(typecode)
+    size = arr.itemsize * count
+    arr.frombytes(buf[offset : offset + size])
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr, offset + size
+
+
+def build_from_lunar_python(start_year: int = START_YEAR, end_year: int = END_YEAR):
+    """
+    由 lunar_python 生成按年的原始数据
+
+    :return: (year_start, leap, mask)
+    """
+    from lunar_python import LunarMonth, LunarYear
+
+    year_start = array("i")
+    leap = array("b")
+    mask = array("H")
+    for year in range(start_year, end_year + 1):
+        leap_month = LunarYear.fromYear(year).getLeapMonth()
+        months = list(range(1, 13))
+        if leap_month:
+            months.insert(leap_month, -leap_month)
+
+        bits = 0
+        for k, month in enumerate(months):
+            lunar_month = LunarMonth.fromYm(year, month)
+            if k == 0:
+                year_start.append(date(*_solar_ymd(lunar_month)).toordinal())
+            if lunar_month.getDayCount() == 30:
+                bits |= 1 << k
+        leap.append(leap_month)
+        mask.append(bits)
+
+    next_new_year = LunarMonth.fromYm(end_year + 1, 1)
+    year_start.append(date(*_solar_ymd(next_new_year)).toordinal())
+    return year_start, leap, mask
+
+
+def _solar_ymd(lunar_month) -> tuple[int, int, int]:
+    from lunar_python import Solar
+
+    solar = Solar.fromJulianDay(lunar_month.getFirstJulianDay())
+    return solar.getYear(), solar.getMonth(), solar.getDay()
+
+
+def dump(path: Path = DATA_FILE, start_year: int = START_YEAR, end_year: int = END_YEAR):
+    """生成二进制数据文件"""
+    year_start, leap, mask = build_from_lunar_python(start_year, end_year)
+    arrays = [array("i", year_start), array("b", leap), array("H", mask)]
+    if sys.byteorder != "little":
+        for arr in arrays:
+            arr.byteswap()
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, start_year, len(leap)))
+        for arr in arrays:
+            arr.tofile(f)
+
+
+class LunarTable:
+    def __init__(self, year_start: array, leap: array, mask: array, start_year: int = START_YEAR):
+        self.start_year = start_year
+        self.end_year = start_year + len(leap) - 1
+        self._leap = leap
+
+        # 按月展开：第 i 个月初一的公历序数、月份、所属农历年；month_start 末尾为结束哨兵
+        self._year_index = array("H")
+        self._month_start = array("i")
+        self._month_no = array("b")
+        self._month_year = array("H")
+        for yi, leap_month in enumerate(leap):
+            year = start_year + yi
+            self._year_index.append(len(self._month_no))
+            ordinal = year_start[yi]
+            months = list(range(1, 13))
+            if leap_month:
+                months.insert(leap_month, -leap_month)
+            for k, month in enumerate(months):
+                self._month_start.append(ordinal)
+                self._month_no.append(month)
+                self._month_year.append(year)
+                ordinal += 30 if mask[yi] >> k & 1 else 29
+            if ordinal != year_start[yi + 1]:
+                raise ValueError(f"农历表数据错误：{year} 年各月天数之和与次年正月初一不一致")
+        self._month_start.append(year_start[-1])
+
+        self.min_ordinal = self._month_start[0]
+        self.max_ordinal = self._month_start[-1] - 1
+
+    @classmethod
+    def load(cls, path: Path = DATA_FILE) -> "LunarTable":
+        """加载数据文件，文件不存在时由 lunar_python 现场生成"""
+        if not path.exists():
+            return cls(*build_from_lunar_python())
+
+        buf = path.read_bytes()
+        magic, start_year, count = _HEADER.unpack_from(buf)
+        if magic != _MAGIC:
+            raise ValueError(f"农历表文件格式错误：{path}")
+        offset = _HEADER.size
+        year_start, offset = _read_array("i", buf, offset, count + 1)
+        leap, offset = _read_array("b", buf, offset, count)
+        mask, offset = _read_array("H", buf, offset, count)
+        return cls(year_start, leap, mask, start_year)
+
+    def covers_year(self, year: int) -> bool:
+        return self.start_year <= year <= self.end_year
+
+    def covers_date(self, d: date) -> bool:
+        return self.min_ordinal <= d.toordinal() <= self.max_ordinal
+
+    def leap_month(self, year: int) -> int:
+        """闰月月份，0 表示无闰月"""
+        return self._leap[year - self.start_year]
+
+    def month_days(self, year: int, month: int) -> int | None:
+        """农历月天数，month 为负数表示闰月，月份不存在时返回 None"""
+        idx = self._month_index(year, month)
+        if idx is None:
+            return None
+        return self._month_start[idx + 1] - self._month_start[idx]
+
+    def lunar_to_solar(self, year: int, month: int, day: int) -> date | None:
+        """
+        农历转公历，日期不存在（如小月三十、该年无此闰月）时返回 None
+
+        :param month: 负数表示闰月
+        """
+        idx = self._month_index(year, month)
+        if idx is None:
+            return None
+        start = self._month_start[idx]
+        if not 1 <= day <= self._month_start[idx + 1] - start:
+            return None
+        return date.fromordinal(start + day - 1)
+
+    def solar_to_lunar(self, d: date) -> LunarDate | None:
+        """公历转农历，超出范围时返回 None"""
+        ordinal = d.toordinal()
+        if not self.min_ordinal <= ordinal <= self.max_ordinal:
+            return None
+
+        # 按朔望月平均长度估算下标，误差不超过一两个月
+        month_start = self._month_start
+        idx = min(int((ordinal - self.min_ordinal) / _SYNODIC_MONTH), len(self._month_no) - 1)
+        while month_start[idx] > ordinal:
+            idx -= 1
+        while month_start[idx + 1] <= ordinal:
+            idx += 1
+        return LunarDate(self._month_year[idx], self._month_no[idx], ordinal - month_start[idx] + 1)
+
+    def _month_index(self, year: int, month: int) -> int | None:
+        if not self.covers_year(year) or not 1 <= abs(month) <= 12:
+            return None
+        yi = year - self.start_year
+        leap_month = self._leap[yi]
+        base = self._year_index[yi]
+        if month < 0:
+            return base - month if leap_month == -month else None
+        return base + month - 1 + (1 if leap_month and month > leap_month else 0)
+
+
+lunar_table = LunarTable.load()
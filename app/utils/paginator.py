@@ -1,6 +1,9 @@
+import base64
+import json
+from datetime import date, datetime
 from typing import Any, Union, TypeVar, Generic, List
 
-from sqlalchemy import Select, func
+from sqlalchemy import ColumnElement, Select, and_, func, or_
 from pydantic import BaseModel, ConfigDict, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -165,3 +168,151 @@ class ScrollPaginator(Paginator):
     @property
     def total(self):
         return None
+
+
+class KeysetPaginator(Paginator):
+    """
+    多字段游标分页（keyset）
+
+    按 keys 依次比较（支持混合升降序、可为 NULL 的排序表达式），游标为最后一项各排序字段的值，
+    编码为 urlsafe base64 字符串；ctx 为随游标一起透传的上下文（如首页查询时刻），保证翻页期间排序稳定
+    """
+
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        stmt: Select,
+        keys: list[tuple[ColumnElement, bool]],
+    ):
+        """
+        :param stmt: 查询对象，select(model) 或 select(model, 其他列...)
+        :param keys: [(排序表达式, 是否降序)]，最后一项须唯一（如主键），否则翻页可能漏数据
+        """
+        super().__init__(db_session)
+        self.stmt = stmt
+        self.keys = keys
+
+    @staticmethod
+    def _encode_value(value):
+        if isinstance(value, datetime):
+            return {"$dt": value.isoformat()}
+        if isinstance(value, date):
+            return {"$d": value.isoformat()}
+        return value
+
+    @staticmethod
+    def _decode_value(value):
+        if isinstance(value, dict):
+            if "$dt" in value:
+                return datetime.fromisoformat(value["$dt"])
+            if "$d" in value:
+                return date.fromisoformat(value["$d"])
+        return value
+
+    @classmethod
+    def encode_cursor(cls, values: list, ctx: dict = None) -> str:
+        raw = json.dumps(
+            {"k": [cls._encode_value(v) for v in values], "c": ctx or {}},
+            separators=(",", ":"),
+            default=cls._encode_value,
+        )
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode_cursor(cls, last: str | int | None) -> tuple[list | None, dict]:
+        """
+        解析游标
+
+        :return: (排序字段值, 上下文)，首页返回 (None, {})
+        """
+        if not last:
+            return None, {}
+
+        try:
+            last = str(last)
+            raw = base64.urlsafe_b64decode(last + "=" * (-len(last) % 4))
+            data = json.loads(raw, object_hook=cls._decode_value)
+            values, ctx = data["k"], data["c"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("invalid cursor")
+        if not isinstance(values, list) or not isinstance(ctx, dict):
+            raise ValueError("invalid cursor")
+        return values, ctx
+
+    def _check_values(self, values: list) -> None:
+        """游标值须与排序表达式的类型一致，避免篡改的游标进入 SQL 后才报错"""
+        if len(values) != len(self.keys):
+            raise ValueError("invalid cursor")
+        for (expr, _), value in zip(self.keys, values):
+            if value is None:
+                continue
+            try:
+                python_type = expr.type.python_type
+            except NotImplementedError:
+                continue
+            if python_type is float:
+                python_type = (int, float)
+            naive = isinstance(value, datetime) and value.tzinfo is None
+            if (
+                not isinstance(value, python_type)
+                or (isinstance(value, bool) and python_type is not bool)
+                or (naive and getattr(expr.type, "timezone", False))
+            ):
+                raise ValueError("invalid cursor")
+
+    def _after(self, values: list):
+        """构造 “排在游标之后” 的条件：(k0 > v0) or (k0 = v0 and k1 > v1) or ..."""
+        conds = []
+        for i, ((expr, desc), value) in enumerate(zip(self.keys, values)):
+            if value is None:
+                # NULL 仅参与相等判断，要求同一前缀分组内该字段全为 NULL 或全不为 NULL
+                continue
+            eqs = [e.is_not_distinct_from(v) for (e, _), v in zip(self.keys[:i], values[:i])]
+            conds.append(and_(*eqs, expr < value if desc else expr > value))
+        return or_(*conds)
+
+    async def paginate(
+        self,
+        last: str | int | None,
+        limit: int = 20,
+        max_limit: int = 100,
+        ctx: dict = None,
+    ) -> CursorPaginatedResponse:
+        """
+        基于游标分页
+
+        :param last: 上一页返回的游标
+        :param limit: 滚动步长，使用limit+1用于判断是否还有更多数据
+        :param max_limit: 最大分页限制
+        :param ctx: 写入游标的上下文
+        :return:
+        """
+        if limit < 1:
+            raise ValueError("limit must >= 1")
+        if max_limit and limit > max_limit:
+            raise ValueError("per page size exceeded the max limit!")
+
+        values, _ = self.decode_cursor(last)
+        stmt = self.stmt.add_columns(
+            *(expr.label(f"_keyset_{i}") for i, (expr, _) in enumerate(self.keys))
+        ).order_by(*(expr.desc() if desc else expr.asc() for expr, desc in self.keys))
+        if values is not None:
+            self._check_values(values)
+            stmt = stmt.where(self._after(values))
+
+        rows = (await self.db.execute(stmt.limit(limit + 1))).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # stmt 只查询单个实体时返回实体，否则返回除排序字段外的元组
+        width = len(self.stmt.column_descriptions)
+
+        cursor = None
+        if rows:
+            cursor = self.encode_cursor(list(rows[-1][width:]), ctx)
+
+        return CursorPaginatedResponse(
+            last=cursor,
+            has_more=has_more,
+            items=[row[0] if width == 1 else tuple(row[:width]) for row in rows],
+        )
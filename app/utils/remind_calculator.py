@@ -1,12 +1,34 @@
+from calendar import isleap
 from datetime import datetime, date, time, timedelta
+from functools import lru_cache
+from itertools import repeat
+from typing import Callable, Iterable
 from zoneinfo import ZoneInfo
-from dateutil.relativedelta import relativedelta
 from app.constant import CalendarType, RepeatType
 from app.schemas.anniversary import RemindConfig
 from app.utils.dater import DT
+from app.utils.lunar_table import LunarDate, lunar_table
 from lunar_python import Lunar, Solar
 
 
+# 按月/年重复的间隔月数
+_REPEAT_MONTHS = {
+    RepeatType.YEARLY: 12,
+    RepeatType.HALF_YEARLY: 6,
+    RepeatType.THREE_MONTHLY: 3,
+    RepeatType.MONTHLY: 1,
+}
+_MONTH_DAYS = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _add_months(d: date, months: int) -> date:
+    """加月数，日期超出当月天数时取月末（与 relativedelta(months=n) 一致）"""
+    y, m = divmod(d.month - 1 + months, 12)
+    year, month = d.year + y, m + 1
+    days = 29 if month == 2 and isleap(year) else _MONTH_DAYS[month]
+    return date(year, month, min(d.day, days))
+
+
 class RemindConfigCalculator:
     """提醒时间计算器 - 使用 lunar_python"""
 
@@ -24,36 +46,84 @@ class RemindConfigCalculator:
         is_leap=False,
     ) -> datetime | None:
         """计算下一次触发时间"""
-        now = datetime.now(self.tz)
-        today = now.date()
-
-        # Step 1: 找到下一个纪念日
-        next_anniv = self._get_next_anniversary(
-            event_date, repeat_type, calendar_type, today, is_leap
+        return self._next_trigger(
+            datetime.now(self.tz),
+            self._get_next_anniversary,
+            self._build_trigger_datetime,
+            event_date,
+            repeat_type,
+            calendar_type,
+            remind_config.offset_days,
+            remind_config.trigger_time,
+            is_leap,
         )
 
-        if next_anniv is None:
+    def calculate_next_triggers(
+        self,
+        event_dates: Iterable[date],
+        repeat_types: Iterable["RepeatType"],
+        calendar_types: Iterable["CalendarType"],
+        offsets: Iterable[int],
+        trigger_times: Iterable[time],
+        leaps: Iterable[bool] = None,
+        now: datetime = None,
+    ) -> list[datetime | None]:
+        """
+        批量计算下一次触发时间，各参数按位置一一对应，结果与逐条调用 calculate_next_trigger 一致
+
+        同一批次内相同（纪念日日期, 重复规则, 参考日期）的下一个纪念日、相同（日期, 偏移, 时间）的
+        触发时间只计算一次，大量纪念日共享日期（如生日、节日）时多数行只需查字典
+
+        :param leaps: 是否闰月，为空时全部为 False
+        :param now: 当前时间，为空时取 datetime.now(self.tz)，同一批次使用同一个时间
+        """
+        # 参考日期按计算器时区取，与 calculate_next_trigger 一致
+        now = now.astimezone(self.tz) if now else datetime.now(self.tz)
+        next_anniv = lru_cache(maxsize=None)(self._get_next_anniversary)
+        build_trigger = lru_cache(maxsize=None)(self._build_trigger_datetime)
+        if leaps is None:
+            leaps = repeat(False)
+
+        return [
+            self._next_trigger(now, next_anniv, build_trigger, *args)
+            for args in zip(
+                event_dates, repeat_types, calendar_types, offsets, trigger_times, leaps
+            )
+        ]
+
+    @staticmethod
+    def _next_trigger(
+        now: datetime,
+        next_anniv: Callable,
+        build_trigger: Callable,
+        event_date: date,
+        repeat_type: "RepeatType",
+        calendar_type: "CalendarType",
+        offset_days: int,
+        trigger_time: time,
+        is_leap: bool,
+    ) -> datetime | None:
+        # Step 1: 找到下一个纪念日，提醒日（纪念日 + 偏移）不早于今天
+        reference_date = now.date() - timedelta(days=offset_days)
+        anniv = next_anniv(event_date, repeat_type, calendar_type, reference_date, is_leap)
+        if anniv is None:
             return None
 
         # Step 2: 计算触发时间
-        next_trigger = self._build_trigger_datetime(
-            next_anniv, remind_config.offset_days, remind_config.trigger_time
-        )
+        next_trigger = build_trigger(anniv, offset_days, trigger_time)
 
         # Step 3: 如果已过期，找下一个周期
         if next_trigger <= now:
             if repeat_type == RepeatType.NONE:
                 return None
 
-            next_anniv = self._get_next_anniversary(
-                event_date, repeat_type, calendar_type, next_anniv + timedelta(days=1), is_leap
+            anniv = next_anniv(
+                event_date, repeat_type, calendar_type, anniv + timedelta(days=1), is_leap
             )
-            if next_anniv is None:
+            if anniv is None:
                 return None
 
-            next_trigger = self._build_trigger_datetime(
-                next_anniv, remind_config.offset_days, remind_config.trigger_time
-            )
+            next_trigger = build_trigger(anniv, offset_days, trigger_time)
 
         return next_trigger
 
@@ -94,23 +164,27 @@ class RemindConfigCalculator:
     def _next_gregorian_anniversary(
         self, event_date: date, repeat_type: "RepeatType", reference_date: date
     ) -> date:
-        """计算公历纪念日的下一个日期"""
-        delta = self._get_repeat_delta(repeat_type)
-        next_date = event_date
-
-        # 快速跳跃优化
-        if repeat_type == RepeatType.YEARLY and reference_date.year > event_date.year:
-            years_diff = reference_date.year - event_date.year
-            try:
-                next_date = event_date.replace(year=event_date.year + years_diff)
-            except ValueError:  # 2月29日
-                next_date = event_date.replace(year=event_date.year + years_diff, day=28)
-            if next_date < reference_date:
-                next_date = self._add_delta(next_date, delta, event_date.day)
-        else:
-            while next_date < reference_date:
-                next_date = self._add_delta(next_date, delta, event_date.day)
-
+        """
+        计算公历纪念日的下一个日期
+
+        直接算出 reference_date 所在的周期数，不逐个周期累加：按月/年重复为 event_date 加 k 个周期，
+        日期超出当月天数时取月末（如 1月31日 → 2月28日 → 3月31日，2月29日 → 平年 2月28日）
+        """
+        if reference_date <= event_date:
+            return event_date
+        if repeat_type == RepeatType.DAILY:
+            return reference_date
+        if repeat_type == RepeatType.WEEKLY:
+            return event_date + timedelta(weeks=-(-(reference_date - event_date).days // 7))
+
+        interval = _REPEAT_MONTHS.get(repeat_type, 12)
+        months = (reference_date.year - event_date.year) * 12 + (
+            reference_date.month - event_date.month
+        )
+        k = months // interval
+        next_date = _add_months(event_date, k * interval)
+        if next_date < reference_date:
+            next_date = _add_months(event_date, (k + 1) * interval)
         return next_date
 
     # ============ 农历计算 (lunar_python) ============
@@ -152,7 +226,7 @@ class RemindConfigCalculator:
         if not ref_lunar:
             return None
 
-        start_year = ref_lunar.getYear()
+        start_year = ref_lunar.year
 
         for year in range(start_year, start_year + 10):
             solar_date = self._lunar_to_solar(year, lunar_month, lunar_day, is_leap)
@@ -169,8 +243,8 @@ class RemindConfigCalculator:
         if not ref_lunar:
             return None
 
-        year = ref_lunar.getYear()
-        month = ref_lunar.getMonth()
+        year = ref_lunar.year
+        month = ref_lunar.month
 
         for _ in range(24):  # 最多查2年
             solar_date = self._lunar_to_solar(year, month, lunar_day, is_leap)
@@ -211,11 +285,13 @@ class RemindConfigCalculator:
 
         return None
 
-    # ============ lunar_python 工具方法 ============
+    # ============ 农历转换：1900~2100 查表，范围外使用 lunar_python ============
 
     def _lunar_to_solar(self, year: int, month: int, day: int, is_leap=False) -> date | None:
         """农历转公历"""
         month = not is_leap and month or -month
+        if lunar_table.covers_year(year):
+            return lunar_table.lunar_to_solar(year, month, day)
         try:
             lunar = Lunar.fromYmd(year, month, day)
             solar = lunar.getSolar()
@@ -223,33 +299,12 @@ class RemindConfigCalculator:
         except Exception:
             return None
 
-    def _solar_to_lunar(self, d: date) -> Lunar | None:
+    def _solar_to_lunar(self, d: date) -> LunarDate | None:
         """公历转农历"""
+        if lunar_table.covers_date(d):
+            return lunar_table.solar_to_lunar(d)
         try:
-            solar = Solar.fromYmd(d.year, d.month, d.day)
-            return solar.getLunar()
+            lunar = Solar.fromYmd(d.year, d.month, d.day).getLunar()
+            return LunarDate(lunar.getYear(), lunar.getMonth(), lunar.getDay())
         except Exception:
             return None
-
-    # ============ 通用工具 ============
-
-    def _get_repeat_delta(self, repeat_type: "RepeatType") -> relativedelta:
-        """获取重复间隔"""
-        return {
-            RepeatType.YEARLY: relativedelta(years=1),
-            RepeatType.HALF_YEARLY: relativedelta(months=6),
-            RepeatType.THREE_MONTHLY: relativedelta(months=3),
-            RepeatType.MONTHLY: relativedelta(months=1),
-            RepeatType.WEEKLY: relativedelta(weeks=1),
-            RepeatType.DAILY: relativedelta(days=1),
-        }.get(repeat_type, relativedelta(years=1))
-
-    def _add_delta(self, dt: date, delta: relativedelta, original_day: int) -> date:
-        """添加间隔，处理月末日期"""
-        result = dt + delta
-        if result.day != original_day:
-            try:
-                result = result.replace(day=original_day)
-            except ValueError:
-                pass
-        return result
@@ -0,0 +1,162 @@
+"""
+纪念日列表查询基准：三次查询（列表 + 标签 + 媒体） vs 单条 SQL jsonb_agg 聚合
+
+仅用于测试库，会写入基准数据（owner_id=BENCH_UID）：
+    APP_ENV=testing python scripts/bench_anniv_feed.py --seed 100000 --rounds 50
+    APP_ENV=testing python scripts/bench_anniv_feed.py --clean
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from statistics import mean, quantiles
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from load_env import load_env  # noqa
+
+load_env()
+
+from sqlalchemy import delete, insert, select  # noqa
+from ulid import ULID  # noqa
+
+from app.config import settings  # noqa
+from app.database import db  # noqa
+from app.models.anniversary import (  # noqa
+    AnnivMediaModel,
+    AnniversaryModel,
+    AnniversaryTag,
+    AnnivVisibilityModel,
+)
+from app.models.sys import MediaModel  # noqa
+from app.models.tags import TagModel  # noqa
+from app.repo.anniversary import anniv_repo  # noqa
+from app.schemas.anniversary import QueryAnnivSchema  # noqa
+
+
+BENCH_UID = 9_000_000_001
+BATCH = 1000
+
+
+async def seed(session, total: int):
+    tag_ids = [str(ULID()) for _ in range(50)]
+    await session.execute(
+        insert(TagModel),
+        [{"id": i, "name": f"bench-{i}", "create_by": BENCH_UID} for i in tag_ids],
+    )
+
+    now = datetime.now(timezone.utc)
+    for offset in range(0, total, BATCH):
+        annivs, tags, medias, anniv_medias, visibility = [], [], [], [], []
+        for _ in range(min(BATCH, total - offset)):
+            aid = str(ULID())
+            annivs.append(
+                {
+                    "id": aid,
+                    "name": f"bench-{aid[-6:]}",
+                    "event_year": 2020,
+                    "event_date": date(2020, 1, 1) + timedelta(days=random.randint(0, 365)),
+                    "type": 1,
+                    "share_mode": 0,
+                    "owner_id": BENCH_UID,
+                    "is_reminder": False,
+                    "repeat_type": 1,
+                    "calendar_type": 1,
+                    "tz": "Asia/Shanghai",
+                    "lunar_is_leap": False,
+                    "next_trigger_at": now + timedelta(minutes=random.randint(-500000, 500000)),
+                    "create_by": BENCH_UID,
+                    "update_by": BENCH_UID,
+                }
+            )
+            visibility.append({"user_id": BENCH_UID, "anniv_id": aid, "via": 0})
+            for tid in random.sample(tag_ids, random.randint(0, 3)):
+                tags.append({"anniv_id": aid, "tag_id": tid})
+            for _ in range(random.randint(0, 3)):
+                mid = str(ULID())
+                medias.append({"id": mid, "type": 1, "path": f"bench/{mid}.jpg", "state": 1})
+                anniv_medias.append({"anniv_id": aid, "media_id": mid})
+
+        await session.execute(insert(AnniversaryModel), annivs)
+        await session.execute(insert(AnnivVisibilityModel), visibility)
+        tags and await session.execute(insert(AnniversaryTag), tags)
+        medias and await session.execute(insert(MediaModel), medias)
+        anniv_medias and await session.execute(insert(AnnivMediaModel), anniv_medias)
+        await session.commit()
+        print(f"seeded {offset + len(annivs)}/{total}")
+
+
+async def clean(session):
+    anniv_ids = select(AnniversaryModel.id).where(AnniversaryModel.owner_id == BENCH_UID)
+    media_ids = select(AnnivMediaModel.media_id).where(AnnivMediaModel.anniv_id.in_(anniv_ids))
+    await session.execute(delete(MediaModel).where(MediaModel.id.in_(media_ids)))
+    await session.execute(delete(AnnivMediaModel).where(AnnivMediaModel.anniv_id.in_(anniv_ids)))
+    await session.execute(delete(AnniversaryTag).where(AnniversaryTag.anniv_id.in_(anniv_ids)))
+    await session.execute(
+        delete(AnnivVisibilityModel).where(AnnivVisibilityModel.user_id == BENCH_UID)
+    )
+    await session.execute(delete(AnniversaryModel).where(AnniversaryModel.owner_id == BENCH_UID))
+    await session.execute(delete(TagModel).where(TagModel.create_by == BENCH_UID))
+    await session.commit()
+
+
+async def run_split(session, params):
+    paged = await anniv_repo.list_feed(session, BENCH_UID, params)
+    ids = [i.id for i in paged.items]
+    await anniv_repo.list_tag(session, ids)
+    await anniv_repo.list_media(session, ids)
+    return paged.last
+
+
+async def run_agg(session, params):
+    paged = await anniv_repo.list_feed(session, BENCH_UID, params, with_relations=True)
+    return paged.last
+
+
+async def bench(rounds: int, pages: int, limit: int):
+    for name, fn in (("split(3 queries)", run_split), ("jsonb_agg(1 query)", run_agg)):
+        costs = []
+        for _ in range(rounds):
+            last = 0
+            async with db.async_db_session() as session:
+                for _ in range(pages):
+                    params = QueryAnnivSchema(order_by="default", last=last, limit=limit)
+                    start = perf_counter()
+                    last = await fn(session, params)
+                    costs.append((perf_counter() - start) * 1000)
+                    if not last:
+                        break
+
+        p = quantiles(costs, n=100)
+        print(
+            f"{name:<20} n={len(costs):<5} avg={mean(costs):.2f}ms "
+            f"p50={p[49]:.2f}ms p95={p[94]:.2f}ms p99={p[98]:.2f}ms"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0, help="写入基准纪念日数量")
+    parser.add_argument("--clean", action="store_true", help="清理基准数据")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=5, help="每轮向后翻页数")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    db.init_async_engine_and_session(settings.DB_MAIN_URL)
+    async with db.async_db_session() as session:
+        if args.clean:
+            await clean(session)
+            return
+        if args.seed:
+            await seed(session, args.seed)
+
+    await bench(args.rounds, args.pages, args.limit)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
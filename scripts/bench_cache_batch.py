@@ -0,0 +1,77 @@
+"""
+BaseCache.get_cache_data 批量读取基准：逐个 key 请求 vs 分批 pipeline
+
+    python scripts/bench_cache_batch.py --url redis://127.0.0.1:6379/15 --keys 5000
+"""
+
+import argparse
+import asyncio
+import sys
+from math import ceil
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from redis.asyncio import StrictRedis  # noqa
+
+from app.services.cache import BaseCache  # noqa
+
+
+PREFIX = "bench_counter_anniv"
+
+
+async def sequential(client, keys):
+    """改造前的实现：每个 key 一次往返"""
+    data = []
+    for key in keys:
+        ret = await client.execute_command("HGETALL", key)
+        data.append({"id": key.rsplit(":", 1)[1], **ret})
+    return data
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="redis://127.0.0.1:6379/15")
+    parser.add_argument("--keys", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    client = StrictRedis.from_url(args.url, decode_responses=True)
+    keys = [f"{PREFIX}:{i}" for i in range(args.keys)]
+    async with client.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.hset(key, mapping={"like_cnt": 1, "collect_cnt": 2, "comment_cnt": 3})
+        await pipe.execute()
+
+    try:
+        cases = [("sequential", args.keys, lambda: sequential(client, keys))]
+        for size in (100, 500, 1000):
+            cases.append(
+                (
+                    f"pipeline chunk={size}",
+                    ceil(args.keys / size),
+                    lambda size=size: BaseCache.get_cache_data(
+                        client, "hash", keys, cmd="HGETALL", sep_rule=(":", 1, 1), chunk_size=size
+                    ),
+                )
+            )
+
+        for name, round_trips, fn in cases:
+            costs = []
+            for _ in range(args.rounds):
+                start = perf_counter()
+                ret = await fn()
+                costs.append((perf_counter() - start) * 1000)
+            assert len(ret) == args.keys
+            print(
+                f"{name:<22} round_trips={round_trips:<6} "
+                f"avg={sum(costs) / len(costs):.1f}ms min={min(costs):.1f}ms"
+            )
+    finally:
+        await client.delete(*keys)
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
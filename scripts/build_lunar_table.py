@@ -0,0 +1,81 @@
+"""
+生成农历查表数据文件 app/utils/lunar_table.bin，并与 lunar_python 逐日比对
+
+    python scripts/build_lunar_table.py            # 生成并校验
+    python scripts/build_lunar_table.py --verify   # 只校验现有文件
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lunar_python import Lunar, Solar  # noqa
+
+from app.utils.lunar_table import DATA_FILE, LunarTable, dump  # noqa
+
+
+def verify(table: LunarTable) -> int:
+    """
+    逐日比对：
+    - 覆盖范围内每个公历日期转农历
+    - 每个农历年的每个月（含闰月、不存在的闰月）的 1~30 日转公历，不存在的日期两边都应失败
+    :return: 不一致的数量
+    """
+    errors = 0
+
+    d = date.fromordinal(table.min_ordinal)
+    end = date.fromordinal(table.max_ordinal)
+    days = 0
+    while d <= end:
+        lunar = Solar.fromYmd(d.year, d.month, d.day).getLunar()
+        expect = (lunar.getYear(), lunar.getMonth(), lunar.getDay())
+        got = table.solar_to_lunar(d)
+        if tuple(got) != expect:
+            errors += 1
+            print(f"solar->lunar {d}: expect {expect}, got {got}")
+        d += timedelta(days=1)
+        days += 1
+
+    for year in range(table.start_year, table.end_year + 1):
+        for month in [*range(1, 13), *range(-12, 0)]:
+            for day in range(1, 31):
+                try:
+                    solar = Lunar.fromYmd(year, month, day).getSolar()
+                    expect = date(solar.getYear(), solar.getMonth(), solar.getDay())
+                except Exception:
+                    expect = None
+                got = table.lunar_to_solar(year, month, day)
+                if got != expect:
+                    errors += 1
+                    print(f"lunar->solar {year}-{month}-{day}: expect {expect}, got {got}")
+
+    print(f"checked {days} solar days, {table.end_year - table.start_year + 1} lunar years")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--verify", action="store_true", help="只校验现有文件")
+    args = parser.parse_args()
+
+    if not args.verify:
+        dump(DATA_FILE)
+        print(f"written {DATA_FILE} ({DATA_FILE.stat().st_size} bytes)")
+
+    start = perf_counter()
+    table = LunarTable.load(DATA_FILE)
+    print(f"loaded in {(perf_counter() - start) * 1000:.2f}ms")
+
+    errors = verify(table)
+    if errors:
+        print(f"{errors} mismatches")
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()